@@ -20,6 +20,11 @@ from models.role_model import Role
 from models.team_model import Team
 from models.user_team_model import UserTeam
 from models.task_model import Task
+from models.task_participant_model import TaskParticipant
+from models.task_tombstone_model import TaskTombstone
+from models.task_change_model import TaskChange
+from models.team_tag_stat_model import TeamTagStat
+from models.task_daily_rollup_model import TaskDailyRollup
 from models.comment_model import Comment
 from models.backup_model import Backup
 from models.audit_log_model import AuditLog
@@ -36,6 +41,8 @@ from routes.comment_routes import comment_bp
 from routes.admin_routes import admin_bp
 from routes.backup_routes import backup_bp
 from routes.ms_oauth_routes import bp as ms_oauth_bp
+from routes.analytics_routes import analytics_bp
+from routes.bootstrap_routes import bootstrap_bp
 
 # Schedulers
 from mailer_scheduler import init_mailer_scheduler, stop_mailer_scheduler
@@ -43,6 +50,7 @@ from purge_scheduler import init_purge_scheduler, stop_purge_scheduler, purge_tr
 from archive_scheduler import init_archive_scheduler, stop_archive_scheduler
 from backup_scheduler import init_backup_scheduler
 from reminder_scheduler import init_reminder_scheduler, stop_reminder_scheduler
+from services.audit_writer import init_audit_writer, stop_audit_writer
 
 load_dotenv()
 
@@ -77,6 +85,7 @@ limiter = Limiter(get_remote_address, app=app, default_limits=["300/5minutes"])
 # ---- Extensões ----
 db.init_app(app)
 migrate = Migrate(app, db)
+init_audit_writer(app)  # auditoria em lote; AUDIT_SYNC=1 grava na hora (testes)
 ALLOWED_ORIGINS = [
     os.getenv('FRONTEND_BASE_URL', 'http://10.1.243.120:5174'),
     os.getenv('FRONTEND_ALT_URL', 'http://10.1.243.120:5174'),
@@ -86,7 +95,8 @@ CORS(
     origins=ALLOWED_ORIGINS,
     supports_credentials=True,
     methods=["GET","POST","PUT","PATCH","DELETE","OPTIONS"],
-    allow_headers=["Authorization","Content-Type","X-Requested-With","X-Admin-Request"]
+    allow_headers=["Authorization","Content-Type","X-Requested-With","X-Admin-Request"],
+    expose_headers=["X-Next-Cursor"]
 )
 
 jwt = JWTManager(app)
@@ -133,6 +143,8 @@ app.register_blueprint(comment_bp)
 app.register_blueprint(admin_bp)
 app.register_blueprint(backup_bp)
 app.register_blueprint(ms_oauth_bp)
+app.register_blueprint(analytics_bp)
+app.register_blueprint(bootstrap_bp)
 
 # ---- Inicialização dos schedulers no boot (sem decorator) ----
 def _start_schedulers_once_on_boot():
@@ -167,6 +179,8 @@ def _start_schedulers_once_on_boot():
 _start_schedulers_once_on_boot()
 
 # ---- Encerrar schedulers no shutdown ----
+# atexit roda na ordem inversa: a auditoria pendente é gravada depois que os schedulers param
+atexit.register(stop_audit_writer)
 atexit.register(stop_reminder_scheduler)
 atexit.register(stop_purge_scheduler)
 atexit.register(stop_archive_scheduler)
@@ -6,6 +6,8 @@ from sqlalchemy import and_, func
 from extensions import db
 from models.task_model import Task
 from models.audit_log_model import AuditLog
+from jobs.analytics_rollup import rollup_recent_once
+from jobs.audit_partitions import maintain_audit_partitions_once
 
 archive_scheduler = None
 
@@ -62,13 +64,15 @@ def archive_done_tasks_once(app, days=7):
                 current_app.logger.exception("Falha ao registrar auditoria (ARCHIVE auto)")
             count += 1
 
+        # um commit só para o lote (a auditoria vai para a fila do audit_writer)
         if count:
             db.session.commit()
 
         current_app.logger.info(f"[ARCHIVE] Arquivadas {count} tarefa(s).")
         return count
 
-def init_archive_scheduler(app, hour=3, minute=45):
+def init_archive_scheduler(app, hour=3, minute=45, rollup_hour=4, rollup_minute=15,
+                           audit_hour=4, audit_minute=30):
     global archive_scheduler
     if archive_scheduler:
         return archive_scheduler
@@ -85,9 +89,34 @@ def init_archive_scheduler(app, hour=3, minute=45):
         max_instances=1,
         misfire_grace_time=3600,  # tolera 1h de atraso
     )
+    # rollup analítico diário (depois do arquivamento, para contar os arquivados do dia)
+    archive_scheduler.add_job(
+        func=lambda: rollup_recent_once(app),
+        trigger="cron",
+        hour=rollup_hour,
+        minute=rollup_minute,
+        id="task_rollup_daily",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600,
+    )
+    # partições mensais de audit_logs (cria as próximas, arquiva as vencidas)
+    archive_scheduler.add_job(
+        func=lambda: maintain_audit_partitions_once(app),
+        trigger="cron",
+        hour=audit_hour,
+        minute=audit_minute,
+        id="audit_partitions_daily",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=3600,
+    )
     archive_scheduler.start()
     app.logger.info(
-        f"[ARCHIVE] Scheduler iniciado (diário {hour:02d}:{minute:02d} America/Sao_Paulo)."
+        f"[ARCHIVE] Scheduler iniciado (diário {hour:02d}:{minute:02d} America/Sao_Paulo; "
+        f"rollup {rollup_hour:02d}:{rollup_minute:02d}; auditoria {audit_hour:02d}:{audit_minute:02d})."
     )
     return archive_scheduler
 
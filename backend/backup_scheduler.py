@@ -411,6 +411,7 @@ class BackupScheduler:
                 resource_id=None,
                 ip_address=None,
                 user_agent="scheduler",
+                sync=True,  # _already_sent_weekly_today consulta este registro
             )
         except Exception:
             pass
@@ -6,6 +6,11 @@ from models.role_model import Role
 from models.team_model import Team
 from models.user_team_model import UserTeam
 from models.task_model import Task
+from models.task_participant_model import TaskParticipant
+from models.task_tombstone_model import TaskTombstone
+from models.task_change_model import TaskChange
+from models.team_tag_stat_model import TeamTagStat
+from models.task_daily_rollup_model import TaskDailyRollup
 from models.comment_model import Comment
 
 def create_db():
@@ -19,6 +24,11 @@ def create_db():
         print("   - teams")
         print("   - user_teams")
         print("   - tasks")
+        print("   - task_participants")
+        print("   - task_tombstones")
+        print("   - task_changes")
+        print("   - team_tag_stats")
+        print("   - task_daily_rollup")
         print("   - comments")
 
 if __name__ == '__main__':
@@ -0,0 +1,129 @@
+# jobs/analytics_rollup.py
+"""
+Rollup diário de tasks (task_daily_rollup).
+
+Cada execução recalcula um intervalo de dias inteiro (DELETE + INSERT ... SELECT),
+então é idempotente. O job noturno refaz os últimos ROLLUP_DAYS dias (pega
+alterações tardias do dia anterior); o backfill percorre o histórico em blocos.
+
+Uso: python manage.py backfill-task-rollup [--since AAAA-MM-DD]
+"""
+import logging
+from datetime import date, datetime, timedelta
+
+from pytz import timezone
+from sqlalchemy import func, text
+
+from extensions import db
+from models.task_model import Task
+
+log = logging.getLogger("analytics_rollup")
+
+TZ_NAME = "America/Sao_Paulo"
+ROLLUP_DAYS = 2
+BACKFILL_CHUNK_DAYS = 31
+
+
+def _local(col: str) -> str:
+    # timestamps gravados em UTC naive -> horário local
+    return f"(({col} AT TIME ZONE 'UTC') AT TIME ZONE '{TZ_NAME}')"
+
+
+_DIMS = "t.team_id, t.user_id, t.status, t.prioridade, t.categoria"
+
+_ROLLUP_SQL = f"""
+INSERT INTO task_daily_rollup
+       (day, team_id, user_id, status, prioridade, categoria, created, completed, overdue, archived)
+SELECT x.day, x.team_id, x.user_id, x.status, x.prioridade, x.categoria,
+       sum(x.created), sum(x.completed), sum(x.overdue), sum(x.archived)
+  FROM (
+        SELECT {_local('t.created_at')}::date AS day, {_DIMS}, 1 AS created, 0 AS completed, 0 AS overdue, 0 AS archived
+          FROM tasks t
+         WHERE t.deleted_at IS NULL
+           AND t.created_at >= :start_utc AND t.created_at < :end_utc
+        UNION ALL
+        SELECT {_local('t.completed_at')}::date, {_DIMS}, 0, 1, 0, 0
+          FROM tasks t
+         WHERE t.deleted_at IS NULL
+           AND t.completed_at >= :start_utc AND t.completed_at < :end_utc
+        UNION ALL
+        SELECT {_local('t.archived_at')}::date, {_DIMS}, 0, 0, 0, 1
+          FROM tasks t
+         WHERE t.deleted_at IS NULL
+           AND t.archived_at >= :start_utc AND t.archived_at < :end_utc
+        UNION ALL
+        -- vencidas ao fim de cada dia: criadas antes, vencimento antes, não concluídas até lá
+        SELECT d.day::date, {_DIMS}, 0, 0, 1, 0
+          FROM generate_series(CAST(:start_day AS date), CAST(:end_day AS date), interval '1 day') AS d(day)
+          JOIN tasks t
+            ON {_local('t.created_at')} < d.day + interval '1 day'
+           AND {_local('t.due_date')} < d.day + interval '1 day'
+           AND (t.completed_at IS NULL OR {_local('t.completed_at')} >= d.day + interval '1 day')
+         WHERE t.deleted_at IS NULL
+           AND t.due_date IS NOT NULL
+           AND t.due_date < :end_utc
+           AND t.status <> 'cancelled'
+       ) x
+ GROUP BY x.day, x.team_id, x.user_id, x.status, x.prioridade, x.categoria
+"""
+
+
+def _utc_bounds(start_day: date, end_day: date):
+    """[início de start_day, fim de end_day) local convertidos para UTC naive."""
+    tz = timezone(TZ_NAME)
+    start = tz.localize(datetime.combine(start_day, datetime.min.time()))
+    end = tz.localize(datetime.combine(end_day + timedelta(days=1), datetime.min.time()))
+    return (start.astimezone(timezone("UTC")).replace(tzinfo=None),
+            end.astimezone(timezone("UTC")).replace(tzinfo=None))
+
+
+def rollup_days(start_day: date, end_day: date) -> int:
+    """Recalcula task_daily_rollup para [start_day, end_day]. Retorna linhas gravadas."""
+    start_utc, end_utc = _utc_bounds(start_day, end_day)
+    db.session.execute(
+        text("DELETE FROM task_daily_rollup WHERE day BETWEEN :start_day AND :end_day"),
+        {"start_day": start_day, "end_day": end_day},
+    )
+    result = db.session.execute(text(_ROLLUP_SQL), {
+        "start_day": start_day, "end_day": end_day,
+        "start_utc": start_utc, "end_utc": end_utc,
+    })
+    db.session.commit()
+    return result.rowcount or 0
+
+
+def _today_local() -> date:
+    return datetime.now(timezone(TZ_NAME)).date()
+
+
+def rollup_recent_once(app, days: int = ROLLUP_DAYS) -> int:
+    """Job noturno: refaz os últimos `days` dias fechados (até ontem)."""
+    with app.app_context():
+        end_day = _today_local() - timedelta(days=1)
+        start_day = end_day - timedelta(days=days - 1)
+        try:
+            rows = rollup_days(start_day, end_day)
+        except Exception:
+            db.session.rollback()
+            app.logger.exception("[ROLLUP] Falha ao gerar rollup diário")
+            return 0
+        app.logger.info(f"[ROLLUP] {start_day}..{end_day}: {rows} linha(s).")
+        return rows
+
+
+def backfill_task_rollup(since: date | None = None) -> int:
+    """Gera o histórico inteiro (ou desde `since`) até ontem, em blocos de dias."""
+    if since is None:
+        first = db.session.query(func.min(Task.created_at)).scalar()
+        if first is None:
+            return 0
+        since = first.date()
+    end = _today_local() - timedelta(days=1)
+    total = 0
+    start = since
+    while start <= end:
+        chunk_end = min(start + timedelta(days=BACKFILL_CHUNK_DAYS - 1), end)
+        total += rollup_days(start, chunk_end)
+        start = chunk_end + timedelta(days=1)
+    log.info("[ROLLUP] backfill desde %s: %s linha(s)", since, total)
+    return total
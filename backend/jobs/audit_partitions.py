@@ -0,0 +1,189 @@
+# jobs/audit_partitions.py
+"""
+Partições mensais de audit_logs (Postgres, PARTITION BY RANGE (created_at)).
+
+- audit_logs_default (DEFAULT) é criada junto com a tabela: nenhum insert
+  falha por falta de partição.
+- O job diário garante as partições do mês corrente e dos próximos
+  AUDIT_PARTITIONS_AHEAD meses; meses que caíram na DEFAULT (ex.: dados
+  migrados) são recortados de lá para a partição própria.
+- Retenção: partições com mais de AUDIT_RETENTION_MONTHS meses são exportadas
+  para NDJSON comprimido em <backups>/audit_archive/<partição>.ndjson.gz e
+  depois desanexadas (DETACH) e apagadas.
+Meses em UTC (created_at é gravado em UTC naive).
+
+Consultas com filtro de data em created_at (listagem/exportação da
+auditoria) só leem as partições do intervalo (partition pruning).
+
+Tabela antiga (não particionada): convertida pela migração 50ba41492f92
+(flask db upgrade).
+"""
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+
+from sqlalchemy import column, text
+
+from backup_config import BackupConfig
+from extensions import db
+from models.audit_log_model import AuditLog
+
+log = logging.getLogger("audit_partitions")
+
+AUDIT_RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", "12"))
+AUDIT_PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", "2"))
+ARCHIVE_BATCH = 5000  # linhas por fetch ao exportar uma partição
+
+PARENT = "audit_logs"
+DEFAULT_PARTITION = "audit_logs_default"
+_PARTITION_RE = re.compile(r"^audit_logs_(\d{4})_(\d{2})$")
+
+_COLUMNS = [c.name for c in AuditLog.__table__.columns]
+
+
+def archive_dir() -> str:
+    return os.path.join(BackupConfig.BACKUP_BASE_DIR, "audit_archive")
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_{month.year:04d}_{month.month:02d}"
+
+
+def is_partitioned(conn) -> bool:
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    ), {"name": PARENT}).first() is not None
+
+
+def monthly_partitions(conn) -> dict:
+    """{primeiro dia do mês: nome} das partições mensais anexadas."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :name AND pg_table_is_visible(p.oid)"
+    ), {"name": PARENT}).scalars()
+    out = {}
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if m:
+            out[date(int(m.group(1)), int(m.group(2)), 1)] = name
+    return out
+
+
+def _months_in_default(conn) -> list:
+    rows = conn.execute(text(
+        f"SELECT DISTINCT date_trunc('month', created_at)::date FROM {DEFAULT_PARTITION}"
+    )).scalars()
+    return sorted(rows)
+
+
+def create_partition(conn, month: date) -> str:
+    """
+    Cria a partição do mês. Linhas do mês que estejam na DEFAULT são movidas
+    antes do ATTACH (senão o Postgres recusa a partição nova).
+    """
+    name = partition_name(month)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": start, "end": end})
+    conn.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    return name
+
+
+def export_partition(conn, name: str) -> tuple[str, int]:
+    """Grava a partição em NDJSON.gz (arquivo temporário + rename). Retorna (caminho, linhas)."""
+    os.makedirs(archive_dir(), exist_ok=True)
+    path = os.path.join(archive_dir(), f"{name}.ndjson.gz")
+    tmp = path + ".tmp"
+    rows = 0
+    result = conn.execution_options(stream_results=True, yield_per=ARCHIVE_BATCH).execute(
+        text(f"SELECT {', '.join(_COLUMNS)} FROM {name} ORDER BY created_at, id")
+        .columns(*[column(c.name, c.type) for c in AuditLog.__table__.columns])
+    )
+    with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+        for row in result:
+            item = dict(zip(_COLUMNS, row))
+            item["created_at"] = item["created_at"].isoformat() if item["created_at"] else None
+            fh.write(json.dumps(item, ensure_ascii=False))
+            fh.write("\n")
+            rows += 1
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return path, rows
+
+
+def archive_partition(name: str) -> int | None:
+    """
+    Exporta e remove uma partição. Só desanexa se a contagem ainda bater com o
+    que foi exportado (senão tenta de novo na próxima execução). Retorna linhas arquivadas.
+    """
+    with db.engine.connect() as conn:
+        path, rows = export_partition(conn, name)
+    with db.engine.begin() as conn:
+        current = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+        if current != rows:
+            log.warning("[AUDIT] %s mudou durante a exportação (%s -> %s); fica para a próxima.", name, rows, current)
+            return None
+        conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    log.info("[AUDIT] %s arquivada em %s (%s linha(s)) e removida.", name, path, rows)
+    return rows
+
+
+def maintain_audit_partitions(today: date | None = None,
+                              months_ahead: int = AUDIT_PARTITIONS_AHEAD,
+                              retention_months: int = AUDIT_RETENTION_MONTHS) -> dict:
+    """Cria partições que faltam e arquiva as que passaram da retenção. Idempotente."""
+    today = today or datetime.utcnow().date()
+    current = today.replace(day=1)
+    cutoff = add_months(current, -retention_months)
+    summary = {"created": [], "archived": []}
+
+    with db.engine.begin() as conn:
+        if not is_partitioned(conn):
+            log.warning("[AUDIT] audit_logs não é particionada; rode 'flask db upgrade'.")
+            return summary
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+        existing = monthly_partitions(conn)
+        wanted = set(_months_in_default(conn))
+        wanted.update(add_months(current, i) for i in range(months_ahead + 1))
+        for month in sorted(wanted - set(existing)):
+            existing[month] = create_partition(conn, month)
+            summary["created"].append(existing[month])
+
+    for month, name in sorted(existing.items()):
+        if month < cutoff and archive_partition(name) is not None:
+            summary["archived"].append(name)
+    return summary
+
+
+def maintain_audit_partitions_once(app) -> dict:
+    """Job diário (archive_scheduler)."""
+    with app.app_context():
+        try:
+            summary = maintain_audit_partitions()
+        except Exception:
+            app.logger.exception("[AUDIT] Falha na manutenção das partições de audit_logs")
+            return {}
+        app.logger.info(
+            f"[AUDIT] Partições criadas: {summary['created'] or '-'} | arquivadas: {summary['archived'] or '-'}"
+        )
+        return summary
+
@@ -0,0 +1,131 @@
+# jobs/backfills.py
+"""
+Backfills de dados derivados (tabelas normalizadas / colunas materializadas).
+Idempotentes: podem rodar de novo sem duplicar nada.
+
+Uso: python manage.py backfill-task-participants
+     python manage.py backfill-subtask-progress
+     python manage.py backfill-team-tag-stats
+"""
+import logging
+
+from sqlalchemy import text
+
+from extensions import db
+
+log = logging.getLogger("backfills")
+
+
+def backfill_task_participants() -> int:
+    """
+    Popula task_participants a partir dos JSONs tasks.assigned_users/collaborators.
+    Feito em SQL (INSERT ... SELECT), sem carregar tasks no Python.
+    Ignora ids não numéricos e usuários inexistentes. Retorna linhas inseridas.
+    A carga inicial já roda na migração 7427045499b4; aqui serve para ressincronizar.
+    """
+    inserted = 0
+    for column, role in (("assigned_users", "assignee"), ("collaborators", "collaborator")):
+        result = db.session.execute(text(f"""
+            INSERT INTO task_participants (task_id, user_id, role)
+            SELECT DISTINCT p.task_id, u.id, :role
+              FROM (
+                    SELECT t.id AS task_id,
+                           CASE WHEN e.value ~ '^[0-9]+$' THEN e.value::int END AS uid
+                      FROM tasks t
+                     CROSS JOIN LATERAL jsonb_array_elements_text(
+                           CASE WHEN jsonb_typeof(t.{column}::jsonb) = 'array'
+                                THEN t.{column}::jsonb ELSE '[]'::jsonb END
+                     ) AS e(value)
+                   ) p
+              JOIN users u ON u.id = p.uid
+            ON CONFLICT DO NOTHING
+        """), {"role": role})
+        inserted += result.rowcount or 0
+    db.session.commit()
+    log.info("[BACKFILL] task_participants: %s linha(s) inserida(s)", inserted)
+    return inserted
+
+
+def backfill_subtask_progress(batch_size: int = 500) -> int:
+    """
+    Preenche tasks.subtasks_total/done/percent a partir do JSON subtasks.
+    O cálculo (pesos, subtarefas sem título) é o do modelo, então roda no Python
+    em lotes por id. updated_at avança nas tasks alteradas: o progresso aparece
+    na resposta, então o ETag (services/http_cache) precisa mudar.
+    Retorna tasks atualizadas.
+    """
+    from sqlalchemy import update
+    from sqlalchemy.orm import load_only
+    from models.task_model import Task
+
+    updated = 0
+    last_id = 0
+    while True:
+        tasks = (
+            Task.query.options(load_only(
+                Task.id, Task.subtasks, Task.subtasks_total, Task.subtasks_done, Task.subtasks_percent,
+            ))
+            .filter(Task.id > last_id)
+            .order_by(Task.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not tasks:
+            break
+        for t in tasks:
+            counts = t.subtask_counts()
+            if (t.subtasks_total, t.subtasks_done, t.subtasks_percent) == (
+                counts["total"], counts["done"], counts["percent"]
+            ):
+                continue
+            db.session.execute(
+                update(Task)
+                .where(Task.id == t.id)
+                .values(
+                    subtasks_total=counts["total"],
+                    subtasks_done=counts["done"],
+                    subtasks_percent=counts["percent"],
+                )
+            )
+            updated += 1
+        last_id = tasks[-1].id
+        db.session.commit()
+        db.session.expunge_all()
+    log.info("[BACKFILL] progresso de subtarefas: %s task(s) atualizada(s)", updated)
+    return updated
+
+
+def backfill_team_tag_stats() -> int:
+    """
+    Recalcula team_tag_stats do zero a partir de tasks.tags (tasks com equipe,
+    fora da lixeira). Tags podem ser nomes ou objetos legados {"name", "color"}.
+    Retorna linhas gravadas.
+    """
+    db.session.execute(text("DELETE FROM team_tag_stats"))
+    result = db.session.execute(text("""
+        INSERT INTO team_tag_stats (team_id, tag_slug, color, usage_count, last_used_at)
+        SELECT x.team_id,
+               x.slug,
+               max(x.color),
+               count(DISTINCT x.task_id),
+               max(x.used_at)
+          FROM (
+                SELECT t.id AS task_id,
+                       t.team_id,
+                       left(lower(regexp_replace(btrim(coalesce(e->>'name', e->>'label', e #>> '{}')), '\\s+', ' ', 'g')), 80) AS slug,
+                       CASE WHEN e->>'color' ~ '^#[0-9A-Fa-f]{6}$' THEN e->>'color' END AS color,
+                       coalesce(t.updated_at, t.created_at) AS used_at
+                  FROM tasks t
+                 CROSS JOIN LATERAL jsonb_array_elements(
+                       CASE WHEN jsonb_typeof(t.tags::jsonb) = 'array' THEN t.tags::jsonb ELSE '[]'::jsonb END
+                 ) AS e
+                 WHERE t.team_id IS NOT NULL
+                   AND t.deleted_at IS NULL
+               ) x
+         WHERE x.slug <> ''
+         GROUP BY x.team_id, x.slug
+    """))
+    db.session.commit()
+    written = result.rowcount or 0
+    log.info("[BACKFILL] team_tag_stats: %s linha(s)", written)
+    return written
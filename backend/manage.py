@@ -1,7 +1,56 @@
+import click
 from flask.cli import FlaskGroup
 from app import app, db
 
 cli = FlaskGroup(app)
 
+
+@cli.command("backfill-task-participants")
+def backfill_task_participants_cmd():
+    """Popula task_participants a partir de tasks.assigned_users/collaborators."""
+    from jobs.backfills import backfill_task_participants
+    print(f"task_participants: {backfill_task_participants()} linha(s) inserida(s)")
+
+
+@cli.command("backfill-subtask-progress")
+def backfill_subtask_progress_cmd():
+    """Preenche tasks.subtasks_total/done/percent a partir do JSON subtasks."""
+    from jobs.backfills import backfill_subtask_progress
+    print(f"subtasks: {backfill_subtask_progress()} task(s) atualizada(s)")
+
+
+@cli.command("backfill-team-tag-stats")
+def backfill_team_tag_stats_cmd():
+    """Recalcula team_tag_stats a partir de tasks.tags."""
+    from jobs.backfills import backfill_team_tag_stats
+    print(f"team_tag_stats: {backfill_team_tag_stats()} linha(s)")
+
+
+@cli.command("backfill-task-rollup")
+@click.option("--since", default=None, help="Primeiro dia (AAAA-MM-DD). Padrão: task mais antiga.")
+def backfill_task_rollup_cmd(since):
+    """Gera task_daily_rollup para o histórico (até ontem)."""
+    from datetime import date
+    from jobs.analytics_rollup import backfill_task_rollup
+    since_day = date.fromisoformat(since) if since else None
+    print(f"task_daily_rollup: {backfill_task_rollup(since_day)} linha(s)")
+
+
+@cli.command("setup-task-search")
+def setup_task_search_cmd():
+    """Cria unaccent + configuração pt_unaccent e recalcula tasks.search_vector."""
+    from services.task_search import ensure_search_setup, backfill_search_vectors
+    ensure_search_setup()
+    print(f"search_vector: {backfill_search_vectors()} task(s) indexada(s)")
+
+
+@cli.command("maintain-audit-partitions")
+def maintain_audit_partitions_cmd():
+    """Roda agora a manutenção diária das partições de audit_logs."""
+    from jobs.audit_partitions import maintain_audit_partitions
+    summary = maintain_audit_partitions()
+    print(f"criadas: {summary['created'] or '-'} | arquivadas: {summary['archived'] or '-'}")
+
+
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,34 @@
+"""task owner/team indexes
+
+Revision ID: 029de2b23ee8
+Revises: fd92b541a05f
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '029de2b23ee8'
+down_revision = 'fd92b541a05f'
+branch_labels = None
+depends_on = None
+
+# filtros de visibilidade (dono, quem atribuiu, equipe); ver revisão fd92b541a05f
+INDEXES = {
+    'ix_tasks_user_id': '(user_id)',
+    'ix_tasks_assigned_by_user_id': '(assigned_by_user_id)',
+    'ix_tasks_team_id': '(team_id)',
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON tasks {columns}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
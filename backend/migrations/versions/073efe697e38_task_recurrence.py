@@ -0,0 +1,50 @@
+"""task recurrence
+
+Revision ID: 073efe697e38
+Revises: 7c5a564e6f01
+Create Date: 2026-10-17 11:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '073efe697e38'
+down_revision = '7c5a564e6f01'
+branch_labels = None
+depends_on = None
+
+# mesmas definições de models/task_model.py (services/recurrence)
+COLUMNS = (
+    "recurrence_rule VARCHAR(255)",
+    "recurrence_start TIMESTAMP WITHOUT TIME ZONE",
+    "recurrence_parent_id INTEGER REFERENCES tasks (id) ON DELETE SET NULL",
+    "recurrence_date TIMESTAMP WITHOUT TIME ZONE",
+)
+
+INDEXES = {
+    "ix_tasks_recurring_series": (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_recurring_series ON tasks (due_date) "
+        "WHERE recurrence_rule IS NOT NULL AND deleted_at IS NULL"
+    ),
+    "uq_tasks_recurrence_occurrence": (
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_tasks_recurrence_occurrence "
+        "ON tasks (recurrence_parent_id, recurrence_date)"
+    ),
+}
+
+
+def upgrade():
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE tasks ADD COLUMN IF NOT EXISTS {column}")
+    with op.get_context().autocommit_block():
+        for sql in INDEXES.values():
+            op.execute(sql)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    for column in reversed(COLUMNS):
+        op.execute(f"ALTER TABLE tasks DROP COLUMN IF EXISTS {column.split()[0]}")
@@ -0,0 +1,48 @@
+"""task search vector
+
+Revision ID: 2e73a76742da
+Revises: 7427045499b4
+Create Date: 2026-10-17 09:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2e73a76742da'
+down_revision = '7427045499b4'
+branch_labels = None
+depends_on = None
+
+# mesma configuração de services/task_search (portuguese + unaccent)
+SETUP_SQL = """
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN
+        CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END
+$$;
+"""
+
+
+def upgrade():
+    op.execute(SETUP_SQL)
+    # vetores começam NULL (a listagem cai no ILIKE para eles);
+    # carga inicial: python manage.py setup-task-search
+    op.execute("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector")
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_search_vector "
+            "ON tasks USING gin (search_vector)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_search_vector")
+    op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS search_vector")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS pt_unaccent")
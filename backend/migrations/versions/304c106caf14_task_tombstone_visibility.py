@@ -0,0 +1,27 @@
+"""task tombstone visibility
+
+Revision ID: 304c106caf14
+Revises: ba0bfc2ec490
+Create Date: 2026-10-17 10:40:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '304c106caf14'
+down_revision = 'ba0bfc2ec490'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # tombstones antigos ficam sem user_ids: não são entregues a usuários comuns
+    op.execute("ALTER TABLE task_tombstones ADD COLUMN IF NOT EXISTS kind VARCHAR(10) NOT NULL DEFAULT 'purged'")
+    op.execute("ALTER TABLE task_tombstones ADD COLUMN IF NOT EXISTS user_ids JSONB")
+
+
+def downgrade():
+    op.execute("DELETE FROM task_tombstones WHERE kind <> 'purged'")
+    op.execute("ALTER TABLE task_tombstones DROP COLUMN IF EXISTS user_ids")
+    op.execute("ALTER TABLE task_tombstones DROP COLUMN IF EXISTS kind")
@@ -0,0 +1,105 @@
+"""partition audit_logs
+
+Revision ID: 50ba41492f92
+Revises: 073efe697e38
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '50ba41492f92'
+down_revision = '073efe697e38'
+branch_labels = None
+depends_on = None
+
+COLUMNS = "id, user_id, action, resource_type, resource_id, description, ip_address, user_agent, created_at"
+
+# mesmas definições de models/audit_log_model.py
+INDEXES_SQL = """
+CREATE INDEX ix_audit_logs_created_at_id ON audit_logs (created_at, id);
+CREATE INDEX ix_audit_logs_action_created_at ON audit_logs (action, created_at, id);
+CREATE INDEX ix_audit_logs_user_created_at ON audit_logs (user_id, created_at, id);
+CREATE INDEX ix_audit_logs_resource_created_at ON audit_logs (resource_type, resource_id, created_at, id);
+"""
+
+PARTITIONED_SQL = """
+CREATE TABLE audit_logs (
+    id SERIAL NOT NULL,
+    user_id INTEGER REFERENCES users (id),
+    action VARCHAR(50) NOT NULL,
+    resource_type VARCHAR(50),
+    resource_id INTEGER,
+    description TEXT NOT NULL,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT;
+""" + INDEXES_SQL
+
+PLAIN_SQL = """
+CREATE TABLE audit_logs (
+    id SERIAL NOT NULL PRIMARY KEY,
+    user_id INTEGER REFERENCES users (id),
+    action VARCHAR(50) NOT NULL,
+    resource_type VARCHAR(50),
+    resource_id INTEGER,
+    description TEXT NOT NULL,
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    created_at TIMESTAMP WITHOUT TIME ZONE
+);
+""" + INDEXES_SQL
+
+
+def _is_partitioned(conn) -> bool:
+    return conn.execute(sa.text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'audit_logs' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+def _swap(conn, create_sql: str, select_cols: str):
+    """
+    Renomeia audit_logs (+ índices e sequence, cujos nomes são globais no schema)
+    para audit_logs_old, cria a tabela nova, copia as linhas, acerta a sequence
+    e apaga a antiga. Tudo na transação da migração.
+    """
+    conn.execute(sa.text("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(sa.text("ALTER TABLE audit_logs RENAME TO audit_logs_old"))
+    for (index_name,) in conn.execute(sa.text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'audit_logs_old' AND schemaname = current_schema()"
+    )).all():
+        conn.execute(sa.text(f"ALTER INDEX {index_name} RENAME TO {index_name}_old"))
+    conn.execute(sa.text("ALTER SEQUENCE IF EXISTS audit_logs_id_seq RENAME TO audit_logs_old_id_seq"))
+
+    conn.execute(sa.text(create_sql))
+    conn.execute(sa.text(f"INSERT INTO audit_logs ({COLUMNS}) SELECT {select_cols} FROM audit_logs_old"))
+    conn.execute(sa.text(
+        "SELECT setval(pg_get_serial_sequence('audit_logs', 'id'), "
+        "(SELECT COALESCE(MAX(id), 0) + 1 FROM audit_logs), false)"
+    ))
+    conn.execute(sa.text("DROP TABLE audit_logs_old CASCADE"))
+
+
+def upgrade():
+    # banco criado por db.create_all() já nasce particionado
+    conn = op.get_bind()
+    if _is_partitioned(conn):
+        return
+    # linhas antigas sem created_at vão para "agora" (a chave de partição é NOT NULL);
+    # tudo entra na DEFAULT e o job diário (jobs/audit_partitions) recorta os meses
+    _swap(conn, PARTITIONED_SQL, COLUMNS.replace(
+        "created_at", "COALESCE(created_at, now() AT TIME ZONE 'UTC')"
+    ))
+
+
+def downgrade():
+    conn = op.get_bind()
+    if not _is_partitioned(conn):
+        return
+    _swap(conn, PLAIN_SQL, COLUMNS)
@@ -0,0 +1,29 @@
+"""users/teams/tags updated_at
+
+Revision ID: 631cecbe4b6c
+Revises: 2e73a76742da
+Create Date: 2026-10-17 10:20:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '631cecbe4b6c'
+down_revision = '2e73a76742da'
+branch_labels = None
+depends_on = None
+
+# versão dos dados referenciados pelas tasks (services/http_cache.reference_version)
+TABLES = ("users", "teams", "tags")
+
+
+def upgrade():
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITHOUT TIME ZONE")
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, now() AT TIME ZONE 'UTC') WHERE updated_at IS NULL")
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS updated_at")
@@ -0,0 +1,54 @@
+"""task participants
+
+Revision ID: 7427045499b4
+Revises: 029de2b23ee8
+Create Date: 2026-10-17 09:05:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7427045499b4'
+down_revision = '029de2b23ee8'
+branch_labels = None
+depends_on = None
+
+# mesma definição de models/task_participant_model.py
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS task_participants (
+    task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    PRIMARY KEY (task_id, user_id, role)
+);
+CREATE INDEX IF NOT EXISTS ix_task_participants_user_role_task ON task_participants (user_id, role, task_id);
+"""
+
+# mesmo INSERT ... SELECT de jobs/backfills.backfill_task_participants: os filtros de
+# visibilidade (services/task_visibility) só leem esta tabela, então ela não pode nascer vazia
+BACKFILL_SQL = """
+INSERT INTO task_participants (task_id, user_id, role)
+SELECT DISTINCT p.task_id, u.id, '{role}'
+  FROM (
+        SELECT t.id AS task_id,
+               CASE WHEN e.value ~ '^[0-9]+$' THEN e.value::int END AS uid
+          FROM tasks t
+         CROSS JOIN LATERAL jsonb_array_elements_text(
+               CASE WHEN jsonb_typeof(t.{column}::jsonb) = 'array'
+                    THEN t.{column}::jsonb ELSE '[]'::jsonb END
+         ) AS e(value)
+       ) p
+  JOIN users u ON u.id = p.uid
+ON CONFLICT DO NOTHING
+"""
+
+
+def upgrade():
+    op.execute(CREATE_SQL)
+    for column, role in (("assigned_users", "assignee"), ("collaborators", "collaborator")):
+        op.execute(BACKFILL_SQL.format(column=column, role=role))
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS task_participants")
@@ -0,0 +1,85 @@
+"""task subtask progress
+
+Revision ID: 7c5a564e6f01
+Revises: 304c106caf14
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c5a564e6f01'
+down_revision = '304c106caf14'
+branch_labels = None
+depends_on = None
+
+BATCH = 500
+COLUMNS = ("subtasks_total", "subtasks_done", "subtasks_percent")
+
+tasks = sa.table(
+    "tasks",
+    sa.column("id", sa.Integer),
+    sa.column("subtasks", sa.JSON),
+    sa.column("subtasks_total", sa.Integer),
+    sa.column("subtasks_done", sa.Integer),
+    sa.column("subtasks_percent", sa.Integer),
+    sa.column("updated_at", sa.DateTime),
+)
+
+
+def _backfill(conn):
+    """
+    Mesmo cálculo de jobs/backfills.backfill_subtask_progress (Task.subtask_counts),
+    mas na conexão da migração: as colunas novas ainda não estão comitadas.
+    """
+    from models.task_model import Task
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(tasks.c.id, tasks.c.subtasks)
+            .where(tasks.c.id > last_id)
+            .order_by(tasks.c.id)
+            .limit(BATCH)
+        ).all()
+        if not rows:
+            return
+        for task_id, subtasks in rows:
+            if not subtasks:
+                continue
+            counts = Task(id=task_id, subtasks=subtasks).subtask_counts()
+            if not counts["total"]:
+                continue
+            conn.execute(
+                tasks.update()
+                .where(tasks.c.id == task_id)
+                .values(
+                    subtasks_total=counts["total"],
+                    subtasks_done=counts["done"],
+                    subtasks_percent=counts["percent"],
+                    updated_at=datetime.utcnow(),  # progresso novo na resposta: muda o ETag
+                )
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    for name in COLUMNS:
+        op.execute(f"ALTER TABLE tasks ADD COLUMN IF NOT EXISTS {name} INTEGER NOT NULL DEFAULT 0")
+    _backfill(op.get_bind())
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_subtasks_percent_id "
+            "ON tasks (subtasks_percent, id)"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_subtasks_percent_id")
+    for name in COLUMNS:
+        op.execute(f"ALTER TABLE tasks DROP COLUMN IF EXISTS {name}")
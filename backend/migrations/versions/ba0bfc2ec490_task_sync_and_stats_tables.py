@@ -0,0 +1,79 @@
+"""task sync and stats tables
+
+Revision ID: ba0bfc2ec490
+Revises: 631cecbe4b6c
+Create Date: 2026-10-17 10:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'ba0bfc2ec490'
+down_revision = '631cecbe4b6c'
+branch_labels = None
+depends_on = None
+
+# mesmas definições dos models (task_tombstone, task_change, team_tag_stat,
+# task_daily_rollup); IF NOT EXISTS porque bancos criados pelo init_db já as têm.
+# task_tombstones nasce no formato original: 304c106caf14 acrescenta kind/user_ids/team_id.
+TABLES = {
+    "task_tombstones": """
+        CREATE TABLE IF NOT EXISTS task_tombstones (
+            id SERIAL PRIMARY KEY,
+            task_id INTEGER NOT NULL,
+            purged_at TIMESTAMP WITHOUT TIME ZONE NOT NULL
+        )
+    """,
+    "task_changes": """
+        CREATE TABLE IF NOT EXISTS task_changes (
+            id SERIAL PRIMARY KEY,
+            task_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+            actor_id INTEGER REFERENCES users (id) ON DELETE SET NULL,
+            at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            changes JSONB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_task_changes_task_at ON task_changes (task_id, at, id)
+    """,
+    "team_tag_stats": """
+        CREATE TABLE IF NOT EXISTS team_tag_stats (
+            team_id INTEGER NOT NULL REFERENCES teams (id) ON DELETE CASCADE,
+            tag_slug VARCHAR(80) NOT NULL,
+            color VARCHAR(7),
+            usage_count INTEGER NOT NULL DEFAULT 0,
+            last_used_at TIMESTAMP WITHOUT TIME ZONE,
+            PRIMARY KEY (team_id, tag_slug)
+        );
+        CREATE INDEX IF NOT EXISTS ix_team_tag_stats_team_usage ON team_tag_stats (team_id, usage_count)
+    """,
+    "task_daily_rollup": """
+        CREATE TABLE IF NOT EXISTS task_daily_rollup (
+            id SERIAL PRIMARY KEY,
+            day DATE NOT NULL,
+            team_id INTEGER,
+            user_id INTEGER,
+            status VARCHAR(20),
+            prioridade VARCHAR(20),
+            categoria VARCHAR(50),
+            created INTEGER NOT NULL,
+            completed INTEGER NOT NULL,
+            overdue INTEGER NOT NULL,
+            archived INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_task_daily_rollup_day ON task_daily_rollup (day);
+        CREATE INDEX IF NOT EXISTS ix_task_daily_rollup_team_day ON task_daily_rollup (team_id, day);
+        CREATE INDEX IF NOT EXISTS ix_task_daily_rollup_user_day ON task_daily_rollup (user_id, day)
+    """,
+}
+
+
+def upgrade():
+    # team_tag_stats/task_daily_rollup começam vazias:
+    # manage.py backfill-team-tag-stats e backfill-task-rollup
+    for sql in TABLES.values():
+        op.execute(sql)
+
+
+def downgrade():
+    for name in reversed(TABLES):
+        op.execute(f"DROP TABLE IF EXISTS {name}")
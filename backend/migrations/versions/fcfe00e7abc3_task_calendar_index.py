@@ -0,0 +1,33 @@
+"""task calendar index
+
+Revision ID: fcfe00e7abc3
+Revises: 50ba41492f92
+Create Date: 2026-10-17 12:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'fcfe00e7abc3'
+down_revision = '50ba41492f92'
+branch_labels = None
+depends_on = None
+
+# GET /tasks/calendar: faixa de due_date fora da lixeira com as colunas do payload
+# compacto no índice (index-only scan). Mesma definição de models/task_model.py;
+# db.create_all() não acrescenta índices a uma tabela tasks que já existe.
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_calendar_due_date "
+            "ON tasks (due_date, id) INCLUDE (title, status, prioridade, team_id) "
+            "WHERE deleted_at IS NULL"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_calendar_due_date")
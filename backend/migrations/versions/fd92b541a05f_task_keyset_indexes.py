@@ -0,0 +1,43 @@
+"""task keyset indexes
+
+Revision ID: fd92b541a05f
+Revises: ae8c355d3099
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'fd92b541a05f'
+down_revision = 'ae8c355d3099'
+branch_labels = None
+depends_on = None
+
+# (coluna de ordenação, id) para a paginação por cursor das listas de tasks.
+# CONCURRENTLY não bloqueia escrita em tasks; IF NOT EXISTS cobre bancos
+# criados por db.create_all() (init_db.py), que já têm os índices do model.
+INDEXES = {
+    'ix_tasks_due_date_id': '(due_date, id)',
+    'ix_tasks_created_at_id': '(created_at, id)',
+    'ix_tasks_updated_at_id': '(updated_at, id)',
+    'ix_tasks_archived_at_id': '(archived_at, id)',
+    'ix_tasks_deleted_at_id': '(deleted_at, id)',
+    # mesma expressão de models.task_model.prioridade_rank
+    'ix_tasks_prioridade_rank_id': (
+        "((CASE prioridade WHEN 'urgente' THEN 0 WHEN 'alta' THEN 1 "
+        "WHEN 'media' THEN 2 WHEN 'baixa' THEN 3 ELSE 4 END), id)"
+    ),
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON tasks {columns}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -1,11 +1,29 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import DDL, event
 import json
+from services import audit_writer
 
 class AuditLog(db.Model):
+    """
+    No Postgres a tabela é particionada por mês em created_at (RANGE); a chave
+    primária inclui created_at porque o Postgres exige a chave de partição nela.
+    Por isso busca por chave precisa dos dois valores:
+    db.session.get(AuditLog, (id, created_at)); AuditLog.query.get(id) não funciona mais
+    (por id só: AuditLog.query.filter_by(id=...)).
+    Partições mensais, retenção e arquivamento: jobs/audit_partitions.py.
+    """
     __tablename__ = 'audit_logs'
+    __table_args__ = (
+        # keyset da listagem (created_at DESC, id DESC) e um índice por filtro suportado
+        db.Index('ix_audit_logs_created_at_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_action_created_at', 'action', 'created_at', 'id'),
+        db.Index('ix_audit_logs_user_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_audit_logs_resource_created_at', 'resource_type', 'resource_id', 'created_at', 'id'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
 
-    id = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     action = db.Column(db.String(50), nullable=False)
     resource_type = db.Column(db.String(50), nullable=True)
@@ -13,7 +31,7 @@ class AuditLog(db.Model):
     description = db.Column(db.Text, nullable=False)
     ip_address = db.Column(db.String(45), nullable=True)
     user_agent = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, primary_key=True, default=datetime.utcnow)
 
     user = db.relationship('User', backref='audit_logs')
 
@@ -58,15 +76,33 @@ class AuditLog(db.Model):
         except Exception:
             pass
 
-        log = AuditLog(
+        row = dict(
             user_id=user_id,
             action=action,
             resource_type=resource_type,
             resource_id=resource_id,
             description=description,
             ip_address=ip_address,
-            user_agent=user_agent
+            user_agent=user_agent,
+            created_at=datetime.utcnow(),
         )
+        # em lote (services/audit_writer): não faz commit na sessão de quem chamou e
+        # retorna None (a linha ainda não existe); sync=True ou modo síncrono grava
+        # na hora e retorna o AuditLog já com id
+        if not kwargs.get('sync') and audit_writer.enqueue(row):
+            return None
+
+        log = AuditLog(**row)
         db.session.add(log)
         db.session.commit()
         return log
+
+
+# partição DEFAULT criada junto com a tabela: inserts nunca falham por falta de
+# partição do mês; o job mensal move essas linhas para a partição certa
+event.listen(
+    AuditLog.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS audit_logs_default PARTITION OF audit_logs DEFAULT")
+    .execute_if(dialect="postgresql"),
+)
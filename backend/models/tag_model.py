@@ -18,6 +18,7 @@ class Tag(db.Model):
     color = db.Column(db.String(7), nullable=False)        # "#RRGGBB"
     created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # versão (ETag das tasks)
 
     __table_args__ = (
         Index("uq_tags_slug", "slug", unique=True),
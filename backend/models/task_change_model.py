@@ -0,0 +1,47 @@
+from extensions import db
+from datetime import datetime
+from sqlalchemy import Index
+from sqlalchemy.dialects.postgresql import JSONB
+
+class TaskChange(db.Model):
+    """
+    Histórico estruturado de edições de task (GET /api/tasks/<id>/history).
+    changes é o diff de diff_snapshots: {"campo": {"from", "to"}} ou
+    {"campo": {"added", "removed"}} para listas. A timeline lê pelo índice
+    (task_id, at, id), sem procurar nas descrições da auditoria.
+    """
+    __tablename__ = "task_changes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.Integer, db.ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    actor_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    changes = db.Column(JSONB, nullable=False)
+
+    actor = db.relationship("User")
+
+    __table_args__ = (
+        Index("ix_task_changes_task_at", "task_id", "at", "id"),
+    )
+
+    @classmethod
+    def record(cls, task_id: int, actor_id, changes: dict, at: datetime | None = None):
+        """Adiciona a mudança na sessão atual (commit junto com a edição). Diff vazio não grava."""
+        if not changes:
+            return None
+        change = cls(task_id=task_id, actor_id=actor_id, changes=changes, at=at or datetime.utcnow())
+        db.session.add(change)
+        return change
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "task_id": self.task_id,
+            "actor_id": self.actor_id,
+            "actor_name": self.actor.username if self.actor else "Sistema",
+            "at": self.at.isoformat() if self.at else None,
+            "changes": self.changes,
+        }
+
+    def __repr__(self):
+        return f"<TaskChange id={self.id} task_id={self.task_id}>"
@@ -0,0 +1,32 @@
+from extensions import db
+from sqlalchemy import Index
+
+class TaskDailyRollup(db.Model):
+    """
+    Fato diário de tasks (dia no fuso America/Sao_Paulo) por equipe, responsável,
+    status, prioridade e categoria. Preenchida por jobs/analytics_rollup.py
+    (job noturno + backfill); GET /api/analytics/trend lê só daqui.
+
+    created/completed/archived: tasks com o evento naquele dia.
+    overdue: tasks abertas e vencidas ao fim do dia (foto do dia).
+    """
+    __tablename__ = "task_daily_rollup"
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    team_id = db.Column(db.Integer, nullable=True)
+    user_id = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=True)
+    prioridade = db.Column(db.String(20), nullable=True)
+    categoria = db.Column(db.String(50), nullable=True)
+
+    created = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    overdue = db.Column(db.Integer, nullable=False, default=0)
+    archived = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_task_daily_rollup_day", "day"),
+        Index("ix_task_daily_rollup_team_day", "team_id", "day"),
+        Index("ix_task_daily_rollup_user_day", "user_id", "day"),
+    )
@@ -2,7 +2,11 @@ from extensions import db
 from datetime import datetime
 from sqlalchemy import JSON
 from sqlalchemy.orm import validates
-from sqlalchemy import Text
+from sqlalchemy import Text, Index, case
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# ordem de negócio das prioridades (usada para ordenar no SQL; desconhecidas vão pro fim)
+PRIORIDADE_ORDER = {"urgente": 0, "alta": 1, "media": 2, "baixa": 3}
 
 class Task(db.Model):
     __tablename__ = 'tasks'
@@ -36,6 +40,10 @@ class Task(db.Model):
     lembretes = db.Column(JSON, default=list)
     tags = db.Column(JSON, default=list)
     subtasks = db.Column(JSON, default=list)
+    # progresso materializado (mantido por refresh_subtask_progress quando subtasks mudam)
+    subtasks_total = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    subtasks_done = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    subtasks_percent = db.Column(db.Integer, nullable=False, default=0, server_default="0")
     anexos = db.Column(JSON, default=list)
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -45,10 +53,10 @@ class Task(db.Model):
     deleted_at = db.Column(db.DateTime, nullable=True, index=True)
     deleted_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     user = db.relationship('User', back_populates='tasks', foreign_keys=[user_id])
 
-    assigned_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    assigned_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
     assigned_by_user = db.relationship('User', foreign_keys=[assigned_by_user_id])
 
     deleted_by_user = db.relationship('User', foreign_keys=[deleted_by_user_id])
@@ -56,7 +64,15 @@ class Task(db.Model):
     collaborators = db.Column(JSON, default=list)
     assigned_users = db.Column(JSON, default=list)
 
-    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=True)
+    # versão normalizada de assigned_users/collaborators (ver sync_participants)
+    participants = db.relationship(
+        'TaskParticipant',
+        back_populates='task',
+        cascade='all, delete-orphan',
+        passive_deletes=True
+    )
+
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=True, index=True)
     team = db.relationship('Team', backref='tasks')
 
     ms_event_id    = db.Column(db.String(512)) 
@@ -65,6 +81,17 @@ class Task(db.Model):
     ms_last_sync   = db.Column(db.DateTime,    nullable=True)
     ms_sync_status = db.Column(db.String(32))    # "ok","error","deleted"
 
+    # --- recorrência (services/recurrence) ---
+    # série: regra RRULE + início original; a linha é a ocorrência atual (due_date)
+    recurrence_rule = db.Column(db.String(255), nullable=True)
+    recurrence_start = db.Column(db.DateTime, nullable=True)
+    # ocorrência materializada: série de origem + data original da ocorrência
+    recurrence_parent_id = db.Column(db.Integer, db.ForeignKey('tasks.id', ondelete='SET NULL'), nullable=True)
+    recurrence_date = db.Column(db.DateTime, nullable=True)
+
+    # busca textual (título/tags/descrição/comentários) - mantido por services/task_search
+    search_vector = db.deferred(db.Column(TSVECTOR, nullable=True))
+
     @validates('approval_status')
     def _validate_approval_status(self, key, value):
         if value is None:
@@ -149,50 +176,62 @@ class Task(db.Model):
         self.archived_at = None
         self.archived_by_user_id = None
 
-    def to_dict(self):
+    @staticmethod
+    def _user_info(u):
+        if not u:
+            return None
+        return {
+            "id": u.id,
+            "name": u.username,
+            "username": u.username,
+            "email": u.email
+        }
+
+    def to_dict(self, users_by_id=None, teams_by_id=None):
+        """
+        Serializa a task. Quem serializa em lote (services/task_serializer) passa
+        users_by_id/teams_by_id já carregados, evitando uma query por usuário/relação.
+        """
         from models.user_model import User
 
+        if users_by_id is None:
+            def _user(uid):
+                return User.query.get(uid) if uid is not None else None
+            user = self.user
+            assigned_by_user = self.assigned_by_user
+            approved_by_user = self.approved_by_user
+            archived_by_user = self.archived_by_user
+            deleted_by_user = self.deleted_by_user
+        else:
+            def _user(uid):
+                try:
+                    return users_by_id.get(int(uid))
+                except (TypeError, ValueError):
+                    return None
+            user = _user(self.user_id)
+            assigned_by_user = _user(self.assigned_by_user_id)
+            approved_by_user = _user(self.approved_by_user_id)
+            archived_by_user = _user(self.archived_by_user_id)
+            deleted_by_user = _user(self.deleted_by_user_id)
+
+        if teams_by_id is None:
+            team = self.team
+        else:
+            team = teams_by_id.get(self.team_id) if self.team_id is not None else None
+
         assigned_users_info = []
         if self.assigned_users:
             for uid in self.assigned_users:
-                u = User.query.get(uid)
+                u = _user(uid)
                 if u:
-                    assigned_users_info.append({
-                        "id": u.id,
-                        "name": u.username,
-                        "username": u.username,
-                        "email": u.email
-                    })
+                    assigned_users_info.append(self._user_info(u))
 
         collaborators_info = []
         if self.collaborators:
             for uid in self.collaborators:
-                u = User.query.get(uid)
+                u = _user(uid)
                 if u:
-                    collaborators_info.append({
-                        "id": u.id,
-                        "name": u.username,
-                        "username": u.username,
-                        "email": u.email
-                    })
-
-        deleted_by_user_info = None
-        if self.deleted_by_user:
-            deleted_by_user_info = {
-                "id": self.deleted_by_user.id,
-                "name": self.deleted_by_user.username,
-                "username": self.deleted_by_user.username,
-                "email": self.deleted_by_user.email,
-            }
-
-        archived_by_user_info = None
-        if self.archived_by_user:
-            archived_by_user_info = {
-                "id": self.archived_by_user.id,
-                "name": self.archived_by_user.username,
-                "username": self.archived_by_user.username,
-                "email": self.archived_by_user.email,
-            }
+                    collaborators_info.append(self._user_info(u))
 
         return {
             "id": self.id,
@@ -204,7 +243,7 @@ class Task(db.Model):
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
             "archived_at":  self.archived_at.isoformat() if self.archived_at else None,
             "archived_by_user_id": self.archived_by_user_id,
-            "archived_by_user": archived_by_user_info,
+            "archived_by_user": self._user_info(archived_by_user),
 
             "prioridade": self.prioridade,
             "categoria": self.categoria,
@@ -217,34 +256,19 @@ class Task(db.Model):
             "anexos": self.anexos or [],
             # --- subtarefas ---
             "subtasks": self.subtasks or [],
-            "subtasks_total": self.subtask_counts().get("total"),
-            "subtasks_done": self.subtask_counts().get("done"),
-            "subtasks_percent": self.subtask_counts().get("percent"),
+            "subtasks_total": self.subtasks_total or 0,
+            "subtasks_done": self.subtasks_done or 0,
+            "subtasks_percent": self.subtasks_percent or 0,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
 
             "user_id": self.user_id,
-            "user": {
-                "id": self.user.id,
-                "name": self.user.username,
-                "username": self.user.username,
-                "email": self.user.email
-            } if self.user else None,
+            "user": self._user_info(user),
 
             "assigned_by_user_id": self.assigned_by_user_id,
-            "assigned_by_user": {
-                "id": self.assigned_by_user.id,
-                "name": self.assigned_by_user.username,
-                "username": self.assigned_by_user.username,
-                "email": self.assigned_by_user.email
-            } if self.assigned_by_user else None,
-
-            "assigned_to_user": {
-                "id": self.user.id,
-                "name": self.user.username,
-                "username": self.user.username,
-                "email": self.user.email
-            } if self.user else None,
+            "assigned_by_user": self._user_info(assigned_by_user),
+
+            "assigned_to_user": self._user_info(user),
 
             "collaborators": self.collaborators or [],
             "collaborators_info": collaborators_info,
@@ -255,25 +279,24 @@ class Task(db.Model):
             "requires_approval": bool(self.requires_approval),
             "approval_status": self.approval_status,
             "approved_by_user_id": self.approved_by_user_id,
-            "approved_by_user": {
-                "id": self.approved_by_user.id,
-                "name": self.approved_by_user.username,
-                "username": self.approved_by_user.username,
-                "email": self.approved_by_user.email
-            } if self.approved_by_user else None,
+            "approved_by_user": self._user_info(approved_by_user),
             "approved_at": self.approved_at.isoformat() if self.approved_at else None,
 
             "team_id": self.team_id,
-            "team_name": self.team.name if self.team else None,
+            "team_name": team.name if team else None,
 
             "is_deleted": bool(self.is_deleted),
             "deleted_at": self.deleted_at.isoformat() if self.deleted_at else None,
             "deleted_by_user_id": self.deleted_by_user_id,
-            "deleted_by_user": deleted_by_user_info,
+            "deleted_by_user": self._user_info(deleted_by_user),
             "ms_event_id": self.ms_event_id,
             "ms_calendar_id": self.ms_calendar_id,
             "ms_last_sync": self.ms_last_sync.isoformat() if self.ms_last_sync else None,
             "ms_sync_status": self.ms_sync_status,
+
+            "recurrence_rule": self.recurrence_rule,
+            "recurrence_parent_id": self.recurrence_parent_id,
+            "recurrence_date": self.recurrence_date.isoformat() if self.recurrence_date else None,
         }
 
     def can_be_assigned_by(self, user):
@@ -300,8 +323,55 @@ class Task(db.Model):
                 return True
         return False
 
-    def _coerce_subtasks(self):
-        """Normaliza estrutura de subtarefas (ids, tipos e ordenação)."""
+    def sync_participants(self, former_user_ids=()):
+        """
+        Sincroniza task_participants com os JSONs assigned_users/collaborators.
+        Ids inválidos ou de usuários inexistentes são ignorados (o JSON não tem FK).
+        Chamar sempre que assigned_users ou collaborators mudarem.
+        former_user_ids: dono/quem atribuiu antes da edição, que também podem ter
+        perdido o acesso (reatribuição).
+        """
+        from models.task_participant_model import TaskParticipant
+        from models.user_model import User
+
+        def _ids(values):
+            out = set()
+            for v in values or []:
+                try:
+                    out.add(int(v))
+                except (TypeError, ValueError):
+                    continue
+            return out
+
+        assignees = _ids(self.assigned_users)
+        collaborators = _ids(self.collaborators)
+        all_ids = assignees | collaborators
+        if all_ids:
+            existing = {uid for (uid,) in db.session.query(User.id).filter(User.id.in_(all_ids))}
+        else:
+            existing = set()
+
+        desired = {(uid, TaskParticipant.ROLE_ASSIGNEE) for uid in assignees & existing}
+        desired |= {(uid, TaskParticipant.ROLE_COLLABORATOR) for uid in collaborators & existing}
+
+        current = {(p.user_id, p.role): p for p in self.participants}
+        for key in current.keys() - desired:
+            self.participants.remove(current[key])
+
+        # quem saiu e não vê mais a task recebe "removed" em GET /tasks/changes
+        if self.id is not None:
+            from models.task_tombstone_model import TaskTombstone
+
+            still_visible = {uid for uid, _ in desired} | {self.user_id, self.assigned_by_user_id}
+            left = {uid for uid, _ in current.keys() - desired}
+            left.update(uid for uid in former_user_ids if uid is not None)
+            for uid in sorted(left - still_visible):
+                TaskTombstone.record_removal(self, uid)
+        for uid, role in sorted(desired - current.keys()):
+            self.participants.append(TaskParticipant(user_id=uid, role=role))
+
+    def _normalized_subtasks(self):
+        """Estrutura normalizada das subtarefas (ids, tipos e ordenação), sem alterar a task."""
         norm = []
         for i, st in enumerate(self.subtasks or []):
             if not isinstance(st, dict):
@@ -320,21 +390,69 @@ class Task(db.Model):
                 "weight": int(st.get("weight", 1)),
                 "order": int(st.get("order", i)),
             })
-        self.subtasks = sorted(norm, key=lambda x: x["order"])
+        return sorted(norm, key=lambda x: x["order"])
+
+    def _coerce_subtasks(self):
+        """Normaliza e regrava subtasks (caminho de escrita: marca o JSON como alterado)."""
+        self.subtasks = self._normalized_subtasks()
 
     def subtask_counts(self):
-        self._coerce_subtasks()
-        total = len(self.subtasks or [])
-        done = sum(1 for s in (self.subtasks or []) if s.get("done"))
-        total_w = sum(max(1, int(s.get("weight", 1))) for s in (self.subtasks or [])) or 0
-        done_w = sum(max(1, int(s.get("weight", 1))) for s in (self.subtasks or []) if s.get("done"))
+        subtasks = self._normalized_subtasks()
+        total = len(subtasks)
+        done = sum(1 for s in subtasks if s.get("done"))
+        total_w = sum(max(1, int(s.get("weight", 1))) for s in subtasks) or 0
+        done_w = sum(max(1, int(s.get("weight", 1))) for s in subtasks if s.get("done"))
         percent = int(round((done_w / total_w) * 100)) if total_w else 0
         return {"total": total, "done": done, "percent": percent, "total_weight": total_w, "done_weight": done_w}
 
-    def all_subtasks_done(self):
+    def refresh_subtask_progress(self):
+        """
+        Normaliza subtasks e grava subtasks_total/done/percent.
+        Chamar sempre que subtasks mudarem (rotas de subtarefas e update_task).
+        """
         self._coerce_subtasks()
-        return all(s.get("done") for s in (self.subtasks or []))
+        counts = self.subtask_counts()
+        self.subtasks_total = counts["total"]
+        self.subtasks_done = counts["done"]
+        self.subtasks_percent = counts["percent"]
+        return counts
+
+    def all_subtasks_done(self):
+        return all(s.get("done") for s in self._normalized_subtasks())
 
     def can_finish(self):
         """Regra simples: só conclui se TODAS as subtasks estiverem 'done'."""
         return self.all_subtasks_done()
+
+
+# rank de prioridade como expressão SQL (a mesma do índice abaixo, para o planner casar)
+prioridade_rank = case(PRIORIDADE_ORDER, value=Task.prioridade, else_=len(PRIORIDADE_ORDER))
+
+# Índices compostos para paginação keyset (chave de ordenação + id como desempate)
+Index("ix_tasks_due_date_id", Task.due_date, Task.id)
+Index("ix_tasks_created_at_id", Task.created_at, Task.id)
+Index("ix_tasks_updated_at_id", Task.updated_at, Task.id)
+Index("ix_tasks_archived_at_id", Task.archived_at, Task.id)
+Index("ix_tasks_deleted_at_id", Task.deleted_at, Task.id)
+Index("ix_tasks_prioridade_rank_id", prioridade_rank, Task.id)
+Index("ix_tasks_subtasks_percent_id", Task.subtasks_percent, Task.id)
+
+# calendário (GET /tasks/calendar): faixa de due_date só nas tasks fora da lixeira,
+# com as colunas do payload compacto no índice (index-only scan)
+Index(
+    "ix_tasks_calendar_due_date",
+    Task.due_date, Task.id,
+    postgresql_where=Task.deleted_at.is_(None),
+    postgresql_include=["title", "status", "prioridade", "team_id"],
+)
+
+# recorrência: séries ativas e "ocorrência X da série Y já virou linha?"
+Index(
+    "ix_tasks_recurring_series",
+    Task.due_date,
+    postgresql_where=Task.recurrence_rule.isnot(None) & Task.deleted_at.is_(None),
+)
+Index("uq_tasks_recurrence_occurrence", Task.recurrence_parent_id, Task.recurrence_date, unique=True)
+
+# busca textual
+Index("ix_tasks_search_vector", Task.search_vector, postgresql_using="gin")
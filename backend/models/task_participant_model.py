@@ -0,0 +1,28 @@
+from extensions import db
+from sqlalchemy import Index
+
+class TaskParticipant(db.Model):
+    """
+    Espelho normalizado de Task.assigned_users / Task.collaborators (JSON).
+    Existe para os filtros de visibilidade usarem índice em vez de
+    'tasks.assigned_users::jsonb @> ...' linha a linha.
+    """
+    __tablename__ = "task_participants"
+
+    ROLE_ASSIGNEE = "assignee"
+    ROLE_COLLABORATOR = "collaborator"
+
+    # PK composta: (task, usuário, papel)
+    task_id = db.Column(db.Integer, db.ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    role = db.Column(db.String(20), primary_key=True)  # "assignee" | "collaborator"
+
+    task = db.relationship("Task", back_populates="participants")
+
+    __table_args__ = (
+        # "tarefas em que o usuário X participa (como papel Y)"
+        Index("ix_task_participants_user_role_task", "user_id", "role", "task_id"),
+    )
+
+    def __repr__(self):
+        return f"<TaskParticipant task_id={self.task_id} user_id={self.user_id} role={self.role}>"
@@ -0,0 +1,44 @@
+from extensions import db
+from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
+
+class TaskTombstone(db.Model):
+    """
+    Registro de task que saiu do escopo de sincronização. GET /api/tasks/changes
+    informa por aqui o que a linha de tasks não consegue mais contar:
+    - "purged": a task foi apagada definitivamente (a linha some);
+    - "removed": um participante (ou o dono, na reatribuição) perdeu o acesso.
+    user_ids guarda quem via a task, para o feed só entregar o tombstone a
+    esses usuários (o id da task não vaza para os demais).
+    Sem FK para tasks de propósito: a task pode não existir mais.
+    """
+    __tablename__ = "task_tombstones"
+
+    KIND_PURGED = "purged"
+    KIND_REMOVED = "removed"
+
+    id = db.Column(db.Integer, primary_key=True)  # cursor do feed (crescente)
+    task_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(10), nullable=False, default=KIND_PURGED, server_default=KIND_PURGED)
+    user_ids = db.Column(JSONB, nullable=True)   # usuários que viam a task
+    purged_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    @classmethod
+    def record(cls, task):
+        """Adiciona o tombstone do purge na sessão atual (commit junto com o delete)."""
+        user_ids = {task.user_id, task.assigned_by_user_id}
+        user_ids.update(p.user_id for p in task.participants)
+        user_ids.discard(None)
+        tomb = cls(task_id=task.id, kind=cls.KIND_PURGED, user_ids=sorted(user_ids))
+        db.session.add(tomb)
+        return tomb
+
+    @classmethod
+    def record_removal(cls, task, user_id: int):
+        """Usuário perdeu o acesso à task (participante removido ou dono reatribuído)."""
+        tomb = cls(task_id=task.id, kind=cls.KIND_REMOVED, user_ids=[int(user_id)])
+        db.session.add(tomb)
+        return tomb
+
+    def __repr__(self):
+        return f"<TaskTombstone id={self.id} task_id={self.task_id} kind={self.kind}>"
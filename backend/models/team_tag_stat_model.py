@@ -0,0 +1,25 @@
+from extensions import db
+from datetime import datetime
+from sqlalchemy import Index
+
+class TeamTagStat(db.Model):
+    """
+    Uso de cada tag nas tasks (não excluídas) de uma equipe.
+    Mantida incrementalmente por services/team_tag_stats (eventos de flush de Task);
+    carga inicial/recalculo: python manage.py backfill-team-tag-stats
+    """
+    __tablename__ = "team_tag_stats"
+
+    team_id = db.Column(db.Integer, db.ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+    tag_slug = db.Column(db.String(80), primary_key=True)
+    color = db.Column(db.String(7), nullable=True)  # última cor explícita vista (tags legadas com cor)
+    usage_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_used_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+
+    __table_args__ = (
+        # "tags mais usadas da equipe"
+        Index("ix_team_tag_stats_team_usage", "team_id", "usage_count"),
+    )
+
+    def __repr__(self):
+        return f"<TeamTagStat team_id={self.team_id} tag={self.tag_slug} usage={self.usage_count}>"
@@ -6,6 +6,7 @@ from sqlalchemy import func
 from extensions import db
 from models.task_model import Task
 from models.audit_log_model import AuditLog
+from models.task_tombstone_model import TaskTombstone
 import os
 
 scheduler = None
@@ -82,9 +83,11 @@ def purge_trash_once(app, days=7):
             except Exception:
                 current_app.logger.exception("Falha ao registrar auditoria (PURGE auto)")
 
+            TaskTombstone.record(t)  # GET /tasks/changes informa o purge
             db.session.delete(t)
             count += 1
 
+        # um commit só para o lote (a auditoria vai para a fila do audit_writer)
         if count:
             db.session.commit()
 
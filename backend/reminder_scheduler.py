@@ -9,6 +9,7 @@ from extensions import db
 import json
 import os
 from sqlalchemy import or_, and_
+from services.recurrence import virtual_occurrences
 
 SENT_REMINDERS_FILE = os.path.join(os.path.dirname(__file__), 'sent_reminders.txt')
 ACTIVE_STATUSES = ('pending', 'in_progress')
@@ -63,34 +64,45 @@ class ReminderScheduler:
 
                 current_time = datetime.now(self.brazil_tz)
 
+                # séries recorrentes: ocorrências virtuais futuras dentro do maior lembrete
+                now_utc = datetime.utcnow()
+                horizon = now_utc + timedelta(minutes=max(self.reminder_minutes.values()) + 1)
+                series = [t for t in tasks if t.recurrence_rule and t.lembretes]
+                upcoming = {}
+                for s, when in virtual_occurrences(series, now_utc, horizon):
+                    upcoming.setdefault(s.id, []).append(when)
+
                 for task in tasks:
                     if not task.lembretes or not task.due_date:
                         continue
 
-                    # Garantir que a due_date está em UTC
-                    task_due_date_utc = task.due_date
-                    if task_due_date_utc.tzinfo is None:
-                        task_due_date_utc = pytz.utc.localize(task_due_date_utc)
+                    for due_date in [task.due_date, *upcoming.get(task.id, [])]:
+                        self._check_task_due(task, due_date, current_time)
 
-                    # Converte para horário do Brasil
-                    task_due_date_brazil = task_due_date_utc.astimezone(self.brazil_tz)
+        except Exception as e:
+            print(f"Erro ao verificar lembretes: {str(e)}")
 
-                    for reminder_type in task.lembretes:
-                        if reminder_type in self.reminder_minutes:
-                            minutes_before = self.reminder_minutes[reminder_type]
-                            reminder_time = task_due_date_brazil - timedelta(minutes=minutes_before)
+    def _check_task_due(self, task, due_date, current_time):
+        # Garantir que a due_date está em UTC
+        task_due_date_utc = due_date
+        if task_due_date_utc.tzinfo is None:
+            task_due_date_utc = pytz.utc.localize(task_due_date_utc)
 
-                            # Chave do lembrete padronizada (sem microsegundos)
-                            reminder_key = f"{task.id}_{reminder_type}_{task_due_date_brazil.strftime('%Y-%m-%dT%H:%M:%S')}"
+        # Converte para horário do Brasil
+        task_due_date_brazil = task_due_date_utc.astimezone(self.brazil_tz)
 
-                            if current_time >= reminder_time and not self._was_reminder_sent(reminder_key):
-                                self._send_reminder(task, reminder_type, reminder_key)
+        for reminder_type in task.lembretes:
+            if reminder_type in self.reminder_minutes:
+                minutes_before = self.reminder_minutes[reminder_type]
+                reminder_time = task_due_date_brazil - timedelta(minutes=minutes_before)
 
-        except Exception as e:
-            print(f"Erro ao verificar lembretes: {str(e)}")
+                # Chave do lembrete padronizada (sem microsegundos)
+                reminder_key = f"{task.id}_{reminder_type}_{task_due_date_brazil.strftime('%Y-%m-%dT%H:%M:%S')}"
 
+                if current_time >= reminder_time and not self._was_reminder_sent(reminder_key):
+                    self._send_reminder(task, reminder_type, reminder_key, due_date=due_date)
 
-    def _send_reminder(self, task, reminder_type, reminder_key):
+    def _send_reminder(self, task, reminder_type, reminder_key, due_date=None):
         try:
             with self.app.app_context():
                 user = User.query.get(task.user_id)
@@ -105,7 +117,7 @@ class ReminderScheduler:
                     user_name=user.username,
                     task_title=task.title,
                     task_description=task.description,
-                    due_date=task.due_date,
+                    due_date=due_date or task.due_date,
                     reminder_type=reminder_display
                 )
 
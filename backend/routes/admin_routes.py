@@ -1,7 +1,8 @@
 # routes/admin_routes.py
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, send_file, current_app, Response, stream_with_context
 from models.user_model import User
 from models.task_model import Task
+from models.task_tombstone_model import TaskTombstone
 from models.backup_model import Backup
 from models.audit_log_model import AuditLog
 from extensions import db
@@ -11,8 +12,10 @@ import os
 import subprocess
 from datetime import datetime, timedelta
 from archive_scheduler import archive_done_tasks_once
-import csv
-import io
+from services.audit_export import iter_csv as iter_audit_csv
+from services.pagination import InvalidCursor, keyset_order_by, paginate_keyset, parse_limit
+from sqlalchemy import text
+from sqlalchemy.orm import joinedload
 from werkzeug.utils import secure_filename
 
 admin_bp = Blueprint("admin_bp", __name__, url_prefix="/api/admin")
@@ -161,36 +164,94 @@ def delete_backup(backup_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+AUDIT_FILTER_PARAMS = ('action', 'user_id', 'resource_type', 'resource_id', 'start_date', 'end_date')
+
+def _audit_log_total(query) -> tuple[int, bool]:
+    """
+    (total, estimado). Sem filtro, usa pg_class.reltuples (somando as partições):
+    COUNT(*) numa tabela de auditoria grande custa um scan inteiro a cada página.
+    """
+    filtered = any(request.args.get(p) for p in AUDIT_FILTER_PARAMS)
+    if not filtered and db.engine.dialect.name == 'postgresql':
+        estimate = db.session.execute(text(
+            "SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0) FROM pg_class c "
+            "WHERE c.oid = 'audit_logs'::regclass "
+            "   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'audit_logs'::regclass)"
+        )).scalar()
+        if estimate and estimate > 0:  # tabela nunca analisada: cai no COUNT
+            return int(estimate), True
+    return query.order_by(None).count(), False
+
 @admin_bp.route("/audit-logs", methods=["GET"])
 @admin_required
 def get_audit_logs():
-    """Lista logs de auditoria com paginação e metadados"""
+    """
+    Lista logs de auditoria (mais recentes primeiro).
+    Filtros: ?action ?user_id ?resource_type ?resource_id ?start_date ?end_date.
+    Com ?limit / ?cursor pagina por cursor em (created_at, id) e devolve
+    next_cursor; sem eles mantém ?page/?per_page. Sem filtro o total é estimado.
+    """
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
-        action = request.args.get('action')
-        user_id = request.args.get('user_id', type=int)
-
-        query = AuditLog.query
-        if action:
-            query = query.filter(AuditLog.action == action)
-        if user_id:
-            query = query.filter(AuditLog.user_id == user_id)
+        query, err = _audit_log_query()
+        if err:
+            return err
+        query = query.options(joinedload(AuditLog.user))
+
+        if 'limit' in request.args or 'cursor' in request.args:
+            try:
+                limit = parse_limit(request.args.get('limit'))
+            except ValueError:
+                return jsonify({'error': 'limit inválido.'}), 400
+            try:
+                logs, next_cursor = paginate_keyset(
+                    query, 'created_at', AuditLog.created_at, AuditLog.id, lambda log: log.created_at,
+                    limit=limit,
+                    cursor=request.args.get('cursor') or None,
+                    descending=True,
+                    nullable=False,
+                )
+            except InvalidCursor as e:
+                return jsonify({'error': str(e)}), 400
+            total, estimated = _audit_log_total(query)
+            return jsonify({
+                "items": [log.to_dict() for log in logs],
+                "next_cursor": next_cursor,
+                "limit": limit,
+                "total_items": total,
+                "total_is_estimate": estimated,
+            })
 
-        query = query.order_by(AuditLog.created_at.desc())
-        logs_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = max(request.args.get('per_page', 50, type=int), 1)
+        # uma linha a mais decide has_next; a estimativa (reltuples de partição
+        # ainda não analisada conta 0) serve só para exibir total/páginas
+        rows = (query.order_by(*keyset_order_by(AuditLog.created_at, AuditLog.id, True))
+                     .offset((page - 1) * per_page)
+                     .limit(per_page + 1)
+                     .all())
+        has_next = len(rows) > per_page
+        logs = rows[:per_page]
+        total, estimated = _audit_log_total(query)
+        if estimated and logs:
+            total = max(total, (page - 1) * per_page + len(logs) + int(has_next))
+        total_pages = -(-total // per_page)
+        if has_next:
+            total_pages = max(total_pages, page + 1)
+        elif estimated and logs:
+            total_pages = page
 
         response_data = {
-            "items": [log.to_dict() for log in logs_pagination.items],
+            "items": [log.to_dict() for log in logs],
             "pagination": {
-                "total_items": logs_pagination.total,
-                "total_pages": logs_pagination.pages,
-                "current_page": logs_pagination.page,
-                "per_page": logs_pagination.per_page,
-                "has_next": logs_pagination.has_next,
-                "has_prev": logs_pagination.has_prev,
-                "next_num": logs_pagination.next_num,
-                "prev_num": logs_pagination.prev_num
+                "total_items": total,
+                "total_is_estimate": estimated,
+                "total_pages": total_pages,
+                "current_page": page,
+                "per_page": per_page,
+                "has_next": has_next,
+                "has_prev": page > 1,
+                "next_num": page + 1 if has_next else None,
+                "prev_num": page - 1 if page > 1 else None
             }
         }
         return jsonify(response_data)
@@ -198,37 +259,61 @@ def get_audit_logs():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _audit_log_query():
+    """
+    AuditLog.query com os filtros comuns da listagem e da exportação:
+    ?action ?user_id ?resource_type ?resource_id ?start_date ?end_date
+    (created_at, ISO 8601; data sem hora em end_date inclui o dia inteiro).
+    Retorna (query, None) ou (None, resposta de erro).
+    """
+    query = AuditLog.query
+    action = request.args.get('action')
+    user_id = request.args.get('user_id', type=int)
+    resource_type = request.args.get('resource_type')
+    resource_id = request.args.get('resource_id', type=int)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if user_id:
+        query = query.filter(AuditLog.user_id == user_id)
+    if resource_type:
+        query = query.filter(AuditLog.resource_type == resource_type)
+    if resource_id is not None:
+        query = query.filter(AuditLog.resource_id == resource_id)
+
+    for param in ('start_date', 'end_date'):
+        raw = request.args.get(param)
+        if not raw:
+            continue
+        try:
+            value = datetime.fromisoformat(raw)
+        except ValueError:
+            return None, (jsonify({'error': f'Formato inválido para {param}. Use ISO 8601.'}), 400)
+        if param == 'start_date':
+            query = query.filter(AuditLog.created_at >= value)
+        elif len(raw) == 10:
+            query = query.filter(AuditLog.created_at < value + timedelta(days=1))
+        else:
+            query = query.filter(AuditLog.created_at <= value)
+    return query, None
+
 @admin_bp.route("/export-audit-logs", methods=["GET"])
 @admin_required
 def export_audit_logs():
-    """Exporta logs de auditoria em CSV"""
+    """
+    Exporta logs de auditoria em CSV (streaming direto do cursor).
+    Aceita os mesmos filtros da listagem: ?action ?user_id ?start_date ?end_date.
+    """
     try:
-        logs = AuditLog.query.order_by(AuditLog.created_at.desc()).all()
-
-        output = io.StringIO()
-        output.write('\ufeff')
-        writer = csv.writer(output, delimiter=';', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-
-        writer.writerow([
-            'ID', 'Usuário', 'Ação', 'Tipo de Recurso', 'ID do Recurso',
-            'Descrição', 'IP', 'User Agent', 'Data/Hora'
-        ])
-
-        for log in logs:
-            data = log.to_dict()
-            writer.writerow([
-                data['id'],
-                data['user_name'],
-                data['action'],
-                data['resource_type'] or '',
-                data['resource_id'] or '',
-                data['description'],
-                data['ip_address'] or '',
-                data['user_agent'] or '',
-                datetime.strptime(data['created_at'], '%Y-%m-%dT%H:%M:%S.%f').strftime('%d/%m/%Y %H:%M:%S') if data['created_at'] else ''
-            ])
-
-        output.seek(0)
+        query, err = _audit_log_query()
+        if err:
+            return err
+
+        filename = f'audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+        resp = Response(
+            stream_with_context(iter_audit_csv(query)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
 
         current_user_id = get_jwt_identity()
         AuditLog.log_action(
@@ -239,14 +324,7 @@ def export_audit_logs():
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent')
         )
-
-        filename = f'audit_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
+        return resp
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -270,6 +348,7 @@ def _hard_delete_task(task: Task):
     except Exception:
         pass
 
+    TaskTombstone.record(task)  # GET /tasks/changes informa o purge
     db.session.delete(task)
 
 def _require_admin():
@@ -0,0 +1,125 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import date, timedelta
+from sqlalchemy import Integer, func, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from extensions import db
+from models.user_model import User
+from models.task_daily_rollup_model import TaskDailyRollup
+
+analytics_bp = Blueprint("analytics", __name__, url_prefix="/api/analytics")
+
+TREND_GRANULARITIES = ("day", "week", "month")
+TREND_DEFAULT_DAYS = 90
+TREND_MAX_DAYS = 3 * 366
+
+@analytics_bp.route("/trend", methods=["GET"])
+@jwt_required()
+def task_trend():
+    """
+    Série temporal lida só de task_daily_rollup (gerada pelo job noturno).
+    ?from=AAAA-MM-DD&to=AAAA-MM-DD  (padrão: últimos 90 dias)
+    ?granularity=day|week|month
+    ?team_id=  (admin ou membro da equipe)   ?user_id= (admin; demais só o próprio)
+    ?prioridade= ?categoria= ?status=
+    created/completed/archived somam no período; overdue é a foto do último dia do período.
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+    if not user or not user.is_active:
+        return jsonify({"error": "Usuário inválido ou inativo"}), 401
+
+    granularity = (request.args.get("granularity") or "day").lower()
+    if granularity not in TREND_GRANULARITIES:
+        return jsonify({"error": f"granularity inválido. Use: {', '.join(TREND_GRANULARITIES)}."}), 400
+
+    try:
+        date_to = date.fromisoformat(request.args["to"]) if request.args.get("to") else date.today()
+        date_from = (date.fromisoformat(request.args["from"]) if request.args.get("from")
+                     else date_to - timedelta(days=TREND_DEFAULT_DAYS))
+    except ValueError:
+        return jsonify({"error": "Formato inválido para from/to. Use AAAA-MM-DD."}), 400
+    if date_from > date_to:
+        return jsonify({"error": "from deve ser anterior a to."}), 400
+    if (date_to - date_from).days > TREND_MAX_DAYS:
+        return jsonify({"error": f"Intervalo máximo de {TREND_MAX_DAYS} dias."}), 400
+
+    try:
+        team_id = int(request.args["team_id"]) if request.args.get("team_id") else None
+        target_user_id = int(request.args["user_id"]) if request.args.get("user_id") else None
+    except ValueError:
+        return jsonify({"error": "team_id/user_id inválido."}), 400
+
+    # escopo: admin vê tudo; demais só equipes das quais participam ou as próprias tasks
+    if not user.is_admin:
+        if team_id is not None:
+            if not any(ut.team_id == team_id for ut in user.teams):
+                return jsonify({"error": "Acesso negado para este team_id."}), 403
+        elif target_user_id is None:
+            target_user_id = user_id
+        if target_user_id is not None and target_user_id != user_id:
+            return jsonify({"error": "Acesso negado para este user_id."}), 403
+
+    filters = [TaskDailyRollup.day >= date_from, TaskDailyRollup.day <= date_to]
+    if team_id is not None:
+        filters.append(TaskDailyRollup.team_id == team_id)
+    if target_user_id is not None:
+        filters.append(TaskDailyRollup.user_id == target_user_id)
+    for param, column in (("prioridade", TaskDailyRollup.prioridade),
+                          ("categoria", TaskDailyRollup.categoria),
+                          ("status", TaskDailyRollup.status)):
+        if request.args.get(param):
+            filters.append(column == request.args[param])
+
+    # 1) totais por dia (soma das dimensões)
+    daily = (
+        db.session.query(
+            TaskDailyRollup.day.label("day"),
+            func.sum(TaskDailyRollup.created).label("created"),
+            func.sum(TaskDailyRollup.completed).label("completed"),
+            func.sum(TaskDailyRollup.archived).label("archived"),
+            func.sum(TaskDailyRollup.overdue).label("overdue"),
+        )
+        .filter(*filters)
+        .group_by(TaskDailyRollup.day)
+    )
+
+    if granularity == "day":
+        rows = daily.order_by(TaskDailyRollup.day).all()
+        points = [
+            {"period": r.day.isoformat(), "created": int(r.created), "completed": int(r.completed),
+             "archived": int(r.archived), "overdue": int(r.overdue)}
+            for r in rows
+        ]
+    else:
+        # 2) agrega os dias por semana/mês; overdue = valor do último dia do período
+        d = daily.subquery()
+        # granularity já validada; literal para o GROUP BY casar com o SELECT
+        period = func.date_trunc(literal_column(f"'{granularity}'"), d.c.day).label("period")
+        last_overdue = func.array_agg(
+            aggregate_order_by(d.c.overdue, d.c.day.desc()), type_=ARRAY(Integer)
+        )[1]
+        rows = (
+            db.session.query(
+                period,
+                func.sum(d.c.created), func.sum(d.c.completed), func.sum(d.c.archived),
+                last_overdue,
+            )
+            .group_by(period)
+            .order_by(period)
+            .all()
+        )
+        points = [
+            {"period": p.date().isoformat(), "created": int(c or 0), "completed": int(done or 0),
+             "archived": int(a or 0), "overdue": int(o or 0)}
+            for p, c, done, a, o in rows
+        ]
+
+    return jsonify({
+        "granularity": granularity,
+        "from": date_from.isoformat(),
+        "to": date_to.isoformat(),
+        "team_id": team_id,
+        "user_id": target_user_id,
+        "points": points,
+    }), 200
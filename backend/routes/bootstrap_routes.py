@@ -0,0 +1,64 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from extensions import db
+from models.user_model import User
+from models.user_role_model import UserRole
+from models.user_team_model import UserTeam
+from models.team_tag_stat_model import TeamTagStat
+from services.tag_catalog import tag_catalog
+from services.task_counts import get_task_counts
+from routes.task_routes import available_collaborators, _stable_color_for_name
+from routes.team_routes import serialize_teams, teams_for_user
+
+bootstrap_bp = Blueprint("bootstrap", __name__, url_prefix="/api")
+
+BOOTSTRAP_TAG_LIMIT = 20
+
+def _team_tag_suggestions(team_ids, limit: int = BOOTSTRAP_TAG_LIMIT) -> list[dict]:
+    """Tags mais usadas nas equipes do usuário (somando as equipes), para o autocomplete inicial."""
+    if not team_ids:
+        return []
+    usage = func.sum(TeamTagStat.usage_count)
+    rows = (db.session.query(TeamTagStat.tag_slug, usage)
+                .filter(TeamTagStat.team_id.in_(team_ids), TeamTagStat.usage_count > 0)
+                .group_by(TeamTagStat.tag_slug)
+                .order_by(usage.desc(), TeamTagStat.tag_slug)
+                .limit(limit)
+                .all())
+    catalog = tag_catalog.lookup([slug for slug, _ in rows])
+    out = []
+    for slug, _count in rows:
+        entry = catalog.get(slug)
+        name = entry.name if entry else slug
+        out.append({"name": name, "color": (entry.color if entry else None) or _stable_color_for_name(name)})
+    return out
+
+@bootstrap_bp.route("/bootstrap", methods=["GET"])
+@jwt_required()
+def bootstrap():
+    """
+    Estado inicial do app em uma resposta: substitui as chamadas de abertura a
+    /users/me, /teams, /tasks/counts, /tags/suggestions e /users/available-collaborators.
+    O usuário é carregado uma vez (equipes e roles via selectinload).
+    """
+    user_id = int(get_jwt_identity())
+    user = (User.query
+                .options(
+                    selectinload(User.teams).selectinload(UserTeam.team),
+                    selectinload(User.roles_link).selectinload(UserRole.role),
+                )
+                .filter(User.id == user_id)
+                .first())
+    if not user or not user.is_active:
+        return jsonify({"error": "Usuário inválido ou inativo"}), 401
+
+    team_ids = [ut.team_id for ut in user.teams]
+    return jsonify({
+        "user": user.to_dict(),
+        "teams": serialize_teams(teams_for_user(user), user),
+        "counts": get_task_counts(user_id, team_ids),
+        "tag_suggestions": _team_tag_suggestions(team_ids),
+        "collaborators": available_collaborators(user_id),
+    }), 200
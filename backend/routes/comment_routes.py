@@ -59,7 +59,7 @@ def add_task_comment(task_id):
     try:
         new_comment = Comment(content=content, task_id=task_id, user_id=user_id)
         db.session.add(new_comment)
-        db.session.commit()
+        db.session.commit()  # search_vector: services/task_search (after_commit)
 
         enqueue_comment_email(new_comment.id)
 
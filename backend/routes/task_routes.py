@@ -1,29 +1,56 @@
-from flask import Blueprint, request, jsonify, session, send_from_directory, current_app
-from models.task_model import Task
+from flask import (
+    Blueprint, Response, request, jsonify, session, send_file, send_from_directory,
+    current_app, stream_with_context,
+)
+from models.task_model import Task, PRIORIDADE_ORDER, prioridade_rank
+from models.task_participant_model import TaskParticipant
+from models.task_change_model import TaskChange
 from extensions import db
 from decorators import login_required
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 import os
 import json
-from datetime import datetime
+import tempfile
+from datetime import datetime, timedelta
 from models.user_model import User
 from models.team_model import Team
 from models.user_team_model import UserTeam
 from sqlalchemy import text, or_, and_
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from sqlalchemy.exc import IntegrityError
 from reminder_scheduler import schedule_task_reminders_safe
-from pytz import timezone
 from models.audit_log_model import AuditLog
 from models.notification_outbox_model import NotificationOutbox
 from services.task_calendar_service import schedule_task_event_for_creator
 from services.task_calendar_service import ensure_event_for_task, delete_event_for_task
+from services.task_serializer import (
+    InvalidFields, parse_fields, project_tasks, task_load_options,
+)
+from services.task_visibility import participates, visible_to
+from services.task_search import (
+    build_tsquery, headline as search_headline, matches as search_matches,
+    rank as search_rank, search_available,
+)
+from services.task_changes import fetch_changes
+from services.task_reports import build_task_report
+from services.task_export import iter_csv, write_xlsx
+from services.task_counts import get_task_counts as cached_task_counts
+from services.http_cache import (
+    make_etag, not_modified, reference_version, request_args_key, scope_version, with_etag,
+)
+from services.pagination import (
+    InvalidCursor, encode_cursor, paginate_keyset, parse_limit,
+)
+from services.task_board import BOARD_GROUPS, board_first_pages
+from services.recurrence import (
+    InvalidRule, advance_series, materialize_occurrence, normalize_rule,
+    occurrence_key, occurrence_payload, parse_occurrence_stamp, virtual_occurrences,
+)
 from uuid import uuid4
 
 task_bp = Blueprint("tasks", __name__, url_prefix="/api")
 
-brazil_tz = timezone("America/Sao_Paulo")
-now_brazil = datetime.now(brazil_tz)
-
 # UTILS
 from copy import deepcopy
 import json
@@ -55,6 +82,8 @@ def _coerce_item(x):
 import re
 from models.tag_model import Tag
 from extensions import db
+from services.tag_catalog import CatalogTag, tag_catalog
+from services.team_tag_stats import team_tag_colors
 
 HEX_RE = re.compile(r"^#([0-9A-Fa-f]{6})$")
 
@@ -88,21 +117,30 @@ def _extract_name_and_color(item) -> tuple[str, str|None]:
     return n, c
 
 def get_or_create_tag(name: str, requested_color: str|None, created_by_user_id: int|None):
+    """
+    Retorna (CatalogTag(name, color), criada?). Sempre CatalogTag, venha do
+    catálogo em memória, do banco ou da tag recém-adicionada à sessão.
+    """
     n = _norm_tag_name(name)
     if not n:
         return None, False
     slug = n.lower()
 
+    # já existe -> cor é IMUTÁVEL, ignora requested_color
+    # (só o hit positivo do catálogo evita a query: o "não existe" em cache pode estar velho)
+    cached = tag_catalog.get(slug)
+    if cached:
+        return cached, False
     tag = Tag.query.filter_by(slug=slug).first()
     if tag:
-        # já existe -> cor é IMUTÁVEL, ignora requested_color
-        return tag, False
+        tag_catalog.remember(tag)
+        return CatalogTag(tag.name, tag.color), False
 
     color = requested_color or _stable_color_for_name(n)
     tag = Tag(name=n, slug=slug, color=color, created_by_user_id=created_by_user_id)
     db.session.add(tag)
     # não commit aqui; quem chama comita junto da task
-    return tag, True
+    return CatalogTag(tag.name, tag.color), True
 
 def resolve_tags_from_payload(input_tags, created_by_user_id: int|None):
     """
@@ -137,8 +175,8 @@ def get_color_map_for_names(names: list[str]) -> dict[str, str]:
     slugs = [ _norm_tag_name(n).lower() for n in names if _norm_tag_name(n) ]
     if not slugs:
         return {}
-    rows = Tag.query.filter(Tag.slug.in_(slugs)).all()
-    return { r.name: r.color for r in rows }
+    found = tag_catalog.lookup(slugs)
+    return { t.name: t.color for t in found.values() }
 
 
 def _is_manager_for_task(user: User, task: Task) -> bool:
@@ -219,6 +257,43 @@ def _decorate_task_with_tag_colors(task: Task) -> dict:
     payload["tags"] = [{"name": n, "color": cmap.get(n) or _stable_color_for_name(n)} for n in names]
     return payload
 
+def _decorate_tasks_with_tag_colors(tasks: list[Task], fields=None) -> list[dict]:
+    """
+    Versão em lote de _decorate_task_with_tag_colors: serializa via project_tasks
+    (usuários/equipes em um IN cada, só os campos pedidos) e resolve as cores de
+    todas as tags em uma query.
+    """
+    payloads = project_tasks(tasks, fields)
+    if fields is not None and "tags" not in fields:
+        return payloads
+    all_names = {n for p in payloads for n in (p.get("tags") or [])}
+    cmap = get_color_map_for_names(list(all_names))
+    for payload in payloads:
+        names = payload.get("tags") or []
+        payload["tags"] = [{"name": n, "color": cmap.get(n) or _stable_color_for_name(n)} for n in names]
+    return payloads
+
+def _enrich_anexos(task_dict: dict) -> dict:
+    """Completa anexos com URL absoluta (e defaults quando vierem só como nome)."""
+    if task_dict.get("anexos"):
+        anexos_enriched = []
+        for anexo in task_dict["anexos"]:
+            if isinstance(anexo, str):
+                anexos_enriched.append({
+                    "id": anexo,
+                    "name": anexo,
+                    "url": f"{request.scheme}://{request.host}/uploads/{anexo}",
+                    "size": 0,
+                    "type": "application/octet-stream"
+                })
+            else:
+                a = anexo.copy()
+                if "url" not in a:
+                    a["url"] = f"{request.scheme}://{request.host}/uploads/{a.get('name', '')}"
+                anexos_enriched.append(a)
+        task_dict["anexos"] = anexos_enriched
+    return task_dict
+
 def normalize_task_snapshot(d: dict) -> dict:
     """
     Reduz o snapshot da task para campos relevantes e comparáveis.
@@ -286,6 +361,10 @@ def diff_snapshots(before: dict, after: dict) -> dict:
 
     return changes
 
+def record_task_change(task: Task, user_id, before_state: dict):
+    """Grava em task_changes o diff entre before_state e a task agora (mesma transação; não comita)."""
+    TaskChange.record(task.id, int(user_id), diff_snapshots(before_state, task.to_dict()), at=task.updated_at)
+
 # ====== TAG COLORS ======
 _DEFAULT_TAG_COLORS = [
     "#2563eb", "#10b981", "#f59e0b", "#ef4444", "#8b5cf6",
@@ -313,48 +392,13 @@ def _stable_color_for_name(name: str) -> str:
 
 def _collect_team_tag_colors(team_id: int | None) -> dict[str, str]:
     """
-    Varrendo tasks da equipe (ou pessoais se team_id None), pega a cor 'mais comum' por nome de tag.
-    Não é perfeito, mas evita criar tabela já agora.
+    Cor por slug de tag usada na equipe, lida de team_tag_stats (uma query indexada).
+    Tasks pessoais (team_id None) não têm estatística: cai na cor estável pelo nome.
     """
-    from sqlalchemy import func
-    results = {}
+    if team_id is None:
+        return {}
     try:
-        # pega só tasks visíveis da equipe
-        base = Task.query.filter(Task.deleted_at.is_(None))
-        if team_id is None:
-            base = base.filter(Task.team_id.is_(None))
-        else:
-            base = base.filter(Task.team_id == team_id)
-
-        # carrega tags de todas essas tasks (cuidado com volume)
-        for t in base.with_entities(Task.tags).all():
-            tags = t[0] or []
-            for item in tags:
-                if isinstance(item, str):
-                    name = item.strip()
-                    color = None
-                elif isinstance(item, dict):
-                    name = (item.get("name") or item.get("label") or "").strip()
-                    color = (item.get("color") or "").strip() or None
-                else:
-                    continue
-                if not name:
-                    continue
-                bucket = results.setdefault(name, {})
-                key = color or "__none__"
-                bucket[key] = bucket.get(key, 0) + 1
-
-        # escolhe cor mais frequente (se tiver), senão hash estável
-        final = {}
-        for name, counts in results.items():
-            best_color, best_count = None, -1
-            for c, n in counts.items():
-                if c == "__none__":
-                    continue
-                if n > best_count:
-                    best_color, best_count = c, n
-            final[name] = best_color or _stable_color_for_name(name)
-        return final
+        return team_tag_colors(team_id)
     except Exception:
         # fallback vazio
         return {}
@@ -377,7 +421,7 @@ def _normalize_tag_item(item, team_id: int | None, cache_colors: dict[str, str])
 
     # prioridade: cor explícita > cor do cache (histórico equipe) > cor estável pelo nome
     if not color:
-        color = cache_colors.get(name) or _stable_color_for_name(name)
+        color = cache_colors.get(_norm_tag_name(name).lower()) or _stable_color_for_name(name)
 
     return {"name": name, "color": color}
 
@@ -543,6 +587,119 @@ def _user_has_ms_connection(user_id: int) -> bool:
     except Exception:
         return False
 
+# ====== ORDENAÇÃO / PAGINAÇÃO (keyset) ======
+# nome -> (expressão SQL, desc por padrão?, coluna pode ser NULL?, valor da linha p/ cursor)
+TASK_SORTS = {
+    "due_date":   (Task.due_date,   False, True,  lambda t: t.due_date),
+    "created_at": (Task.created_at, True,  True,  lambda t: t.created_at),
+    "updated_at": (Task.updated_at, True,  True,  lambda t: t.updated_at),
+    "prioridade": (prioridade_rank, False, False, lambda t: PRIORIDADE_ORDER.get(t.prioridade, len(PRIORIDADE_ORDER))),
+    "archived_at": (Task.archived_at, True, True, lambda t: t.archived_at),
+    "deleted_at":  (Task.deleted_at,  True, True, lambda t: t.deleted_at),
+    "progress":    (Task.subtasks_percent, True, False, lambda t: t.subtasks_percent),
+}
+# teto do GET /tasks sem limit/cursor (lista pura); passou disso, X-Next-Cursor
+LEGACY_LIST_LIMIT = 500
+# sorts cujo nome não é o da coluna (load_only precisa da coluna para o cursor)
+_SORT_COLUMNS = {"progress": "subtasks_percent"}
+
+def _resolve_task_sort(default_sort: str, allowed: tuple[str, ...]):
+    """
+    Lê ?sort= e ?order=asc|desc. Retorna (spec, erro) onde spec é um dict com
+    a chave do cursor (sort+direção), expressão, direção, nullable e value_of.
+    """
+    sort = (request.args.get("sort") or default_sort).strip()
+    if sort not in allowed:
+        return None, (jsonify({"error": f"sort inválido. Use: {', '.join(allowed)}."}), 400)
+    expr, default_desc, nullable, value_of = TASK_SORTS[sort]
+
+    order = (request.args.get("order") or "").strip().lower()
+    if order and order not in ("asc", "desc"):
+        return None, (jsonify({"error": "order inválido. Use asc ou desc."}), 400)
+    descending = (order == "desc") if order else default_desc
+
+    return {
+        "key": f"{sort}:{'desc' if descending else 'asc'}",
+        "name": sort,
+        "column": _SORT_COLUMNS.get(sort, sort),
+        "expr": expr,
+        "descending": descending,
+        "nullable": nullable,
+        "value_of": value_of,
+    }, None
+
+def _resolve_fields(default: str | None = None):
+    """Lê ?fields= (lista de campos ou preset card|calendar|full). Retorna (fields, erro)."""
+    try:
+        return parse_fields(request.args.get("fields") or default), None
+    except InvalidFields as e:
+        return None, (jsonify({"error": str(e)}), 400)
+
+def _apply_text_search(query, search: str):
+    """
+    Filtro ?search= das listagens: full-text em modo prefixo (índice GIN em
+    search_vector) OU título contendo o texto (ILIKE, o filtro antigo). O ILIKE
+    cobre termos sem letra/dígito ("!!!"), tasks com vetor ainda NULL e bancos
+    em que o setup da busca não rodou (aí é o único filtro).
+    """
+    contains = Task.title.ilike(f"%{search}%")
+    tsq = build_tsquery(search, prefix=True) if search_available() else None
+    if tsq is None:
+        return query.filter(contains)
+    return query.filter(or_(search_matches(tsq), contains))
+
+def _parse_recurrence_rule(raw, due_date):
+    """recurrence_rule do payload -> (regra canônica | None, erro). Vazio = sem recorrência."""
+    if raw is None or not str(raw).strip():
+        return None, None
+    if not due_date:
+        return None, (jsonify({"error": "Tarefas recorrentes precisam de data de vencimento."}), 400)
+    try:
+        return normalize_rule(str(raw)), None
+    except InvalidRule as e:
+        return None, (jsonify({"error": f"recurrence_rule inválida: {e}"}), 400)
+
+def _series_query(query, window_end):
+    """Séries recorrentes ativas da query cuja ocorrência atual é anterior ao fim da janela."""
+    return query.filter(
+        Task.recurrence_rule.isnot(None),
+        Task.status.in_(("pending", "in_progress")),
+        Task.due_date.isnot(None),
+        Task.due_date < window_end,
+    )
+
+def _virtual_occurrence_payloads(series_query, fields, start, end) -> list[dict]:
+    """Ocorrências virtuais em [start, end) serializadas a partir do payload da série."""
+    series = series_query.options(
+        *task_load_options(fields, extra_columns=("due_date", "recurrence_rule", "recurrence_start"))
+    ).all()
+    occurrences = virtual_occurrences(series, start, end)
+    if not occurrences:
+        return []
+    base = {t.id: p for t, p in zip(series, _decorate_tasks_with_tag_colors(series, fields))}
+    return [_enrich_anexos(occurrence_payload(base[s.id], s.id, when)) for s, when in occurrences]
+
+def _wants_keyset_page() -> bool:
+    return "limit" in request.args or "cursor" in request.args
+
+def _keyset_page(query, spec):
+    """Executa a query paginada por cursor. Retorna ((rows, next_cursor, limit), erro)."""
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError:
+        return None, (jsonify({"error": "limit inválido."}), 400)
+    try:
+        rows, next_cursor = paginate_keyset(
+            query, spec["key"], spec["expr"], Task.id, spec["value_of"],
+            limit=limit,
+            cursor=request.args.get("cursor") or None,
+            descending=spec["descending"],
+            nullable=spec["nullable"],
+        )
+    except InvalidCursor as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    return (rows, next_cursor, limit), None
+
 # ROUTES
 
 @task_bp.route("/tasks", methods=["GET"])
@@ -587,13 +744,7 @@ def get_tasks():
     if user.is_admin:
         query = Task.query.filter(Task.deleted_at.is_(None))
     else:
-        conditions = [
-            Task.user_id == user_id,
-            Task.assigned_by_user_id == user_id,
-            text("tasks.assigned_users::jsonb @> :uid_json").params(uid_json=f'[{user_id}]'),
-            text("tasks.collaborators::jsonb @> :uid_json").params(uid_json=f'[{user_id}]')
-        ]
-        query = Task.query.filter(Task.deleted_at.is_(None)).filter(or_(*conditions))
+        query = Task.query.filter(Task.deleted_at.is_(None)).filter(visible_to(user_id))
 
     # status filter
     VALID_STATUSES = {"pending", "in_progress", "done", "cancelled", "archived"}
@@ -605,18 +756,20 @@ def get_tasks():
         if not include_archived:
             query = query.filter(Task.status != 'archived')
 
-    # dates
+    # dates (aplicadas no fim: séries recorrentes usam os demais filtros sem a janela)
+    due_filters = []
+    due_before_date = due_after_date = None
     if due_before:
         try:
             due_before_date = datetime.fromisoformat(due_before)
-            query = query.filter(Task.due_date != None, Task.due_date <= due_before_date)
+            due_filters += [Task.due_date != None, Task.due_date <= due_before_date]
         except ValueError:
             return jsonify({"error": "Formato inválido para due_before. Use ISO 8601."}), 400
 
     if due_after:
         try:
             due_after_date = datetime.fromisoformat(due_after)
-            query = query.filter(Task.due_date != None, Task.due_date >= due_after_date)
+            due_filters += [Task.due_date != None, Task.due_date >= due_after_date]
         except ValueError:
             return jsonify({"error": "Formato inválido para due_after. Use ISO 8601."}), 400
 
@@ -652,7 +805,7 @@ def get_tasks():
 
     # search / assigned_by / collaborator
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query = _apply_text_search(query, search)
 
     if assigned_by_user_id:
         try:
@@ -664,43 +817,96 @@ def get_tasks():
     if collaborator_id:
         try:
             collaborator_id = int(collaborator_id)
-            query = query.filter(
-                text("tasks.collaborators::jsonb @> :collab_id_json").params(collab_id_json=f'[{collaborator_id}]')
-            )
+            query = query.filter(participates(collaborator_id, TaskParticipant.ROLE_COLLABORATOR))
         except ValueError:
             return jsonify({"error": "collaborator_id inválido."}), 400
 
-    tasks = query.all()
+    # progresso das subtarefas (colunas materializadas)
+    has_subtasks = request.args.get("has_subtasks")
+    if has_subtasks is not None:
+        if str(has_subtasks).lower() in ("1", "true", "yes"):
+            query = query.filter(Task.subtasks_total > 0)
+        else:
+            query = query.filter(Task.subtasks_total == 0)
+    min_progress = request.args.get("min_progress")
+    max_progress = request.args.get("max_progress")
+    try:
+        if min_progress:
+            query = query.filter(Task.subtasks_percent >= int(min_progress))
+        if max_progress:
+            query = query.filter(Task.subtasks_percent <= int(max_progress))
+    except ValueError:
+        return jsonify({"error": "min_progress/max_progress inválido."}), 400
+
+    # janela fechada (calendário) na listagem simples: inclui ocorrências virtuais das séries
+    series_query = None
+    if due_after_date and due_before_date and not _wants_keyset_page() and status in (None, "pending"):
+        series_query = _series_query(query, due_before_date)
+    if due_filters:
+        query = query.filter(*due_filters)
+
+    spec, err = _resolve_task_sort("created_at", ("due_date", "created_at", "updated_at", "prioridade", "progress"))
+    if err:
+        return err
+    fields, err = _resolve_fields()
+    if err:
+        return err
+
+    # GET condicional: se nada mudou no escopo, 304 sem carregar nenhuma task
+    etag = make_etag(
+        "tasks", user_id, scope_version(query),
+        scope_version(series_query) if series_query is not None else None,
+        reference_version(), request_args_key(),
+    )
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
 
-    # enrich anexos
-    tasks_data = []
-    for task in tasks:
-        # inclui cores canônicas das tags
-        task_dict = _decorate_task_with_tag_colors(task)
-        task_dict["assigned_users"] = [int(uid) for uid in task_dict.get("assigned_users", [])]
-        task_dict["collaborators"] = [int(uid) for uid in task_dict.get("collaborators", [])]
-
-        if task_dict.get("anexos"):
-            anexos_enriched = []
-            for anexo in task_dict["anexos"]:
-                if isinstance(anexo, str):
-                    anexos_enriched.append({
-                        "id": anexo,
-                        "name": anexo,
-                        "url": f"{request.scheme}://{request.host}/uploads/{anexo}",
-                        "size": 0,
-                        "type": "application/octet-stream"
-                    })
-                else:
-                    a = anexo.copy()
-                    if "url" not in a:
-                        a["url"] = f"{request.scheme}://{request.host}/uploads/{a.get('name', '')}"
-                    anexos_enriched.append(a)
-            task_dict["anexos"] = anexos_enriched
+    query = query.options(*task_load_options(fields, extra_columns=(spec["column"],)))
 
-        tasks_data.append(task_dict)
+    if _wants_keyset_page():
+        page, err = _keyset_page(query, spec)
+        if err:
+            return err
+        tasks, next_cursor, limit = page
+    else:
+        # formato legado também é limitado; o resto sai via cursor no header
+        tasks, next_cursor = paginate_keyset(
+            query, spec["key"], spec["expr"], Task.id, spec["value_of"],
+            limit=LEGACY_LIST_LIMIT, cursor=None,
+            descending=spec["descending"], nullable=spec["nullable"],
+        )
 
-    return jsonify(tasks_data)
+    # serializa em lote (usuários/equipes/tags em um IN cada) + enrich anexos
+    tasks_data = []
+    for task_dict in _decorate_tasks_with_tag_colors(tasks, fields):
+        if "assigned_users" in task_dict:
+            task_dict["assigned_users"] = [int(uid) for uid in task_dict["assigned_users"]]
+        if "collaborators" in task_dict:
+            task_dict["collaborators"] = [int(uid) for uid in task_dict["collaborators"]]
+        tasks_data.append(_enrich_anexos(task_dict))
+
+    # sem limit/cursor mantém o formato legado (lista pura)
+    if not _wants_keyset_page():
+        if series_query is not None:
+            virtual = _virtual_occurrence_payloads(
+                series_query, fields, due_after_date, due_before_date + timedelta(microseconds=1)
+            )
+            if virtual:
+                tasks_data.extend(virtual)
+                if spec["name"] == "due_date":
+                    tasks_data.sort(key=lambda t: t.get("due_date") or "", reverse=spec["descending"])
+        resp = jsonify(tasks_data)
+        if next_cursor:
+            resp.headers["X-Next-Cursor"] = next_cursor
+        return with_etag(resp, etag)
+    return with_etag(jsonify({
+        "items": tasks_data,
+        "next_cursor": next_cursor,
+        "limit": limit,
+        "sort": spec["name"],
+        "order": "desc" if spec["descending"] else "asc",
+    }), etag)
 
 @task_bp.route("/tasks/counts", methods=["GET"])
 @jwt_required()
@@ -711,44 +917,337 @@ def get_task_counts():
     if not user or not user.is_active:
         return jsonify({"msg": "Usuário inválido ou inativo"}), 401
 
-    # 🚫 Sempre excluir concluídas/arquivadas
-    EXCLUDED_STATUSES = ["done"]
-    base_filters = [
-        Task.deleted_at.is_(None),
-        ~Task.status.in_(EXCLUDED_STATUSES),
-        Task.completed_at.is_(None)
-    ]
+    user_teams = [ut.team_id for ut in user.teams] if user.teams else []
+
+    # uma query com FILTER, em cache por usuário (invalidado nas escritas de tasks);
+    # concluídas, arquivadas e lixeira ficam de fora
+    counts = cached_task_counts(user_id, user_teams)
+
+    etag = make_etag("counts", user_id, sorted(counts.items()))
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    return with_etag(jsonify(counts), etag)
+
+
+@task_bp.route("/tasks/changes", methods=["GET"])
+@jwt_required()
+def get_task_changes():
+    """
+    Sincronização incremental: tasks criadas/alteradas/enviadas à lixeira/arquivadas,
+    ids purgados e ids que o usuário deixou de ver desde o cursor. Sem ?since= faz a carga inicial.
+    ?since=<next_cursor anterior>  ?limit=200  ?fields=
+    Com has_more=true, chamar de novo com o next_cursor até esgotar.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=200)
+    except ValueError:
+        return jsonify({"error": "limit inválido."}), 400
+    fields, err = _resolve_fields()
+    if err:
+        return err
+
+    # mesma visibilidade de GET /tasks, mas incluindo lixeira e arquivadas
+    query = Task.query
+    if not user.is_admin:
+        query = query.filter(visible_to(user_id))
+    query = query.options(*task_load_options(fields, extra_columns=("updated_at",)))
 
-    my_tasks_count = Task.query.filter(
-        *base_filters,
-        Task.team_id.is_(None),
-        or_(
-            Task.user_id == user_id,
-            text("tasks.assigned_users::jsonb @> :uid_json").params(uid_json=f'[{user_id}]')
+    try:
+        tasks, purged, removed, next_cursor, has_more = fetch_changes(
+            query, request.args.get("since"), limit,
+            user_id=None if user.is_admin else int(user_id),
         )
-    ).count()
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
 
-    user_teams = [ut.team_id for ut in user.teams] if user.teams else []
-    if user_teams:
-        team_tasks_count = Task.query.filter(
-            *base_filters,
-            Task.team_id.in_(user_teams)
-        ).count()
+    changes = [_enrich_anexos(d) for d in _decorate_tasks_with_tag_colors(tasks, fields)]
+    return jsonify({
+        "changes": changes,
+        "purged": purged,  # só ids: a task não existe mais
+        "removed": removed,  # ids de tasks que o usuário deixou de ver (aplicar antes de "changes")
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    })
+
+@task_bp.route("/tasks/search", methods=["GET"])
+@jwt_required()
+def search_tasks():
+    """
+    Busca textual ranqueada (título > tags > descrição > comentários), com trecho destacado.
+    ?q=...  ?prefix=true (typeahead)  ?include_archived=true  ?limit=20 (máx. 50)  ?fields=card
+    Respeita a mesma visibilidade de GET /tasks.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+
+    q = (request.args.get("q") or "").strip()
+    prefix = str(request.args.get("prefix", "false")).lower() in ("1", "true", "yes")
+    include_archived = str(request.args.get("include_archived", "false")).lower() in ("1", "true", "yes")
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=50)
+    except ValueError:
+        return jsonify({"error": "limit inválido."}), 400
+    fields, err = _resolve_fields(default="card")
+    if err:
+        return err
+
+    if not search_available():
+        return jsonify({"error": "Busca textual não configurada neste servidor (manage.py setup-task-search)."}), 503
+    tsq = build_tsquery(q, prefix=prefix)
+    if tsq is None:
+        return jsonify({"items": [], "q": q, "prefix": prefix, "limit": limit})
+
+    query = Task.query.filter(Task.deleted_at.is_(None), search_matches(tsq))
+    if not user.is_admin:
+        query = query.filter(visible_to(user_id))
+    if not include_archived:
+        query = query.filter(Task.status != 'archived')
+
+    # ranqueia só ids; o ts_headline (caro) roda apenas nas N linhas do topo
+    score = search_rank(tsq).label("rank")
+    top = (query.with_entities(Task.id.label("id"), score)
+                .order_by(score.desc(), Task.id.desc())
+                .limit(limit)
+                .subquery())
+    rows = (db.session.query(Task, top.c.rank, search_headline(tsq))
+                .join(top, top.c.id == Task.id)
+                .options(*task_load_options(fields))
+                .order_by(top.c.rank.desc(), Task.id.desc())
+                .all())
+
+    items = _decorate_tasks_with_tag_colors([r[0] for r in rows], fields)
+    for item, (_task, r, snippet) in zip(items, rows):
+        item["rank"] = float(r or 0)
+        item["highlight"] = snippet
+
+    return jsonify({"items": items, "q": q, "prefix": prefix, "limit": limit})
+
+CALENDAR_COLUMNS = ("id", "title", "status", "due_date", "team_color", "prioridade")
+CALENDAR_MAX_DAYS = 100
+
+@task_bp.route("/tasks/calendar", methods=["GET"])
+@jwt_required()
+def get_tasks_calendar():
+    """
+    Tasks com due_date em [from, to) em formato compacto para as visões de mês/semana
+    (inclui ocorrências virtuais de séries recorrentes):
+    {"columns": [...], "rows": [[id, title, status, due_date, team_color, prioridade], ...]}
+    ?from=&to= (ISO 8601, obrigatórios; máx. 100 dias)  ?include_archived=true
+    Respeita a mesma visibilidade de GET /tasks.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+
+    if not request.args.get("from") or not request.args.get("to"):
+        return jsonify({"error": "Parâmetros from e to são obrigatórios."}), 400
+    try:
+        date_from = datetime.fromisoformat(request.args["from"])
+        date_to = datetime.fromisoformat(request.args["to"])
+    except ValueError:
+        return jsonify({"error": "Formato inválido para from/to. Use ISO 8601."}), 400
+    if date_from >= date_to:
+        return jsonify({"error": "from deve ser anterior a to."}), 400
+    if (date_to - date_from).days > CALENDAR_MAX_DAYS:
+        return jsonify({"error": f"Intervalo máximo de {CALENDAR_MAX_DAYS} dias."}), 400
+    include_archived = str(request.args.get("include_archived", "false")).lower() in ("1", "true", "yes")
+
+    query = Task.query.filter(Task.deleted_at.is_(None))
+    if not user.is_admin:
+        query = query.filter(visible_to(user_id))
+    if not include_archived:
+        query = query.filter(Task.status != 'archived')
+    series_query = _series_query(query, date_to)
+    query = query.filter(Task.due_date >= date_from, Task.due_date < date_to)
+
+    etag = make_etag(
+        "calendar", user_id, scope_version(query), scope_version(series_query),
+        reference_version(), request_args_key(),
+    )
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    rows = (query.outerjoin(Team, Team.id == Task.team_id)
+                 .with_entities(Task.id, Task.title, Task.status, Task.due_date,
+                                Team.name, Task.prioridade)
+                 .order_by(Task.due_date, Task.id)
+                 .all())
+
+    # ocorrências virtuais das séries recorrentes (id "<série>@<AAAAMMDDTHHMMSS>")
+    series = (series_query.options(load_only(
+                  Task.id, Task.title, Task.prioridade, Task.team_id,
+                  Task.due_date, Task.recurrence_rule, Task.recurrence_start))
+              .all())
+    occurrences = virtual_occurrences(series, date_from, date_to)
+    team_names = {}
+    if occurrences:
+        team_ids = {s.team_id for s, _ in occurrences if s.team_id}
+        if team_ids:
+            team_names = dict(db.session.query(Team.id, Team.name).filter(Team.id.in_(team_ids)).all())
+    rows += [
+        (occurrence_key(s.id, when), s.title, "pending", when, team_names.get(s.team_id), s.prioridade)
+        for s, when in occurrences
+    ]
+    rows.sort(key=lambda r: r[3])
+
+    colors = {}
+    out = []
+    for task_id, title, status, due_date, team_name, prioridade in rows:
+        color = None
+        if team_name:
+            color = colors.get(team_name) or colors.setdefault(team_name, _stable_color_for_name(team_name))
+        out.append([task_id, title, status, due_date.isoformat(), color, prioridade])
+
+    return with_etag(jsonify({"columns": CALENDAR_COLUMNS, "rows": out}), etag)
+
+BOARD_STATUSES = ("pending", "in_progress", "done", "cancelled", "archived")
+
+def _board_cursor_key(group_by: str, column, spec) -> str:
+    """Chave do cursor de uma coluna: cursor de uma coluna/ordenação não vale em outra."""
+    return f"board:{group_by}:{'' if column is None else column}:{spec['key']}"
+
+def _board_column_keys(group_by: str, present, include_archived: bool) -> list:
+    """Colunas na ordem de exibição (status e prioridade aparecem mesmo vazios)."""
+    if group_by == "status":
+        fixed = [st for st in BOARD_STATUSES if include_archived or st != "archived"]
+    elif group_by == "prioridade":
+        fixed = list(PRIORIDADE_ORDER)
     else:
-        team_tasks_count = 0
+        fixed = []
+    extra = sorted((k for k in present if k is not None and k not in fixed), key=str)
+    tail = [None] if None in present or group_by == "prioridade" else []
+    return fixed + extra + tail
+
+@task_bp.route("/tasks/board", methods=["GET"])
+@jwt_required()
+def get_tasks_board():
+    """
+    Quadro kanban: por coluna, total + primeiras N tasks + cursor de continuação.
+    ?group_by=status|prioridade|team  ?limit=20 (por coluna, máx. 100)  ?sort= ?order= ?fields=card
+    ?team_id= (admin ou gestor)  ?include_archived=true
+    Continuação de uma coluna: ?column=<valor>&cursor=<next_cursor>  (column vazio = sem valor)
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+
+    group_by = (request.args.get("group_by") or "status").lower()
+    if group_by not in BOARD_GROUPS:
+        return jsonify({"error": f"group_by inválido. Use: {', '.join(BOARD_GROUPS)}."}), 400
+    include_archived = str(request.args.get("include_archived", "false")).lower() in ("1", "true", "yes")
+
+    try:
+        limit = parse_limit(request.args.get("limit"), default=20, maximum=100)
+    except ValueError:
+        return jsonify({"error": "limit inválido."}), 400
+    spec, err = _resolve_task_sort("due_date", ("due_date", "created_at", "updated_at", "prioridade", "progress"))
+    if err:
+        return err
+    fields, err = _resolve_fields(default="card")
+    if err:
+        return err
+
+    query = Task.query.filter(Task.deleted_at.is_(None))
+    if not user.is_admin:
+        query = query.filter(visible_to(user_id))
+    if not include_archived:
+        query = query.filter(Task.status != 'archived')
+
+    team_id_param = request.args.get("team_id")
+    if team_id_param:
+        try:
+            team_id_int = int(team_id_param)
+        except ValueError:
+            return jsonify({"error": "team_id inválido."}), 400
+        if not user.is_admin and team_id_int not in [ut.team_id for ut in user.teams if ut.is_manager]:
+            return jsonify({"error": "Acesso negado para este team_id."}), 403
+        query = query.filter(Task.team_id == team_id_int)
+
+    options = task_load_options(fields, extra_columns=(spec["column"],))
+    group_expr = BOARD_GROUPS[group_by]
+
+    # continuação de uma coluna: keyset comum filtrado pelo valor da coluna
+    if "column" in request.args:
+        raw = request.args.get("column") or None
+        column = raw
+        if raw is not None and group_by == "team":
+            try:
+                column = int(raw)
+            except ValueError:
+                return jsonify({"error": "column inválido."}), 400
+        col_query = query.filter(group_expr.is_(None) if column is None else group_expr == column)
+        try:
+            tasks, next_cursor = paginate_keyset(
+                col_query.options(*options), _board_cursor_key(group_by, column, spec),
+                spec["expr"], Task.id, spec["value_of"],
+                limit=limit,
+                cursor=request.args.get("cursor") or None,
+                descending=spec["descending"],
+                nullable=spec["nullable"],
+            )
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({
+            "group_by": group_by,
+            "key": column,
+            "items": [_enrich_anexos(d) for d in _decorate_tasks_with_tag_colors(tasks, fields)],
+            "next_cursor": next_cursor,
+        })
 
-    collaborative_tasks_count = Task.query.filter(
-        *base_filters,
-        text("tasks.collaborators::jsonb @> :uid_json").params(uid_json=f'[{user_id}]')
-    ).count()
+    pages = board_first_pages(query, group_by, spec["expr"], spec["descending"], limit, options)
+
+    # serializa todas as colunas em lote (usuários/equipes/tags em um IN cada)
+    all_tasks = [t for _total, tasks in pages.values() for t in tasks]
+    payloads = {t.id: p for t, p in zip(all_tasks, _decorate_tasks_with_tag_colors(all_tasks, fields))}
+
+    labels = {}
+    if group_by == "team":
+        team_ids = [k for k in pages if k is not None]
+        if team_ids:
+            labels = dict(db.session.query(Team.id, Team.name).filter(Team.id.in_(team_ids)).all())
+        labels[None] = "Pessoais"
+    elif group_by == "prioridade":
+        labels[None] = "Sem prioridade"
+
+    columns = []
+    for key in _board_column_keys(group_by, pages, include_archived):
+        total, tasks = pages.get(key, (0, []))
+        next_cursor = None
+        if total > len(tasks) and tasks:
+            last = tasks[-1]
+            next_cursor = encode_cursor(_board_cursor_key(group_by, key, spec), spec["value_of"](last), last.id)
+        columns.append({
+            "key": key,
+            "label": labels.get(key, key),
+            "count": total,
+            "items": [_enrich_anexos(payloads[t.id]) for t in tasks],
+            "next_cursor": next_cursor,
+        })
 
     return jsonify({
-        "my_tasks": my_tasks_count,
-        "team_tasks": team_tasks_count,
-        "collaborative_tasks": collaborative_tasks_count
+        "group_by": group_by,
+        "limit": limit,
+        "sort": spec["name"],
+        "order": "desc" if spec["descending"] else "asc",
+        "columns": columns,
     })
 
-
 @task_bp.route("/tasks", methods=["POST"])
 @jwt_required()
 def add_task():
@@ -778,6 +1277,11 @@ def add_task():
             except ValueError:
                 return jsonify({"error": "Formato inválido para due_date. Use ISO 8601."}), 400
 
+        # --- recorrência (RRULE; ocorrências expandidas sob demanda) ---
+        recurrence_rule, err = _parse_recurrence_rule(data.get("recurrence_rule"), due_date)
+        if err:
+            return err
+
         # --- team ---
         team_id = data.get("team_id")
         if team_id:
@@ -909,8 +1413,11 @@ def add_task():
             lembretes=lembretes,
             tags=tag_names,           # <— grava SÓ nomes
             anexos=anexos_data,
-            requires_approval=req_approval_flag
+            requires_approval=req_approval_flag,
+            recurrence_rule=recurrence_rule,
+            recurrence_start=due_date if recurrence_rule else None,
         )
+        new_task.sync_participants()
 
         db.session.add(new_task)
         db.session.commit()  # também persiste tags criadas
@@ -954,7 +1461,14 @@ def add_task():
 def get_task(task_id):
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
-    task = Task.query.get(task_id)
+    # só as colunas da checagem de acesso + versão; o resto vem se não der 304
+    task = (Task.query
+                .options(load_only(
+                    Task.id, Task.user_id, Task.assigned_by_user_id, Task.team_id,
+                    Task.assigned_users, Task.collaborators, Task.deleted_at, Task.updated_at,
+                ))
+                .filter(Task.id == task_id)
+                .first())
 
     if task is None:
         return jsonify({"error": "Tarefa não encontrada"}), 404
@@ -966,6 +1480,15 @@ def get_task(task_id):
     if not task.can_be_viewed_by(user):
         return jsonify({"error": "Acesso negado"}), 403
 
+    etag = make_etag(
+        "task", user_id, task.id, task.updated_at.isoformat() if task.updated_at else None,
+        reference_version(),
+    )
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    task = Task.query.populate_existing().get(task_id)
     task_dict = _decorate_task_with_tag_colors(task)
     
     # Enriquecer anexos com URLs completas
@@ -989,7 +1512,52 @@ def get_task(task_id):
         
         task_dict["anexos"] = anexos_enriched
 
-    return jsonify(task_dict)
+    return with_etag(jsonify(task_dict), etag)
+
+@task_bp.route("/tasks/<int:task_id>/history", methods=["GET"])
+@jwt_required()
+def get_task_history(task_id):
+    """
+    Histórico de edições da task (task_changes), mais recentes primeiro.
+    Paginado por cursor em (at, id): ?limit ?cursor.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    task = (Task.query
+                .options(load_only(
+                    Task.id, Task.user_id, Task.assigned_by_user_id, Task.team_id,
+                    Task.assigned_users, Task.collaborators, Task.deleted_at,
+                ))
+                .filter(Task.id == task_id)
+                .first())
+
+    if task is None:
+        return jsonify({"error": "Tarefa não encontrada"}), 404
+    if not task.can_be_viewed_by(user):
+        return jsonify({"error": "Acesso negado"}), 403
+
+    try:
+        limit = parse_limit(request.args.get("limit"))
+    except ValueError:
+        return jsonify({"error": "limit inválido."}), 400
+
+    query = TaskChange.query.options(joinedload(TaskChange.actor)).filter(TaskChange.task_id == task.id)
+    try:
+        changes, next_cursor = paginate_keyset(
+            query, "at", TaskChange.at, TaskChange.id, lambda c: c.at,
+            limit=limit,
+            cursor=request.args.get("cursor") or None,
+            descending=True,
+            nullable=False,
+        )
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [c.to_dict() for c in changes],
+        "next_cursor": next_cursor,
+        "limit": limit,
+    }), 200
 
 @task_bp.route("/tasks/<int:task_id>", methods=["PUT"])
 @jwt_required()
@@ -1018,6 +1586,7 @@ def update_task(task_id):
         return jsonify({"error": "Tarefa não encontrada"}), 404
 
     before_state = task.to_dict()
+    former_owners = (task.user_id, task.assigned_by_user_id)  # reatribuição: "removed" para quem sair
 
     can_reassign = bool(user and (user.is_admin or task.can_be_assigned_by(user)))
     can_basic_edit = bool(user and (user.is_admin or task.user_id == user.id or task.assigned_by_user_id == user.id))
@@ -1049,10 +1618,24 @@ def update_task(task_id):
                 due_date = due_date.replace(tzinfo=None)
             if due_date < datetime.utcnow():
                 return jsonify({"error": "A data de vencimento não pode ser no passado."}), 400
+            if task.recurrence_rule and task.recurrence_start is None:
+                # fixa a âncora antes de mover: remarcar a ocorrência atual não reinicia a regra (COUNT)
+                task.recurrence_start = task.due_date
             task.due_date = due_date
         except ValueError:
             return jsonify({"error": "Formato inválido para due_date. Use ISO 8601."}), 400
 
+    # --- recorrência ---
+    if "recurrence_rule" in data:
+        if task.recurrence_parent_id and data.get("recurrence_rule"):
+            return jsonify({"error": "Uma ocorrência de série não pode ter recorrência própria."}), 400
+        rule, err = _parse_recurrence_rule(data.get("recurrence_rule"), task.due_date)
+        if err:
+            return err
+        if rule != task.recurrence_rule:
+            task.recurrence_rule = rule
+            task.recurrence_start = task.due_date if rule else None
+
     # --- básicos ---
     if data.get("title") is not None:
         task.title = data["title"]
@@ -1105,6 +1688,9 @@ def update_task(task_id):
                 task.mark_done()
             except ValueError as ve:
                 return jsonify({"error": str(ve)}), 409
+            if task.recurrence_rule and prev_status != "done":
+                # série: ocorrência atual vira linha concluída, série segue na próxima
+                advance_series(task)
         else:
             task.status = new_status
 
@@ -1211,7 +1797,7 @@ def update_task(task_id):
             if isinstance(incoming, list):
                 task.subtasks = incoming
                 try:
-                    task._coerce_subtasks()
+                    task.refresh_subtask_progress()
                 except Exception:
                     pass
         except Exception:
@@ -1226,12 +1812,20 @@ def update_task(task_id):
     except Exception:
         pass
 
+    # --- participantes normalizados (assigned_users/collaborators) ---
+    task.sync_participants(former_user_ids=former_owners)
+
     # --- valida calendário ---
     if create_cal_flag and not task.due_date:
         return jsonify({"error": "Para adicionar ao Outlook, defina a Data de Vencimento."}), 400
 
-    # --- salvar + calendário ---
+    # --- diff (histórico estruturado grava na mesma transação da edição) ---
     task.updated_at = datetime.utcnow()
+    after_state = task.to_dict()
+    changes = diff_snapshots(before_state, after_state)
+    TaskChange.record(task.id, int(user_id), changes, at=task.updated_at)
+
+    # --- salvar + calendário ---
     db.session.commit()
 
     try:
@@ -1246,8 +1840,6 @@ def update_task(task_id):
 
     # --- auditoria (diff) ---
     try:
-        after_state = task.to_dict()
-        changes = diff_snapshots(before_state, after_state)
         desc = f"Mudanças:\n{format_changes_for_description(changes)}"
         created = None
         try:
@@ -1274,7 +1866,8 @@ def update_task(task_id):
                 user_agent=request.headers.get("User-Agent"),
             )
         try:
-            current_app.logger.info(f"[AUDIT] UPDATE task={task.id} audit_id={getattr(created, 'id', None)}")
+            where = f"audit_id={created.id}" if created is not None else "enfileirado"
+            current_app.logger.info(f"[AUDIT] UPDATE task={task.id} {where}")
         except Exception:
             pass
     except Exception:
@@ -1314,8 +1907,10 @@ def delete_task(task_id):
         return jsonify({"message": "Tarefa já está na lixeira"}), 200
 
     # Soft delete: não removemos anexos do disco no soft delete
+    before_state = deepcopy(task.to_dict())
     task.soft_delete(user_id=user_id)
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     # Apaga no Outlook se tiver vínculo
@@ -1412,31 +2007,30 @@ def get_team_members(team_id):
 @jwt_required()
 def get_available_collaborators():
     user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    # Buscar todos os usuários ativos (exceto o próprio usuário)
-    users = User.query.filter(User.is_active == True, User.id != user_id).all()
-    
-    collaborators = []
-    for u in users:
-        collaborators.append({
+    return jsonify(available_collaborators(user_id))
+
+def available_collaborators(user_id) -> list[dict]:
+    """Usuários ativos (exceto o próprio) com suas equipes, carregadas em lote."""
+    users = (User.query
+                 .options(selectinload(User.teams).selectinload(UserTeam.team))
+                 .filter(User.is_active == True, User.id != user_id)
+                 .all())
+    return [
+        {
             "id": u.id,
             "username": u.username,
             "email": u.email,
             "teams": [{"id": assoc.team.id, "name": assoc.team.name} for assoc in u.teams]
-        })
-    
-    return jsonify(collaborators)
-
-@task_bp.route("/tasks/reports", methods=["GET"])
-@jwt_required()
-def get_task_reports():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-
-    if not user or not user.is_active:
-        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+        }
+        for u in users
+    ]
 
+def _report_query(user_id):
+    """
+    Query base de relatórios/exportação: tasks visíveis + filtros
+    ?start_date ?end_date (created_at) ?status ?priority ?category ?active_only.
+    Retorna (query, erro).
+    """
     start_date_str = request.args.get("start_date")
     end_date_str = request.args.get("end_date")
     status = request.args.get("status")
@@ -1446,12 +2040,7 @@ def get_task_reports():
 
     query = Task.query.filter(
         Task.deleted_at.is_(None),
-        or_(
-            Task.user_id == user_id,
-            Task.assigned_by_user_id == user_id,
-            text("tasks.assigned_users::jsonb @> :user_id_json").params(user_id_json=f'[{user_id}]'),
-            text("tasks.collaborators::jsonb @> :user_id_json").params(user_id_json=f'[{user_id}]')
-        )
+        visible_to(user_id)
     )
 
     if active_only:
@@ -1462,14 +2051,14 @@ def get_task_reports():
             start_date = datetime.fromisoformat(start_date_str)
             query = query.filter(Task.created_at >= start_date)
         except ValueError:
-            return jsonify({"error": "Formato inválido para start_date. Use ISO 8601."}), 400
+            return None, (jsonify({"error": "Formato inválido para start_date. Use ISO 8601."}), 400)
 
     if end_date_str:
         try:
             end_date = datetime.fromisoformat(end_date_str)
             query = query.filter(Task.created_at <= end_date)
         except ValueError:
-            return jsonify({"error": "Formato inválido para end_date. Use ISO 8601."}), 400
+            return None, (jsonify({"error": "Formato inválido para end_date. Use ISO 8601."}), 400)
 
     if status:
         query = query.filter(Task.status == status)
@@ -1478,81 +2067,145 @@ def get_task_reports():
     if category:
         query = query.filter(Task.categoria == category)
 
-    tasks = query.all()
-
-    report_data = {
-        "total_tasks": len(tasks),
-        "tasks_by_status": {},
-        "tasks_by_priority": {},
-        "tasks_by_category": {},
-        "tasks_completed_on_time": 0,
-        "tasks_completed_late": 0,
-        "average_completion_time": "N/A",
-        "overdue_tasks": 0,
-        "upcoming_tasks": 0,
-        "detailed_tasks": []
-    }
+    return query, None
+
+@task_bp.route("/tasks/reports", methods=["GET"])
+@jwt_required()
+def get_task_reports():
+    """
+    Agregados calculados no banco (services/task_reports).
+    Lista de tasks é opcional e paginada: ?include_tasks=true&limit=50&cursor=...&fields=
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
+
+    query, err = _report_query(user_id)
+    if err:
+        return err
+
+    # "agora" avaliado por requisição (datas no banco são UTC naive)
+    report_data = build_task_report(query, now=datetime.utcnow())
+
+    include_tasks = str(request.args.get("include_tasks", "false")).lower() in ("1", "true", "yes")
+    if include_tasks:
+        spec, err = _resolve_task_sort("created_at", ("due_date", "created_at", "updated_at", "prioridade"))
+        if err:
+            return err
+        fields, err = _resolve_fields()
+        if err:
+            return err
+        page, err = _keyset_page(
+            query.options(*task_load_options(fields, extra_columns=(spec["column"],))), spec
+        )
+        if err:
+            return err
+        tasks, next_cursor, _limit = page
+        report_data["detailed_tasks"] = project_tasks(tasks, fields)
+        report_data["detailed_next_cursor"] = next_cursor
+
+    return jsonify(report_data)
+
+EXPORT_FORMATS = ("csv", "xlsx")
 
-    completed_tasks_times = []
+@task_bp.route("/tasks/export", methods=["GET"])
+@jwt_required()
+def export_tasks():
+    """
+    Exporta as tasks do relatório (mesmos filtros de /tasks/reports) em ?format=csv|xlsx.
+    CSV é enviado em streaming direto do cursor; XLSX é montado em arquivo temporário.
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
 
-    for task in tasks:
-        task_dict = task.to_dict()
-        report_data["detailed_tasks"].append(task_dict)
+    if not user or not user.is_active:
+        return jsonify({"msg": "Usuário inválido ou inativo"}), 401
 
-        # Contagem por status
-        report_data["tasks_by_status"][task.status] = report_data["tasks_by_status"].get(task.status, 0) + 1
+    fmt = (request.args.get("format") or "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"format inválido. Use: {', '.join(EXPORT_FORMATS)}."}), 400
 
-        # Contagem por prioridade
-        if task.prioridade:
-            report_data["tasks_by_priority"][task.prioridade] = report_data["tasks_by_priority"].get(task.prioridade, 0) + 1
+    query, err = _report_query(user_id)
+    if err:
+        return err
 
-        # Contagem por categoria
-        if task.categoria:
-            report_data["tasks_by_category"][task.categoria] = report_data["tasks_by_category"].get(task.categoria, 0) + 1
+    filename = f'tarefas_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{fmt}'
 
-        # Normalizar due_date para o fuso do Brasil (se existir)
-        due_date_local = None
-        if task.due_date:
-            try:
-                # assumindo timestamps UTC no banco
-                due_date_local = task.due_date.replace(tzinfo=timezone("UTC")).astimezone(brazil_tz)
-            except Exception:
-                # se já for naive/local, usa direto
-                due_date_local = task.due_date
-
-        # Critério único de "concluída" válida
-        is_completed_valid = (
-            task.status == 'done' and
-            (not getattr(task, "requires_approval", False) or getattr(task, "approval_status", None) == 'approved')
+    if fmt == "xlsx":
+        tmp = tempfile.TemporaryFile()
+        try:
+            write_xlsx(query, tmp)
+        except Exception:
+            tmp.close()
+            raise
+        resp = send_file(
+            tmp,
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            as_attachment=True,
+            download_name=filename,
+        )
+    else:
+        resp = Response(
+            stream_with_context(iter_csv(query)),
+            mimetype="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
         )
 
-        # Concluídas no prazo/atrasadas
-        if is_completed_valid and task.due_date:
-            if task.updated_at and task.updated_at <= task.due_date:
-                report_data["tasks_completed_on_time"] += 1
-            else:
-                report_data["tasks_completed_late"] += 1
-
-            if task.created_at and task.updated_at:
-                time_taken = (task.updated_at - task.created_at).total_seconds()
-                completed_tasks_times.append(time_taken)
-
-        # Overdue / Upcoming (apenas uma vez, sem contar duas vezes)
-        if due_date_local and task.status != 'done':
-            if due_date_local < now_brazil:
-                report_data["overdue_tasks"] += 1
-            elif due_date_local > now_brazil:
-                report_data["upcoming_tasks"] += 1
-
-    # Tempo médio de conclusão
-    if completed_tasks_times:
-        avg_seconds = sum(completed_tasks_times) / len(completed_tasks_times)
-        days = int(avg_seconds // (24 * 3600))
-        hours = int((avg_seconds % (24 * 3600)) // 3600)
-        minutes = int((avg_seconds % 3600) // 60)
-        report_data["average_completion_time"] = f"{days}d {hours}h {minutes}m"
+    try:
+        AuditLog.log_action(
+            user_id=int(user_id),
+            action="EXPORT_TASKS",
+            description=f"Exportou relatório de tarefas ({fmt.upper()})",
+            resource_type="Task",
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get("User-Agent"),
+        )
+    except Exception:
+        current_app.logger.exception("Falha ao registrar auditoria da exportação")
 
-    return jsonify(report_data)
+    return resp
+
+@task_bp.route("/tasks/<int:task_id>/occurrences/<stamp>", methods=["POST"])
+@jwt_required()
+def materialize_task_occurrence(task_id, stamp):
+    """
+    Transforma uma ocorrência virtual da série (id "<série>@<AAAAMMDDTHHMMSS>") em
+    task real, para poder editar, comentar ou concluir. Idempotente: se a
+    ocorrência já existe, devolve a linha existente (200).
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+    series = Task.query.get(task_id)
+
+    if not series or series.is_deleted:
+        return jsonify({"error": "Tarefa não encontrada"}), 404
+    if not series.can_be_viewed_by(user):
+        return jsonify({"error": "Acesso negado"}), 403
+    if not series.recurrence_rule:
+        return jsonify({"error": "Tarefa não é recorrente."}), 400
+
+    try:
+        occurrence, created = materialize_occurrence(series, parse_occurrence_stamp(stamp))
+    except InvalidRule as e:
+        return jsonify({"error": str(e)}), 400
+    if not created:
+        return jsonify(_decorate_task_with_tag_colors(occurrence)), 200
+
+    db.session.commit()
+
+    AuditLog.log_action(
+        user_id=user_id,
+        action="CREATE",
+        resource_type="Task",
+        resource_id=occurrence.id,
+        description=f"Ocorrência {occurrence.due_date.isoformat()} da série {series.id} materializada: {occurrence.title}.",
+        ip_address=request.remote_addr,
+        user_agent=request.headers.get("User-Agent")
+    )
+
+    return jsonify(_decorate_task_with_tag_colors(occurrence)), 201
 
 @task_bp.route("/tasks/<int:task_id>/restore", methods=["POST"])
 @jwt_required()
@@ -1576,8 +2229,10 @@ def restore_task(task_id):
     if not task.is_deleted:
         return jsonify({"message": "Tarefa não está na lixeira"}), 200
 
+    before_state = deepcopy(task.to_dict())
     task.restore()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     # Auditoria
@@ -1603,20 +2258,33 @@ def list_trash():
     if user.is_admin:
         query = Task.query.filter(Task.deleted_at.isnot(None))
     else:
-        conditions = [
-            Task.user_id == user_id,
-            Task.assigned_by_user_id == user_id,
-            text("tasks.assigned_users::jsonb @> :uid_json").params(uid_json=f'[{user_id}]'),
-            text("tasks.collaborators::jsonb @> :uid_json").params(uid_json=f'[{user_id}]')
-        ]
-        query = Task.query.filter(Task.deleted_at.isnot(None)).filter(or_(*conditions))
+        query = Task.query.filter(Task.deleted_at.isnot(None)).filter(visible_to(user_id))
 
     search = request.args.get("search")
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
-
-    tasks = query.order_by(Task.deleted_at.desc()).all()
-    return jsonify([t.to_dict() for t in tasks]), 200
+        query = _apply_text_search(query, search)
+
+    fields, err = _resolve_fields()
+    if err:
+        return err
+
+    if _wants_keyset_page():
+        spec, err = _resolve_task_sort("deleted_at", ("deleted_at", "due_date", "created_at", "updated_at", "prioridade"))
+        if err:
+            return err
+        query = query.options(*task_load_options(fields, extra_columns=(spec["column"],)))
+        page, err = _keyset_page(query, spec)
+        if err:
+            return err
+        tasks, next_cursor, limit = page
+        return jsonify({
+            "items": project_tasks(tasks, fields),
+            "next_cursor": next_cursor,
+            "limit": limit,
+        }), 200
+
+    tasks = query.options(*task_load_options(fields)).order_by(Task.deleted_at.desc()).all()
+    return jsonify(project_tasks(tasks, fields)), 200
 
 @task_bp.route("/tasks/<int:task_id>/unarchive", methods=["POST"])
 @jwt_required()
@@ -1631,8 +2299,10 @@ def unarchive_task(task_id):
     if not task.can_be_viewed_by(user):
         return jsonify({"error": "Acesso negado"}), 403
 
+    before_state = deepcopy(task.to_dict())
     task.unarchive(new_status="pending")
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     from models.audit_log_model import AuditLog
@@ -1657,7 +2327,8 @@ def list_archived_tasks_paginated():
     if not user or not user.is_active:
         return jsonify({"msg": "Usuário inválido ou inativo"}), 401
 
-    # paginação
+    # paginação: limit/cursor (keyset) ou page/page_size (legado, OFFSET + COUNT)
+    keyset = _wants_keyset_page()
     try:
         page = int(request.args.get("page", 1))
         page_size = int(request.args.get("page_size", 50))
@@ -1674,48 +2345,43 @@ def list_archived_tasks_paginated():
             Task.status == 'archived'
         )
     else:
-        conditions = [
-            Task.user_id == user_id,
-            Task.assigned_by_user_id == user_id,
-            text("tasks.assigned_users::jsonb @> :uid_json").params(uid_json=f'[{user_id}]'),
-            text("tasks.collaborators::jsonb @> :uid_json").params(uid_json=f'[{user_id}]')
-        ]
         query = Task.query.filter(
             Task.deleted_at.is_(None),
             Task.status == 'archived'
-        ).filter(or_(*conditions))
+        ).filter(visible_to(user_id))
 
     if search:
-        query = query.filter(Task.title.ilike(f"%{search}%"))
+        query = _apply_text_search(query, search)
+
+    fields, err = _resolve_fields()
+    if err:
+        return err
+
+    if keyset:
+        spec, err = _resolve_task_sort("archived_at", ("archived_at", "due_date", "created_at", "updated_at", "prioridade"))
+        if err:
+            return err
+        query = query.options(*task_load_options(fields, extra_columns=(spec["column"],)))
+        result, err = _keyset_page(query, spec)
+        if err:
+            return err
+        items, next_cursor, limit = result
+        return jsonify({
+            "items": [_enrich_anexos(td) for td in project_tasks(items, fields)],
+            "next_cursor": next_cursor,
+            "limit": limit,
+        }), 200
+
     total = query.count()
 
     items = (query
+             .options(*task_load_options(fields))
              .order_by(Task.archived_at.desc().nullslast(), Task.updated_at.desc())
              .offset((page - 1) * page_size)
              .limit(page_size)
              .all())
 
-    payload = []
-    for task in items:
-        td = task.to_dict()
-        if td.get("anexos"):
-            anexos_enriched = []
-            for anexo in td["anexos"]:
-                if isinstance(anexo, str):
-                    anexos_enriched.append({
-                        "id": anexo,
-                        "name": anexo,
-                        "url": f"{request.scheme}://{request.host}/uploads/{anexo}",
-                        "size": 0,
-                        "type": "application/octet-stream"
-                    })
-                else:
-                    a = anexo.copy()
-                    if "url" not in a:
-                        a["url"] = f"{request.scheme}://{request.host}/uploads/{a.get('name','')}"
-                    anexos_enriched.append(a)
-            td["anexos"] = anexos_enriched
-        payload.append(td)
+    payload = [_enrich_anexos(td) for td in project_tasks(items, fields)]
 
     return jsonify({
         "items": payload,
@@ -1741,8 +2407,10 @@ def submit_task_for_approval(task_id):
     if not task.requires_manager_approval():
         return jsonify({"message": "Esta tarefa não requer aprovação."}), 200
 
+    before_state = deepcopy(task.to_dict())
     task.submit_for_approval()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     # Notifica gestor(es)
@@ -1785,12 +2453,16 @@ def approve_task(task_id):
     if task.is_approved():
         return jsonify({"message": "Tarefa já está aprovada.", "task": task.to_dict()}), 200
 
+    before_state = deepcopy(task.to_dict())
     task.set_approved(approver_user_id=user_id)
     try:
         task.mark_done()
     except Exception:
         pass
+    if task.status == "done" and task.recurrence_rule:
+        advance_series(task)
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     # Notifica todos os responsáveis
@@ -1831,6 +2503,7 @@ def reject_task(task_id):
     if not task.requires_manager_approval():
         return jsonify({"message": "Esta tarefa não requer aprovação."}), 200
 
+    before_state = deepcopy(task.to_dict())
     task.set_rejected(approver_user_id=user_id)
     # Se estava em done por alguma inconsistência, volta para in_progress
     if task.status == 'done':
@@ -1838,6 +2511,7 @@ def reject_task(task_id):
         task.completed_at = None
 
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
 
     # Notifica todos os responsáveis
@@ -1911,16 +2585,24 @@ def create_tag():
     if not name:
         return jsonify({"error": "name é obrigatório"}), 400
 
-    user_id = int(get_jwt_identity())
-    tag = Tag.query.filter_by(slug=name.lower()).first()
-    if tag:
-        return jsonify({"message": "Tag já existe", "tag": {"name": tag.name, "color": tag.color}}), 409
-
     if color and not HEX_RE.match(color):
         return jsonify({"error": "Cor inválida. Use #RRGGBB."}), 400
 
-    tag, _ = get_or_create_tag(name, color, user_id)
-    db.session.commit()
+    # unicidade decidida pelo banco (uq_tags_slug), não pelo catálogo em memória
+    user_id = int(get_jwt_identity())
+    tag = Tag(name=name, slug=name.lower(), color=color or _stable_color_for_name(name),
+              created_by_user_id=user_id)
+    db.session.add(tag)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        existing = Tag.query.filter_by(slug=name.lower()).first()
+        return jsonify({
+            "message": "Tag já existe",
+            "tag": {"name": existing.name, "color": existing.color} if existing else None,
+        }), 409
+    tag_catalog.remember(tag)
     return jsonify({"name": tag.name, "color": tag.color}), 201
 
 
@@ -1934,9 +2616,8 @@ def list_subtasks(task_id):
         return jsonify({"error": "Tarefa não encontrada"}), 404
     if not task.can_be_viewed_by(user):
         return jsonify({"error": "Acesso negado"}), 403
-    task._coerce_subtasks()
     counts = task.subtask_counts()
-    return jsonify({"items": task.subtasks, "counts": counts}), 200
+    return jsonify({"items": task._normalized_subtasks(), "counts": counts}), 200
 
 @task_bp.route("/tasks/<int:task_id>/subtasks", methods=["POST"])
 @jwt_required()
@@ -1954,6 +2635,7 @@ def create_subtask(task_id):
     if not title:
         return jsonify({"error": "title é obrigatório"}), 400
 
+    before_state = deepcopy(task.to_dict())
     task._coerce_subtasks()
     new_st = {
         "id": data.get("id") or f"st-{uuid4().hex}",
@@ -1966,9 +2648,11 @@ def create_subtask(task_id):
         "order": int(data.get("order", len(task.subtasks))),
     }
     task.subtasks.append(new_st)
+    counts = task.refresh_subtask_progress()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
-    return jsonify({"item": new_st, "counts": task.subtask_counts()}), 201
+    return jsonify({"item": new_st, "counts": counts}), 201
 
 @task_bp.route("/tasks/<int:task_id>/subtasks/<string:sub_id>", methods=["PATCH"])
 @jwt_required()
@@ -1982,6 +2666,7 @@ def update_subtask(task_id, sub_id):
         return jsonify({"error":"Sem permissão para alterar subtarefas"}), 403
 
     data = request.get_json(force=True)
+    before_state = deepcopy(task.to_dict())
     task._coerce_subtasks()
     found = False
     for st in task.subtasks:
@@ -1999,10 +2684,11 @@ def update_subtask(task_id, sub_id):
         task.status = "in_progress"
         task.completed_at = None
 
-    task._coerce_subtasks()
+    counts = task.refresh_subtask_progress()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
-    return jsonify({"items": task.subtasks, "counts": task.subtask_counts()}), 200
+    return jsonify({"items": task.subtasks, "counts": counts}), 200
 
 @task_bp.route("/tasks/<int:task_id>/subtasks/<string:sub_id>", methods=["DELETE"])
 @jwt_required()
@@ -2015,6 +2701,7 @@ def delete_subtask(task_id, sub_id):
     if not (user.is_admin or task.can_be_assigned_by(user)):
         return jsonify({"error":"Sem permissão para alterar subtarefas"}), 403
 
+    before_state = deepcopy(task.to_dict())
     task._coerce_subtasks()
     before = len(task.subtasks)
     task.subtasks = [s for s in task.subtasks if s.get("id") != sub_id]
@@ -2025,10 +2712,11 @@ def delete_subtask(task_id, sub_id):
         task.status = "in_progress"
         task.completed_at = None
 
-    task._coerce_subtasks()
+    counts = task.refresh_subtask_progress()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
-    return jsonify({"items": task.subtasks, "counts": task.subtask_counts()}), 200
+    return jsonify({"items": task.subtasks, "counts": counts}), 200
 
 @task_bp.route("/tasks/<int:task_id>/subtasks/reorder", methods=["PATCH"])
 @jwt_required()
@@ -2043,13 +2731,15 @@ def reorder_subtasks(task_id):
 
     data = request.get_json(force=True)
     order_list = data.get("order") or []  # ["st-1", "st-2", ...]
+    before_state = deepcopy(task.to_dict())
     task._coerce_subtasks()
     idx = {sid: i for i, sid in enumerate(order_list)}
     for s in task.subtasks:
         sid = s.get("id")
         if sid in idx:
             s["order"] = idx[sid]
-    task._coerce_subtasks()
+    task.refresh_subtask_progress()
     task.updated_at = datetime.utcnow()
+    record_task_change(task, user_id, before_state)
     db.session.commit()
     return jsonify({"items": task.subtasks}), 200
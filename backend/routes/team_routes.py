@@ -1,4 +1,7 @@
 from flask import Blueprint, request, jsonify
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, extract, func
+from sqlalchemy.orm import selectinload
 from models.team_model import Team
 from extensions import db
 from decorators import admin_required
@@ -7,27 +10,28 @@ from models.user_team_model import UserTeam
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.task_model import Task
 from models.audit_log_model import AuditLog
+from services.team_tag_stats import top_team_tags
+from services.task_reports import FINISHED_AT
+from services.team_capacity import team_capacity
 
 # REMOVA a barra final do url_prefix
 team_bp = Blueprint("team_bp", __name__, url_prefix="/api/teams")
 
-@team_bp.route("", methods=["GET"])
-@jwt_required()
-def list_teams():
-    uid = int(get_jwt_identity())
-    user = User.query.get(uid)
-    if user.is_admin:
-        teams = Team.query.all()
-    else:
+def teams_for_user(user):
+    """Equipes visíveis (admin: todas) com membros e usuários carregados em lote."""
+    query = Team.query.options(selectinload(Team.members).selectinload(UserTeam.user))
+    if not user.is_admin:
         team_ids = [ut.team_id for ut in user.teams]
-        teams = Team.query.filter(Team.id.in_(team_ids)).all()
+        query = query.filter(Team.id.in_(team_ids))
+    return query.all()
 
+def serialize_teams(teams, viewer):
     def scrub_member(ut):
         return {
             "user_id": ut.user.id,
             "username": ut.user.username,
             # opcional: ocultar e-mail para não-admins
-            "email": ut.user.email if user.is_admin else None,
+            "email": ut.user.email if viewer.is_admin else None,
             "is_manager": ut.is_manager
         } if ut.user else None
 
@@ -41,7 +45,14 @@ def list_teams():
             "created_at": t.created_at.isoformat(),
             "members": members
         })
-    return jsonify(out)
+    return out
+
+@team_bp.route("", methods=["GET"])
+@jwt_required()
+def list_teams():
+    uid = int(get_jwt_identity())
+    user = User.query.get(uid)
+    return jsonify(serialize_teams(teams_for_user(user), user))
 
 @team_bp.route("", methods=["POST"])
 @admin_required
@@ -271,9 +282,55 @@ def update_user_in_team(team_id, user_id):
     })
 
 
+@team_bp.route("/<int:team_id>/tags/top", methods=["GET"])
+@jwt_required()
+def team_top_tags(team_id):
+    """
+    Tags mais usadas nas tasks da equipe (sugestões). ?limit=10 (máx. 50)
+    Permissão: admin ou membro da equipe.
+    """
+    user_id = int(get_jwt_identity())
+    user = User.query.get(user_id)
+    if not user or not user.is_active:
+        return jsonify({"error": "Usuário inválido ou inativo"}), 401
+
+    if not user.is_admin and not any(ut.team_id == team_id for ut in user.teams):
+        return jsonify({"error": "Acesso negado."}), 403
+
+    try:
+        limit = max(1, min(int(request.args.get("limit", 10)), 50))
+    except ValueError:
+        return jsonify({"error": "limit inválido."}), 400
+
+    # nome/cor canônicos vêm do catálogo (cache em memória)
+    from routes.task_routes import _stable_color_for_name
+    from services.tag_catalog import tag_catalog
+
+    stats = top_team_tags(team_id, limit)
+    catalog = tag_catalog.lookup([s.tag_slug for s in stats])
+    items = []
+    for s in stats:
+        entry = catalog.get(s.tag_slug)
+        name = entry.name if entry else s.tag_slug
+        items.append({
+            "name": name,
+            "color": (entry.color if entry else None) or s.color or _stable_color_for_name(name),
+            "usage_count": s.usage_count,
+            "last_used_at": s.last_used_at.isoformat() if s.last_used_at else None,
+        })
+    return jsonify(items), 200
+
+PRODUCTIVITY_STATUSES = ("pending", "in_progress", "done", "cancelled", "archived")
+
 @team_bp.route("/<int:team_id>/productivity", methods=["GET"])
 @jwt_required()
 def team_productivity(team_id):
+    """
+    Produtividade por membro em uma query agrupada.
+    ?from=&to=        (ISO 8601) janela por created_at das tasks; também define o
+                      período do throughput (padrão: últimas 4 semanas)
+    ?breakdown=status contagem por status de cada membro
+    """
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
     if not user or not user.is_active:
@@ -287,25 +344,128 @@ def team_productivity(team_id):
 
     team = Team.query.get_or_404(team_id)
 
-    user_teams = UserTeam.query.filter_by(team_id=team_id).all()
+    try:
+        date_from = datetime.fromisoformat(request.args["from"]) if request.args.get("from") else None
+        date_to = datetime.fromisoformat(request.args["to"]) if request.args.get("to") else None
+    except ValueError:
+        return jsonify({"error": "Formato inválido para from/to. Use ISO 8601."}), 400
+    with_breakdown = (request.args.get("breakdown") or "").lower() == "status"
+
+    now = datetime.utcnow()
+    period_end = date_to or now
+    period_start = date_from or (period_end - timedelta(weeks=4))
+    weeks = max((period_end - period_start).total_seconds() / (7 * 24 * 3600), 1 / 7)
+
+    # condições do JOIN (LEFT JOIN: membro sem task aparece com zeros)
+    task_on = [Task.user_id == User.id]
+    if date_from:
+        task_on.append(Task.created_at >= date_from)
+    if date_to:
+        task_on.append(Task.created_at <= date_to)
+
+    done = Task.status == "done"
+    columns = [
+        func.count(Task.id),
+        func.count(Task.id).filter(done),
+        func.count(Task.id).filter(
+            Task.status.notin_(("done", "archived")), Task.due_date.isnot(None), Task.due_date < now
+        ),
+        func.count(Task.id).filter(done, Task.due_date.isnot(None), FINISHED_AT <= Task.due_date),
+        func.avg(extract("epoch", FINISHED_AT - Task.created_at)).filter(done, Task.created_at.isnot(None)),
+        func.count(Task.id).filter(done, FINISHED_AT >= period_start, FINISHED_AT <= period_end),
+    ]
+    if with_breakdown:
+        columns += [func.count(Task.id).filter(Task.status == st) for st in PRODUCTIVITY_STATUSES]
+
+    rows = (
+        db.session.query(User.id, User.username, *columns)
+        .join(UserTeam, UserTeam.user_id == User.id)
+        .outerjoin(Task, and_(*task_on))
+        .filter(UserTeam.team_id == team_id)
+        .group_by(User.id, User.username)
+        .order_by(User.username)
+        .all()
+    )
 
     data = []
-    for ut in user_teams:
-        member = ut.user
-        if not member:  # ignora registros órfãos
-            continue
-
-        total_tasks = Task.query.filter_by(user_id=member.id).count()
-        completed_tasks = Task.query.filter_by(user_id=member.id, status="done").count()
-
-        data.append({
-            "user_id": member.id,
-            "user_name": member.username,
+    for row in rows:
+        member_id, username, total_tasks, completed_tasks, overdue, on_time, avg_lead, done_in_period = row[:8]
+        item = {
+            "user_id": member_id,
+            "user_name": username,
             "total_tasks": total_tasks,
             "completed_tasks": completed_tasks,
-            "completion_rate": f"{(completed_tasks / total_tasks * 100) if total_tasks else 0:.1f}%"
-        })
-        
-    return jsonify({"team_id": team.id, "team_name": team.name, "productivity": data}), 200
+            "completion_rate": f"{(completed_tasks / total_tasks * 100) if total_tasks else 0:.1f}%",
+            "overdue_tasks": overdue,
+            "on_time_tasks": on_time,
+            "avg_lead_time_hours": round(float(avg_lead) / 3600, 1) if avg_lead is not None else None,
+            "throughput_per_week": round(done_in_period / weeks, 2),
+        }
+        if with_breakdown:
+            item["status_breakdown"] = dict(zip(PRODUCTIVITY_STATUSES, row[8:]))
+        data.append(item)
+
+    return jsonify({
+        "team_id": team.id,
+        "team_name": team.name,
+        "period": {"from": period_start.isoformat(), "to": period_end.isoformat()},
+        "productivity": data,
+    }), 200
+
+CAPACITY_DEFAULT_WEEKS = 12
+CAPACITY_MAX_WEEKS = 53
+
+@team_bp.route("/<int:team_id>/capacity", methods=["GET"])
+@jwt_required()
+def team_capacity_view(team_id):
+    """
+    Horas estimadas (tempo_estimado) das tasks abertas por membro e semana.
+    ?from=AAAA-MM-DD&to=AAAA-MM-DD  (por due_date; padrão: 12 semanas a partir de hoje)
+    ?weekly_hours=40                capacidade semanal usada nos alertas de sobrecarga
+    Tasks sem tempo_estimado somam 0 h e são contadas em unestimated_count (por semana).
+    """
+    user_id = get_jwt_identity()
+    user = User.query.get(user_id)
+    if not user or not user.is_active:
+        return jsonify({"error": "Usuário inválido ou inativo"}), 401
+
+    # Permissão: admin OU gestor da equipe
+    if not user.is_admin:
+        manager_link = UserTeam.query.filter_by(user_id=user_id, team_id=team_id, is_manager=True).first()
+        if not manager_link:
+            return jsonify({"error": "Acesso negado. Apenas gestores ou admins podem ver este relatório."}), 403
+
+    team = Team.query.get_or_404(team_id)
 
+    try:
+        date_from = date.fromisoformat(request.args["from"]) if request.args.get("from") else date.today()
+        date_to = (date.fromisoformat(request.args["to"]) if request.args.get("to")
+                   else date_from + timedelta(weeks=CAPACITY_DEFAULT_WEEKS, days=-1))
+    except ValueError:
+        return jsonify({"error": "Formato inválido para from/to. Use AAAA-MM-DD."}), 400
+    if date_from > date_to:
+        return jsonify({"error": "from deve ser anterior a to."}), 400
 
+    try:
+        weekly_hours = float(request.args.get("weekly_hours", 40))
+    except ValueError:
+        return jsonify({"error": "weekly_hours inválido."}), 400
+    if weekly_hours <= 0:
+        return jsonify({"error": "weekly_hours deve ser maior que zero."}), 400
+
+    # semanas inteiras (segunda a domingo) cobrindo o período
+    first_monday = date_from - timedelta(days=date_from.weekday())
+    weeks = (date_to - first_monday).days // 7 + 1
+    if weeks > CAPACITY_MAX_WEEKS:
+        return jsonify({"error": f"Intervalo máximo de {CAPACITY_MAX_WEEKS} semanas."}), 400
+
+    data = team_capacity(team.id, first_monday, weeks, weekly_hours)
+    return jsonify({
+        "team_id": team.id,
+        "team_name": team.name,
+        "period": {
+            "from": first_monday.isoformat(),
+            "to": (first_monday + timedelta(weeks=weeks, days=-1)).isoformat(),
+        },
+        **data,
+    }), 200
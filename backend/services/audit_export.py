@@ -0,0 +1,69 @@
+# services/audit_export.py
+"""
+Exportação dos logs de auditoria (GET /api/admin/export-audit-logs) em CSV.
+
+Mesmo esquema do export de tasks (services/task_export): as linhas vêm de um
+cursor do lado do servidor (yield_per) como tuplas, com o nome do usuário
+num único LEFT JOIN (sem to_dict nem lazy-load de AuditLog.user por linha),
+e o CSV é escrito em pedaços direto na resposta. Memória constante.
+"""
+import csv
+import io
+
+from models.audit_log_model import AuditLog
+from models.user_model import User
+
+EXPORT_BATCH = 1000   # linhas por fetch do cursor
+CSV_FLUSH_ROWS = 200  # linhas acumuladas antes de enviar um pedaço da resposta
+
+EXPORT_HEADER = [
+    "ID", "Usuário", "Ação", "Tipo de Recurso", "ID do Recurso",
+    "Descrição", "IP", "User Agent", "Data/Hora",
+]
+
+_DATE_FMT = "%d/%m/%Y %H:%M:%S"
+
+
+def export_rows(query):
+    """Itera (id, usuário, ação, ..., created_at) na ordem de EXPORT_HEADER, mais recentes primeiro."""
+    return (
+        query.order_by(None)
+             .outerjoin(User, User.id == AuditLog.user_id)
+             .with_entities(
+                 AuditLog.id, User.username, AuditLog.action, AuditLog.resource_type,
+                 AuditLog.resource_id, AuditLog.description, AuditLog.ip_address,
+                 AuditLog.user_agent, AuditLog.created_at,
+             )
+             .order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+             .yield_per(EXPORT_BATCH)
+    )
+
+
+def iter_csv(query):
+    """Gerador de pedaços (bytes UTF-8) do CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADER)
+    pending = 0
+    for (log_id, username, action, resource_type, resource_id,
+         description, ip_address, user_agent, created_at) in export_rows(query):
+        writer.writerow([
+            log_id,
+            username or "Sistema",
+            action,
+            resource_type or "",
+            resource_id or "",
+            description,
+            ip_address or "",
+            user_agent or "",
+            created_at.strftime(_DATE_FMT) if created_at else "",
+        ])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
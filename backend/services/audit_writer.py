@@ -0,0 +1,147 @@
+# services/audit_writer.py
+"""
+Gravação em lote da auditoria (AuditLog.log_action).
+
+log_action só monta a linha e a coloca numa fila em memória (limitada); uma
+thread de fundo grava o acumulado com um INSERT de várias linhas quando a
+fila chega a AUDIT_BATCH_SIZE ou a cada AUDIT_FLUSH_SECONDS. O log deixa de
+fazer commit na sessão de quem chamou (antes cada login, update de task,
+arquivamento e purge pagava uma transação a mais) e, sem linha gravada ainda,
+retorna None em vez de um AuditLog sem id.
+
+- Fila cheia (AUDIT_QUEUE_MAX): quem chamou grava o lote na hora, nada é descartado.
+- Shutdown: stop_audit_writer (atexit no app.py) grava o que restou.
+- Lote com linha inválida (ex.: FK): regrava linha a linha e só descarta a ruim.
+- Modo síncrono (AUDIT_SYNC=1, testes, ou writer não configurado):
+  log_action volta a fazer add + commit na sessão atual.
+"""
+import os
+import threading
+from collections import deque
+
+from sqlalchemy import insert
+
+from extensions import db
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+
+_queue = deque()
+_lock = threading.Lock()        # protege a fila e o estado da thread
+_write_lock = threading.Lock()  # um lote gravando por vez
+_wakeup = threading.Event()
+_stopping = threading.Event()
+
+_app = None
+_thread = None
+_pid = None
+
+
+def _sync_requested(app) -> bool:
+    value = app.config.get("AUDIT_SYNC", os.getenv("AUDIT_SYNC", ""))
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+def init_audit_writer(app):
+    """Liga o modo em lote para este app (a thread sobe no primeiro log do processo)."""
+    global _app
+    if _sync_requested(app):
+        app.logger.info("[AUDIT] Modo síncrono (AUDIT_SYNC).")
+        return
+    _app = app
+    _stopping.clear()
+    app.logger.info(
+        f"[AUDIT] Gravação em lote (lote={AUDIT_BATCH_SIZE}, intervalo={AUDIT_FLUSH_SECONDS}s, "
+        f"fila máx.={AUDIT_QUEUE_MAX})."
+    )
+
+
+def _ensure_thread():
+    # sobe a thread sob demanda: após fork (gunicorn --preload) o filho não herda a thread do pai
+    global _thread, _pid
+    if _thread is not None and _pid == os.getpid() and _thread.is_alive():
+        return
+    _pid = os.getpid()
+    _thread = threading.Thread(target=_run, name="audit-writer", daemon=True)
+    _thread.start()
+
+
+def enqueue(row: dict) -> bool:
+    """Coloca a linha na fila. False = modo síncrono (quem chamou grava)."""
+    if _app is None or _stopping.is_set():
+        return False
+    with _lock:
+        _ensure_thread()
+        _queue.append(row)
+        size = len(_queue)
+    if size >= AUDIT_QUEUE_MAX:
+        flush()
+    elif size >= AUDIT_BATCH_SIZE:
+        _wakeup.set()
+    return True
+
+
+def _take(limit: int) -> list:
+    with _lock:
+        return [_queue.popleft() for _ in range(min(limit, len(_queue)))]
+
+
+def _insert(rows: list):
+    from models.audit_log_model import AuditLog  # import tardio (o model importa este módulo)
+
+    with db.engine.begin() as conn:
+        conn.execute(insert(AuditLog.__table__), rows)
+
+
+def _write(batch: list):
+    try:
+        _insert(batch)
+        return
+    except Exception:
+        if len(batch) == 1:
+            _app.logger.exception("[AUDIT] Falha ao gravar registro de auditoria; descartado: %r", batch[0])
+            return
+        _app.logger.warning("[AUDIT] Falha no lote de %d registros; gravando um a um.", len(batch))
+    for row in batch:
+        _write([row])
+
+
+def flush() -> int:
+    """Grava tudo o que está na fila agora. Retorna o nº de linhas processadas."""
+    if _app is None:
+        return 0
+    done = 0
+    with _write_lock, _app.app_context():
+        while True:
+            batch = _take(AUDIT_BATCH_SIZE)
+            if not batch:
+                return done
+            _write(batch)
+            done += len(batch)
+
+
+def _run():
+    while not _stopping.is_set():
+        _wakeup.wait(AUDIT_FLUSH_SECONDS)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception:
+            _app.logger.exception("[AUDIT] Erro na thread de gravação da auditoria")
+
+
+def stop_audit_writer(timeout: float = 10.0):
+    """Para a thread e grava o que restou na fila (chamado no atexit)."""
+    global _thread
+    if _app is None:
+        return
+    _stopping.set()
+    _wakeup.set()
+    thread, _thread = _thread, None
+    if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+        thread.join(timeout)
+    try:
+        flush()
+    except Exception:
+        _app.logger.exception("[AUDIT] Falha ao gravar auditoria pendente no shutdown")
@@ -0,0 +1,79 @@
+# services/http_cache.py
+"""
+GET condicional (ETag / If-None-Match) para as leituras de tasks.
+
+A versão de um escopo é barata: COUNT + MAX(updated_at) das tasks do escopo
+(updated_at tem onupdate no modelo, então qualquer alteração via ORM o move;
+remoções mudam o COUNT). O ETag é um hash dessa versão + usuário + query string,
+e a rota responde 304 antes de carregar/serializar as tasks.
+
+A resposta também traz dados de outras tabelas (nome/e-mail de usuários, nome
+da equipe, cor das tags): reference_version() entra no ETag para que editar
+um deles também invalide as listagens.
+"""
+import hashlib
+
+from flask import current_app, make_response, request
+from sqlalchemy import func, select
+
+from extensions import db
+from models.tag_model import Tag
+from models.task_model import Task
+from models.team_model import Team
+from models.user_model import User
+
+
+def scope_version(query) -> tuple:
+    """(count, max(updated_at)) das tasks que a query (ainda sem ORDER BY) retornaria."""
+    count, last = (
+        query.order_by(None)
+             .with_entities(func.count(Task.id), func.max(Task.updated_at))
+             .one()
+    )
+    return count, last.isoformat() if last else None
+
+
+def reference_version() -> tuple:
+    """(count, max(updated_at)) de users, teams e tags numa só consulta."""
+    parts = []
+    for model in (User, Team, Tag):
+        parts += [
+            select(func.count(model.id)).scalar_subquery(),
+            select(func.max(model.updated_at)).scalar_subquery(),
+        ]
+    row = db.session.execute(select(*parts)).one()
+    return tuple(v.isoformat() if hasattr(v, "isoformat") else v for v in row)
+
+
+def make_etag(*parts) -> str:
+    """Hash estável das partes (versão, usuário, parâmetros...)."""
+    raw = "|".join(repr(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def request_args_key() -> tuple:
+    """Parâmetros da requisição em ordem estável (fazem parte do ETag da listagem)."""
+    return tuple(sorted(request.args.items(multi=True)))
+
+
+def not_modified(etag: str):
+    """Resposta 304 se o cliente já tem essa versão; senão None."""
+    if etag in request.if_none_match:
+        resp = current_app.response_class(status=304)
+        _set_cache_headers(resp, etag)
+        return resp
+    return None
+
+
+def with_etag(rv, etag: str):
+    """Aplica ETag (forte) + cabeçalhos de revalidação à resposta."""
+    resp = make_response(rv)
+    _set_cache_headers(resp, etag)
+    return resp
+
+
+def _set_cache_headers(resp, etag: str):
+    resp.set_etag(etag)
+    # resposta depende do usuário: cache só no cliente e sempre revalidando
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp.vary.add("Authorization")
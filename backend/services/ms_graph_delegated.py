@@ -177,7 +177,8 @@ def update_event_as_user(
     body_html: Optional[str] = None,
     location: Optional[str] = None,
     etag: Optional[str] = None,
-    calendar_id: Optional[str] = None
+    calendar_id: Optional[str] = None,
+    recurrence: Optional[dict] = None
 ) -> dict:
     integ = UserIntegration.query.filter_by(user_id=user_id, provider="microsoft").first()
     if not integ:
@@ -196,6 +197,8 @@ def update_event_as_user(
         "location": {"displayName": location or ""},
         "attendees": [{"emailAddress": {"address": e}, "type": "required"} for e in (attendees or [])],
         "allowNewTimeProposals": True,
+        # série recorrente (None remove a recorrência do evento)
+        "recurrence": recurrence,
     }
 
     try:
@@ -239,7 +242,8 @@ def _event_url(event_id: str, calendar_id: Optional[str] = None) -> str:
 # ========= Evento no calendário do usuário =========
 def create_event_as_user(user_id: int, subject: str, start_iso: str, end_iso: str,
                          timezone_str: str = LOCAL_TZ, attendees: Optional[List[str]] = None,
-                         body_html: Optional[str] = None, location: Optional[str] = None) -> Dict:
+                         body_html: Optional[str] = None, location: Optional[str] = None,
+                         recurrence: Optional[dict] = None) -> Dict:
     """
     start_iso / end_iso podem vir com 'Z' ou offset. Vamos sempre convertê-los
     para 'hora de parede' do fuso solicitado e enviar com timeZone = Windows TZ.
@@ -263,6 +267,8 @@ def create_event_as_user(user_id: int, subject: str, start_iso: str, end_iso: st
         "attendees": [{"emailAddress": {"address": e}, "type": "required"} for e in (attendees or [])],
         "allowNewTimeProposals": True,
     }
+    if recurrence:
+        body["recurrence"] = recurrence
 
     # Log útil (sem token)
     try:
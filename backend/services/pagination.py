@@ -0,0 +1,115 @@
+# services/pagination.py
+"""
+Paginação por cursor (keyset).
+
+O cursor é opaco para o cliente: base64url de um JSON com o valor da chave de
+ordenação da última linha entregue + o id (desempate estável). A próxima página
+filtra por "depois de (valor, id)", então o custo não cresce com a profundidade
+como acontece com OFFSET.
+
+Convenção de NULLs igual à default do Postgres (NULL se comporta como o maior
+valor): ASC -> NULLS LAST, DESC -> NULLS FIRST. Assim um índice btree comum em
+(coluna, id) atende os dois sentidos.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_, tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def parse_limit(raw, default: int = DEFAULT_LIMIT, maximum: int = MAX_LIMIT) -> int:
+    """Converte ?limit= em int dentro de [1, maximum]. ValueError se inválido."""
+    if raw in (None, ""):
+        return default
+    value = int(raw)
+    return max(1, min(value, maximum))
+
+
+def _encode_value(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    return v
+
+
+def _decode_value(v):
+    if isinstance(v, dict) and "dt" in v:
+        return datetime.fromisoformat(v["dt"])
+    return v
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    raw = json.dumps({"s": sort, "v": _encode_value(value), "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str):
+    """
+    Retorna (valor, id) do cursor. Levanta InvalidCursor se o cursor estiver
+    corrompido ou tiver sido emitido para outra ordenação.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if data.get("s") != sort:
+            raise InvalidCursor("cursor não corresponde à ordenação solicitada")
+        return _decode_value(data.get("v")), int(data["id"])
+    except InvalidCursor:
+        raise
+    except Exception as e:
+        raise InvalidCursor("cursor inválido") from e
+
+
+def keyset_order_by(sort_expr, id_col, descending: bool):
+    if descending:
+        return [sort_expr.desc().nulls_first(), id_col.desc()]
+    return [sort_expr.asc().nulls_last(), id_col.asc()]
+
+
+def keyset_after(sort_expr, id_col, last_value, last_id: int, descending: bool, nullable: bool = True):
+    """
+    Condição "linhas depois de (last_value, last_id)" coerente com keyset_order_by.
+    Usa comparação de tupla (col, id) > (v, id), que o Postgres resolve com um
+    range scan no índice composto.
+    """
+    if last_value is None:
+        if descending:
+            # NULLs vêm primeiro no DESC: continua entre os NULLs e depois todo o resto
+            return or_(and_(sort_expr.is_(None), id_col < last_id), sort_expr.isnot(None))
+        return and_(sort_expr.is_(None), id_col > last_id)
+
+    if descending:
+        return tuple_(sort_expr, id_col) < tuple_(last_value, last_id)
+
+    cond = tuple_(sort_expr, id_col) > tuple_(last_value, last_id)
+    if nullable:
+        cond = or_(cond, sort_expr.is_(None))
+    return cond
+
+
+def paginate_keyset(query, sort: str, sort_expr, id_col, value_of, *, limit: int,
+                    cursor: str | None, descending: bool, nullable: bool = True):
+    """
+    Aplica filtro + ordenação + LIMIT (limit+1 para saber se há próxima página).
+    value_of(row) extrai da linha o valor da chave de ordenação para o próximo cursor.
+    Retorna (rows, next_cursor).
+    """
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort)
+        query = query.filter(keyset_after(sort_expr, id_col, last_value, last_id, descending, nullable))
+
+    rows = query.order_by(*keyset_order_by(sort_expr, id_col, descending)).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, value_of(last), last.id)
+    return rows, next_cursor
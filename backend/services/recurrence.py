@@ -0,0 +1,407 @@
+# services/recurrence.py
+"""
+Tarefas recorrentes (subconjunto de RRULE, RFC 5545) expandidas sob demanda.
+
+Uma task com recurrence_rule é a "série": a própria linha representa a
+ocorrência atual (due_date) e as seguintes existem só virtualmente, calculadas
+dentro da janela pedida (listagem, calendário, lembretes, Outlook). Uma
+ocorrência só vira linha real (recurrence_parent_id + recurrence_date) quando
+alguém a edita, comenta ou conclui; essa linha também funciona como exceção
+(a ocorrência deixa de ser expandida). Concluir a série conclui a ocorrência
+atual (vira linha concluída) e avança due_date para a próxima.
+
+Regras aceitas: FREQ=DAILY|WEEKLY|MONTHLY|YEARLY; INTERVAL; COUNT ou UNTIL;
+BYDAY (só WEEKLY, sem ordinais); BYMONTHDAY (só MONTHLY, 1..31).
+As datas repetem no horário local (DEFAULT_TZ); no banco ficam em UTC naive.
+"""
+import calendar
+import os
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from extensions import db
+from models.task_model import Task
+
+LOCAL_TZ = ZoneInfo(os.getenv("DEFAULT_TZ", "America/Sao_Paulo"))
+
+FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 1000            # COUNT máximo aceito numa regra
+MAX_WINDOW_OCCURRENCES = 500  # ocorrências virtuais por série numa janela
+_MAX_PERIODS = 20000        # trava contra regras que nunca produzem datas
+
+Rule = namedtuple("Rule", ["freq", "interval", "count", "until", "byday", "bymonthday"])
+
+# campos copiados da série para a ocorrência materializada
+OCCURRENCE_FIELDS = (
+    "title", "description", "prioridade", "categoria", "status_inicial",
+    "tempo_estimado", "tempo_unidade", "relacionado_a", "lembretes", "tags",
+    "requires_approval", "user_id", "assigned_by_user_id", "team_id",
+    "assigned_users", "collaborators",
+)
+
+
+class InvalidRule(ValueError):
+    pass
+
+
+# ------------------------------------------------------------
+# Regra
+# ------------------------------------------------------------
+
+def _parse_until(raw: str) -> datetime:
+    """UNTIL em UTC naive: data pura = até o fim do dia local; ...Z = UTC."""
+    try:
+        if len(raw) == 8:
+            day = datetime.strptime(raw, "%Y%m%d").date()
+            return _to_utc(datetime.combine(day, time.max))
+        if raw.endswith("Z"):
+            return datetime.strptime(raw[:-1], "%Y%m%dT%H%M%S")
+        return _to_utc(datetime.strptime(raw, "%Y%m%dT%H%M%S"))
+    except ValueError:
+        raise InvalidRule("UNTIL inválido (use AAAAMMDD ou AAAAMMDDTHHMMSSZ)")
+
+
+def parse_rule(text: str) -> Rule:
+    """Interpreta 'FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10' (prefixo 'RRULE:' opcional)."""
+    raw = (text or "").strip()
+    if raw.upper().startswith("RRULE:"):
+        raw = raw[6:]
+    parts = {}
+    for item in filter(None, (p.strip() for p in raw.split(";"))):
+        key, sep, value = item.partition("=")
+        if not sep or not value:
+            raise InvalidRule(f"parte inválida na regra: {item}")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST"}
+    if unknown:
+        raise InvalidRule(f"parâmetros não suportados: {', '.join(sorted(unknown))}")
+
+    freq = parts.get("FREQ")
+    if freq not in FREQS:
+        raise InvalidRule(f"FREQ inválido. Use: {', '.join(FREQS)}.")
+
+    try:
+        interval = int(parts.get("INTERVAL", 1))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise InvalidRule("INTERVAL/COUNT devem ser inteiros")
+    if interval < 1:
+        raise InvalidRule("INTERVAL deve ser >= 1")
+    if count is not None and not 1 <= count <= MAX_COUNT:
+        raise InvalidRule(f"COUNT deve estar entre 1 e {MAX_COUNT}")
+    if count is not None and "UNTIL" in parts:
+        raise InvalidRule("use COUNT ou UNTIL, não os dois")
+    until = _parse_until(parts["UNTIL"]) if "UNTIL" in parts else None
+
+    byday = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise InvalidRule("BYDAY só é suportado com FREQ=WEEKLY")
+        days = parts["BYDAY"].split(",")
+        if any(d not in WEEKDAYS for d in days):
+            raise InvalidRule("BYDAY inválido (use MO,TU,WE,TH,FR,SA,SU)")
+        byday = tuple(sorted({WEEKDAYS.index(d) for d in days}))
+
+    bymonthday = ()
+    if "BYMONTHDAY" in parts:
+        if freq != "MONTHLY":
+            raise InvalidRule("BYMONTHDAY só é suportado com FREQ=MONTHLY")
+        try:
+            bymonthday = tuple(sorted({int(d) for d in parts["BYMONTHDAY"].split(",")}))
+        except ValueError:
+            raise InvalidRule("BYMONTHDAY inválido")
+        if any(not 1 <= d <= 31 for d in bymonthday):
+            raise InvalidRule("BYMONTHDAY deve estar entre 1 e 31")
+
+    return Rule(freq, interval, count, until, byday, bymonthday)
+
+
+def format_rule(rule: Rule) -> str:
+    """Forma canônica gravada em Task.recurrence_rule."""
+    out = [f"FREQ={rule.freq}"]
+    if rule.interval != 1:
+        out.append(f"INTERVAL={rule.interval}")
+    if rule.byday:
+        out.append("BYDAY=" + ",".join(WEEKDAYS[d] for d in rule.byday))
+    if rule.bymonthday:
+        out.append("BYMONTHDAY=" + ",".join(str(d) for d in rule.bymonthday))
+    if rule.count is not None:
+        out.append(f"COUNT={rule.count}")
+    if rule.until is not None:
+        out.append("UNTIL=" + rule.until.strftime("%Y%m%dT%H%M%SZ"))
+    return ";".join(out)
+
+
+def normalize_rule(text: str) -> str:
+    return format_rule(parse_rule(text))
+
+
+# ------------------------------------------------------------
+# Expansão
+# ------------------------------------------------------------
+
+def _to_local(dt_utc: datetime) -> datetime:
+    return dt_utc.replace(tzinfo=timezone.utc).astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+
+def _to_utc(dt_local: datetime) -> datetime:
+    return dt_local.replace(tzinfo=LOCAL_TZ).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _add_months(year: int, month: int, months: int) -> tuple[int, int]:
+    idx = year * 12 + (month - 1) + months
+    return idx // 12, idx % 12 + 1
+
+
+def _period_candidates(rule: Rule, start: datetime, k: int) -> list:
+    """Datas locais do k-ésimo período da regra (ordenadas; podem cair antes de start)."""
+    step = k * rule.interval
+    if rule.freq == "DAILY":
+        return [start + timedelta(days=step)]
+    if rule.freq == "WEEKLY":
+        monday = start.date() - timedelta(days=start.weekday()) + timedelta(weeks=step)
+        days = rule.byday or (start.weekday(),)
+        return [datetime.combine(monday + timedelta(days=d), start.time()) for d in days]
+    if rule.freq == "MONTHLY":
+        year, month = _add_months(start.year, start.month, step)
+        last = calendar.monthrange(year, month)[1]
+        days = rule.bymonthday or (start.day,)
+        # dia inexistente no mês (ex.: 31 em abril) é pulado, como na RFC
+        return [datetime.combine(date(year, month, d), start.time()) for d in days if d <= last]
+    year = start.year + step
+    if start.month == 2 and start.day == 29 and not calendar.isleap(year):
+        return []
+    return [start.replace(year=year)]
+
+
+def _first_period(rule: Rule, start: datetime, after_local: datetime) -> int:
+    """Primeiro período que pode conter datas >= after_local (só sem COUNT)."""
+    if after_local <= start:
+        return 0
+    if rule.freq == "DAILY":
+        units = (after_local - start).days
+    elif rule.freq == "WEEKLY":
+        units = (after_local - start).days // 7
+    elif rule.freq == "MONTHLY":
+        units = (after_local.year - start.year) * 12 + after_local.month - start.month
+    else:
+        units = after_local.year - start.year
+    return max(units // rule.interval - 1, 0)
+
+
+def iter_occurrences(rule: Rule, dtstart: datetime, after: datetime | None = None):
+    """
+    Ocorrências (UTC naive, em ordem) da regra a partir de dtstart, respeitando
+    COUNT/UNTIL. Com `after`, pula direto para perto dele quando não há COUNT
+    (com COUNT é preciso contar desde o início).
+    """
+    start = _to_local(dtstart)
+    k = 0
+    if after is not None and rule.count is None:
+        k = _first_period(rule, start, _to_local(after))
+    produced = 0
+    for _ in range(_MAX_PERIODS):
+        for local in _period_candidates(rule, start, k):
+            if local < start:
+                continue
+            when = _to_utc(local)
+            if rule.until is not None and when > rule.until:
+                return
+            produced += 1
+            if after is None or when >= after:
+                yield when
+            if rule.count is not None and produced >= rule.count:
+                return
+        k += 1
+
+
+def occurrences_between(rule: Rule, dtstart: datetime, start: datetime, end: datetime,
+                        limit: int = MAX_WINDOW_OCCURRENCES) -> list:
+    """Ocorrências em [start, end)."""
+    out = []
+    for when in iter_occurrences(rule, dtstart, after=start):
+        if when >= end or len(out) >= limit:
+            break
+        out.append(when)
+    return out
+
+
+def series_rule(task: Task) -> Rule | None:
+    if not task.recurrence_rule or not task.due_date:
+        return None
+    try:
+        return parse_rule(task.recurrence_rule)
+    except InvalidRule:
+        return None
+
+
+def series_start(task: Task) -> datetime:
+    return task.recurrence_start or task.due_date
+
+
+def is_occurrence(task: Task, when: datetime) -> bool:
+    rule = series_rule(task)
+    if rule is None:
+        return False
+    return when in occurrences_between(rule, series_start(task), when, when + timedelta(seconds=1), limit=1)
+
+
+def next_occurrence(task: Task, after: datetime, skip=()) -> datetime | None:
+    """Primeira ocorrência da série estritamente depois de `after` (fora de `skip`)."""
+    rule = series_rule(task)
+    if rule is None:
+        return None
+    for when in iter_occurrences(rule, series_start(task), after=after):
+        if when > after and when not in skip:
+            return when
+    return None
+
+
+def remaining_count(task: Task) -> int | None:
+    """Ocorrências restantes a partir de due_date (None se a regra não tem COUNT)."""
+    rule = series_rule(task)
+    if rule is None or rule.count is None:
+        return None
+    return sum(1 for _ in iter_occurrences(rule, series_start(task), after=task.due_date))
+
+
+def materialized_dates(series_ids, start: datetime | None = None, end: datetime | None = None) -> dict:
+    """{série: {recurrence_date, ...}} das ocorrências que já viraram linha (inclusive na lixeira)."""
+    if not series_ids:
+        return {}
+    q = db.session.query(Task.recurrence_parent_id, Task.recurrence_date).filter(
+        Task.recurrence_parent_id.in_(list(series_ids))
+    )
+    if start is not None:
+        q = q.filter(Task.recurrence_date >= start)
+    if end is not None:
+        q = q.filter(Task.recurrence_date < end)
+    out = {}
+    for parent_id, when in q:
+        out.setdefault(parent_id, set()).add(when)
+    return out
+
+
+def virtual_occurrences(series_list, start: datetime, end: datetime) -> list:
+    """
+    [(série, quando)] das ocorrências virtuais em [start, end): depois da
+    ocorrência atual (a própria linha da série) e ainda não materializadas.
+    """
+    series_list = [s for s in series_list if series_rule(s) is not None]
+    taken = materialized_dates([s.id for s in series_list], start, end)
+    out = []
+    for series in series_list:
+        rule = series_rule(series)
+        lower = max(start, series.due_date + timedelta(microseconds=1))
+        skip = taken.get(series.id, set())
+        for when in occurrences_between(rule, series_start(series), lower, end):
+            if when not in skip:
+                out.append((series, when))
+    out.sort(key=lambda pair: (pair[1], pair[0].id))
+    return out
+
+
+def occurrence_key(series_id: int, when: datetime) -> str:
+    """Identificador de uma ocorrência virtual: '<série>@<AAAAMMDDTHHMMSS>' (UTC)."""
+    return f"{series_id}@{when.strftime('%Y%m%dT%H%M%S')}"
+
+
+def parse_occurrence_stamp(stamp: str) -> datetime:
+    try:
+        return datetime.strptime(stamp, "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise InvalidRule("ocorrência inválida (use AAAAMMDDTHHMMSS, UTC)")
+
+
+def occurrence_payload(series_payload: dict, series_id: int, when: datetime) -> dict:
+    """Payload de uma ocorrência virtual a partir do payload já serializado da série."""
+    item = dict(series_payload)
+    item.update({
+        "id": occurrence_key(series_id, when),
+        "due_date": when.isoformat(),
+        "is_occurrence": True,
+        "series_id": series_id,
+        "occurrence_date": when.isoformat(),
+    })
+    if "status" in item:
+        item["status"] = "pending"
+    for key in ("completed_at", "archived_at", "approved_at", "approval_status"):
+        if key in item:
+            item[key] = None
+    return item
+
+
+# ------------------------------------------------------------
+# Materialização
+# ------------------------------------------------------------
+
+def _reset_subtasks(subtasks):
+    return [dict(st, done=False) if isinstance(st, dict) else st for st in (subtasks or [])]
+
+
+def materialize_occurrence(series: Task, when: datetime) -> tuple[Task, bool]:
+    """
+    Cria (ou devolve a existente) a linha da ocorrência `when` da série.
+    Retorna (task, criada?). Levanta InvalidRule se `when` não é ocorrência da série.
+    Não comita.
+    """
+    existing = Task.query.filter_by(recurrence_parent_id=series.id, recurrence_date=when).first()
+    if existing:
+        return existing, False
+    if when == series.due_date or not is_occurrence(series, when):
+        raise InvalidRule("data não corresponde a uma ocorrência virtual desta série")
+
+    occ = Task(**{f: getattr(series, f) for f in OCCURRENCE_FIELDS})
+    occ.status = "pending"
+    occ.due_date = when
+    occ.subtasks = _reset_subtasks(series.subtasks)
+    occ.recurrence_parent_id = series.id
+    occ.recurrence_date = when
+    occ.refresh_subtask_progress()
+    db.session.add(occ)
+    occ.sync_participants()
+    return occ, True
+
+
+def advance_series(series: Task) -> Task | None:
+    """
+    A série acabou de ser marcada como concluída: a ocorrência atual vira uma
+    linha concluída e a série volta a 'pending' na próxima ocorrência livre.
+    Sem próxima ocorrência, a série fica concluída (fim da recorrência).
+    Retorna a linha concluída criada (ou None). Não comita.
+    """
+    current = series.due_date
+    nxt = None
+    if series_rule(series) is not None:
+        taken = materialized_dates([series.id], start=current).get(series.id, set())
+        nxt = next_occurrence(series, current, skip=taken)
+    if nxt is None:
+        return None
+
+    done = Task(**{f: getattr(series, f) for f in OCCURRENCE_FIELDS})
+    done.status = "done"
+    done.due_date = current
+    done.completed_at = series.completed_at or datetime.utcnow()
+    done.subtasks = list(series.subtasks or [])
+    done.approval_status = series.approval_status
+    done.approved_by_user_id = series.approved_by_user_id
+    done.approved_at = series.approved_at
+    done.recurrence_parent_id = series.id
+    done.recurrence_date = current
+    done.refresh_subtask_progress()
+    db.session.add(done)
+    done.sync_participants()
+
+    series.status = "pending"
+    series.completed_at = None
+    series.due_date = nxt
+    series.subtasks = _reset_subtasks(series.subtasks)
+    series.refresh_subtask_progress()
+    if series.requires_manager_approval():
+        series.approval_status = None
+        series.approved_by_user_id = None
+        series.approved_at = None
+    return done
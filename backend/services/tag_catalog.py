@@ -0,0 +1,133 @@
+# services/tag_catalog.py
+"""
+Cache em memória (por processo) do catálogo de tags: slug -> (nome, cor).
+
+Tags só são inseridas e a cor é imutável depois de criada, então entradas
+positivas nunca ficam velhas. O que pode envelhecer é o "não existe" (slug
+consultado antes de outra instância criar a tag): a cada CHECK_INTERVAL
+segundos compara-se uma versão barata do catálogo (MAX(id), COUNT(*)) e, se
+mudou, os negativos são descartados. Inserções feitas neste processo
+descartam o negativo do slug assim que o commit acontece (eventos de sessão).
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models.tag_model import Tag
+
+CatalogTag = namedtuple("CatalogTag", ["name", "color"])
+
+MAX_ENTRIES = 5000
+CHECK_INTERVAL = 5.0  # segundos entre checagens de versão no banco
+
+_MISSING = object()
+
+
+class TagCatalog:
+    def __init__(self, max_entries: int = MAX_ENTRIES, check_interval: float = CHECK_INTERVAL):
+        self.max_entries = max_entries
+        self.check_interval = check_interval
+        self._entries: OrderedDict = OrderedDict()  # slug -> CatalogTag | None (não existe)
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _db_version(self):
+        return db.session.query(func.max(Tag.id), func.count(Tag.id)).one()
+
+    def _check_version(self):
+        """Se o catálogo mudou no banco (outra instância criou tags), esquece os negativos."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        version = tuple(self._db_version())
+        with self._lock:
+            self._checked_at = now
+            if version != self._version:
+                self._version = version
+                for slug in [s for s, v in self._entries.items() if v is None]:
+                    del self._entries[slug]
+
+    def _store(self, slug: str, value):
+        self._entries[slug] = value
+        self._entries.move_to_end(slug)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def lookup(self, slugs) -> dict:
+        """{slug: CatalogTag} dos slugs existentes; os ausentes do cache vêm em uma query."""
+        slugs = {s for s in slugs if s}
+        if not slugs:
+            return {}
+        self._check_version()
+
+        found, misses = {}, []
+        with self._lock:
+            for slug in slugs:
+                value = self._entries.get(slug, _MISSING)
+                if value is _MISSING:
+                    misses.append(slug)
+                    continue
+                self._entries.move_to_end(slug)
+                if value is not None:
+                    found[slug] = value
+
+        if misses:
+            rows = (db.session.query(Tag.slug, Tag.name, Tag.color)
+                              .filter(Tag.slug.in_(misses))
+                              .all())
+            loaded = {slug: CatalogTag(name, color) for slug, name, color in rows}
+            with self._lock:
+                for slug in misses:
+                    self._store(slug, loaded.get(slug))
+            found.update(loaded)
+        return found
+
+    def get(self, slug: str):
+        """Entrada positiva em cache (sem ir ao banco), ou None."""
+        with self._lock:
+            value = self._entries.get(slug)
+            if value is not None:
+                self._entries.move_to_end(slug)
+            return value
+
+    def remember(self, tag):
+        with self._lock:
+            self._store(tag.slug, CatalogTag(tag.name, tag.color))
+
+    def forget(self, slug: str):
+        """Chamado quando este processo insere a tag: o 'não existe' em cache deixa de valer."""
+        with self._lock:
+            self._entries.pop(slug, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._checked_at = 0.0
+
+
+tag_catalog = TagCatalog()
+
+
+# Tags inseridas por este processo: anota no flush, esquece o negativo no commit.
+@event.listens_for(Session, "after_flush")
+def _collect_new_tags(session, flush_context):
+    slugs = {obj.slug for obj in session.new if isinstance(obj, Tag)}
+    if slugs:
+        session.info.setdefault("new_tag_slugs", set()).update(slugs)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_new_tags(session):
+    for slug in session.info.pop("new_tag_slugs", ()):
+        tag_catalog.forget(slug)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_new_tags(session):
+    session.info.pop("new_tag_slugs", None)
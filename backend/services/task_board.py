@@ -0,0 +1,53 @@
+# services/task_board.py
+"""
+Quadro kanban (GET /api/tasks/board): primeiras N tasks de cada coluna + total
+da coluna em uma query só.
+
+ROW_NUMBER() / COUNT(*) OVER (PARTITION BY coluna) numeram as tasks já
+filtradas na mesma ordenação do keyset; a query externa carrega só as linhas
+com rn <= N. A continuação de cada coluna usa a paginação por cursor comum
+(services/pagination) filtrando pelo valor da coluna.
+"""
+from sqlalchemy import func
+
+from extensions import db
+from models.task_model import Task
+from services.pagination import keyset_order_by
+
+BOARD_GROUPS = {
+    "status": Task.status,
+    "prioridade": Task.prioridade,
+    "team": Task.team_id,
+}
+
+
+def board_first_pages(query, group_by: str, sort_expr, descending: bool, limit: int, options=()):
+    """
+    Retorna {valor_da_coluna: (total, [tasks...])} com no máximo `limit` tasks
+    por coluna, na ordem de keyset_order_by(sort_expr, Task.id, descending).
+    """
+    group_expr = BOARD_GROUPS[group_by]
+    window = dict(partition_by=group_expr, order_by=keyset_order_by(sort_expr, Task.id, descending))
+    ranked = (
+        query.order_by(None)
+             .with_entities(
+                 Task.id.label("id"),
+                 group_expr.label("grp"),
+                 func.row_number().over(**window).label("rn"),
+                 func.count(Task.id).over(partition_by=group_expr).label("total"),
+             )
+             .subquery()
+    )
+    rows = (
+        db.session.query(Task, ranked.c.grp, ranked.c.total)
+        .join(ranked, ranked.c.id == Task.id)
+        .filter(ranked.c.rn <= limit)
+        .options(*options)
+        .order_by(ranked.c.grp, ranked.c.rn)
+        .all()
+    )
+
+    columns = {}
+    for task, grp, total in rows:
+        columns.setdefault(grp, (total, []))[1].append(task)
+    return columns
@@ -10,6 +10,7 @@ from models.task_model import Task
 from models.user_model import User
 from services.ms_graph_delegated import create_event_as_user
 from services.ms_graph_delegated import update_event_as_user, delete_event_as_user
+from services.recurrence import remaining_count, series_rule
 # ------------------------------------------------------------
 # Config
 # ------------------------------------------------------------
@@ -22,20 +23,24 @@ DEFAULT_TZ = os.getenv("DEFAULT_TZ", "America/Sao_Paulo")
 # Helpers de data/tempo
 # ------------------------------------------------------------
 
-def _minutes_from_task(task: Task) -> int:
-    """Converte os campos tempo_estimado/tempo_unidade em minutos, com defaults sensatos."""
-    if not getattr(task, "tempo_estimado", None):
+def estimate_minutes(tempo_estimado, tempo_unidade) -> int:
+    """Converte tempo_estimado/tempo_unidade em minutos, com defaults sensatos."""
+    if not tempo_estimado:
         return 30
     try:
-        q = int(task.tempo_estimado)
+        q = int(tempo_estimado)
     except Exception:
         return 30
-    unidade = (getattr(task, "tempo_unidade", None) or "horas").lower()
+    unidade = (tempo_unidade or "horas").lower()
     if unidade == "minutos":
         return max(q, 5)
     return max(q * 60, 15)
 
 
+def _minutes_from_task(task: Task) -> int:
+    return estimate_minutes(getattr(task, "tempo_estimado", None), getattr(task, "tempo_unidade", None))
+
+
 def _iso_local(dt: datetime) -> str:
     """Formato ISO sem offset (Graph usa timeZone separado)."""
     return dt.strftime("%Y-%m-%dT%H:%M:%S")
@@ -54,6 +59,44 @@ def _as_local_from_utc(dt: datetime, tz_name: str) -> datetime:
 # ------------------------------------------------------------
 # Helpers diversos
 # ------------------------------------------------------------
+_GRAPH_WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+def _graph_recurrence(task: Task, start_local: datetime) -> dict | None:
+    """
+    patternedRecurrence do Graph para uma série (services/recurrence), começando
+    na ocorrência atual. Regras sem equivalente (vários BYMONTHDAY) viram evento simples.
+    """
+    rule = series_rule(task)
+    if rule is None:
+        return None
+    if rule.freq == "DAILY":
+        pattern = {"type": "daily", "interval": rule.interval}
+    elif rule.freq == "WEEKLY":
+        days = rule.byday or (start_local.weekday(),)
+        pattern = {
+            "type": "weekly", "interval": rule.interval, "firstDayOfWeek": "monday",
+            "daysOfWeek": [_GRAPH_WEEKDAYS[d] for d in days],
+        }
+    elif rule.freq == "MONTHLY":
+        if len(rule.bymonthday) > 1:
+            return None
+        day = rule.bymonthday[0] if rule.bymonthday else start_local.day
+        pattern = {"type": "absoluteMonthly", "interval": rule.interval, "dayOfMonth": day}
+    else:
+        pattern = {
+            "type": "absoluteYearly", "interval": rule.interval,
+            "dayOfMonth": start_local.day, "month": start_local.month,
+        }
+
+    rng = {"startDate": start_local.date().isoformat()}
+    if rule.until is not None:
+        rng.update(type="endDate", endDate=_as_local_from_utc(rule.until, DEFAULT_TZ).date().isoformat())
+    elif rule.count is not None:
+        rng.update(type="numbered", numberOfOccurrences=max(remaining_count(task) or 1, 1))
+    else:
+        rng["type"] = "noEnd"
+    return {"pattern": pattern, "range": rng}
+
 def _compute_times_for_task_local(task: Task) -> tuple[datetime, datetime]:
     start_local = _as_local_from_utc(task.due_date, DEFAULT_TZ)
     mins = _minutes_from_task(task)
@@ -101,7 +144,8 @@ def ensure_event_for_task(task: Task, actor_user_id: int) -> dict | None:
             body_html=body_html,
             location=location,
             etag=task.ms_event_etag,
-            calendar_id=task.ms_calendar_id or "primary"
+            calendar_id=task.ms_calendar_id or "primary",
+            recurrence=_graph_recurrence(task, start_local),
         )
         task.ms_event_etag  = ev.get("@odata.etag") or ev.get("etag") or task.ms_event_etag
         task.ms_last_sync   = datetime.now(timezone.utc)
@@ -116,7 +160,8 @@ def ensure_event_for_task(task: Task, actor_user_id: int) -> dict | None:
             timezone_str=DEFAULT_TZ,
             attendees=attendees_emails,
             body_html=body_html,
-            location=location
+            location=location,
+            recurrence=_graph_recurrence(task, start_local),
         )
         task.ms_event_id    = ev.get("id")
         task.ms_calendar_id = "primary"
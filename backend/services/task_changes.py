@@ -0,0 +1,107 @@
+# services/task_changes.py
+"""
+Feed de sincronização incremental (GET /api/tasks/changes?since=).
+
+Alterações de task (criação, edição, lixeira, arquivamento) movem updated_at
+(onupdate no modelo), então o feed é um range scan em ix_tasks_updated_at_id
+a partir de (updated_at, id) do cursor. Purges não deixam linha em tasks e
+vêm de task_tombstones (id crescente), assim como a perda de acesso de um
+participante removido ou do dono reatribuído ("removed"). Cada tombstone
+guarda quem via a task (user_ids) e só é entregue a esses usuários: a
+listagem não dá visibilidade por equipe, então a equipe não entra no filtro.
+
+O cursor nunca avança além de "agora - SYNC_LAG": transações que gravaram
+updated_at um pouco antes de comitar ainda são entregues na próxima chamada.
+A entrega é pelo menos uma vez; o cliente aplica as mudanças por id (upsert).
+"""
+import base64
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, tuple_
+
+from extensions import db
+from models.task_model import Task
+from models.task_tombstone_model import TaskTombstone
+from services.pagination import InvalidCursor
+
+SYNC_LAG = timedelta(seconds=5)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_sync_cursor(updated_at: datetime, task_id: int, tombstone_id: int) -> str:
+    raw = json.dumps({"u": updated_at.isoformat(), "id": task_id, "t": tombstone_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_sync_cursor(cursor: str):
+    """Retorna (updated_at, task_id, tombstone_id). InvalidCursor se corrompido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        return datetime.fromisoformat(data["u"]), int(data["id"]), int(data["t"])
+    except Exception as e:
+        raise InvalidCursor("cursor de sincronização inválido") from e
+
+
+def _tombstone_scope(user_id: int | None):
+    """Tombstones que o usuário pode receber (user_id None = admin: todos os purges)."""
+    if user_id is None:
+        return TaskTombstone.kind == TaskTombstone.KIND_PURGED
+    return TaskTombstone.user_ids.contains([int(user_id)])
+
+
+def fetch_changes(query, cursor: str | None, limit: int, user_id: int | None = None):
+    """
+    query: escopo de tasks visíveis (sem filtro de deleted_at/status, para que
+    lixeira/arquivamento também apareçam).
+    user_id: filtra os tombstones (None = admin).
+    Sem cursor = carga inicial (todas as tasks do escopo, nenhum tombstone antigo).
+    Retorna (tasks, purged_task_ids, removed_task_ids, next_cursor, has_more).
+    """
+    if cursor:
+        last_updated, last_id, last_tomb = decode_sync_cursor(cursor)
+    else:
+        last_updated, last_id = _EPOCH, 0
+        last_tomb = db.session.query(func.coalesce(func.max(TaskTombstone.id), 0)).scalar()
+
+    tasks = (
+        query.filter(
+            Task.updated_at.isnot(None),
+            tuple_(Task.updated_at, Task.id) > tuple_(last_updated, last_id),
+        )
+        .order_by(Task.updated_at.asc(), Task.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+    tombs = (
+        TaskTombstone.query
+        .filter(TaskTombstone.id > last_tomb, _tombstone_scope(user_id))
+        .order_by(TaskTombstone.id.asc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    has_more = len(tasks) > limit or len(tombs) > limit
+    tasks = tasks[:limit]
+    tombs = tombs[:limit]
+
+    position = (last_updated, last_id)
+    if tasks:
+        position = (tasks[-1].updated_at, tasks[-1].id)
+    if len(tasks) < limit:
+        # página esgotada: segura o cursor em "agora - SYNC_LAG" (sem retroceder)
+        horizon = (datetime.utcnow() - SYNC_LAG, 0)
+        position = max((last_updated, last_id), min(position, horizon))
+    if tombs:
+        last_tomb = tombs[-1].id
+
+    purged = [t.task_id for t in tombs if t.kind == TaskTombstone.KIND_PURGED]
+    removed = {t.task_id for t in tombs if t.kind == TaskTombstone.KIND_REMOVED}
+    if removed:
+        # voltou a participar depois da remoção: a task segue visível, não é "removed"
+        removed -= {tid for (tid,) in query.filter(Task.id.in_(removed)).with_entities(Task.id)}
+
+    next_cursor = encode_sync_cursor(position[0], position[1], last_tomb)
+    return tasks, purged, sorted(removed), next_cursor, has_more
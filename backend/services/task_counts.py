@@ -0,0 +1,145 @@
+# services/task_counts.py
+"""
+Contadores do menu lateral (GET /api/tasks/counts).
+
+Os três números saem de uma query só (COUNT(*) FILTER (WHERE ...)) e ficam em
+cache por usuário neste processo. Todo flush que toca uma task anota os
+usuários afetados (dono, participantes, membros da equipe — antes e depois da
+alteração) e as entradas deles caem quando a transação comita. Escritas feitas por
+outros workers não disparam os eventos daqui, por isso a entrada também
+expira após CACHE_TTL segundos.
+"""
+import threading
+import time
+
+from sqlalchemy import and_, event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models.task_model import Task
+from models.task_participant_model import TaskParticipant
+from services.task_visibility import participates
+
+CACHE_TTL = 30.0
+
+_lock = threading.Lock()
+_cache = {}          # user_id -> (team_ids, counts, expira_em)
+_team_users = {}     # team_id -> {user_id} com entrada em cache
+
+_INFO_KEY = "task_counts_dirty"
+
+
+def compute_task_counts(user_id: int, team_ids) -> dict:
+    """Uma query com FILTER para os três contadores (tasks abertas, fora da lixeira)."""
+    my_tasks = and_(
+        Task.team_id.is_(None),
+        or_(Task.user_id == user_id, participates(user_id, TaskParticipant.ROLE_ASSIGNEE)),
+    )
+    collaborative = participates(user_id, TaskParticipant.ROLE_COLLABORATOR)
+    universe = [Task.user_id == user_id, participates(user_id)]
+    columns = [
+        func.count(Task.id).filter(my_tasks),
+        func.count(Task.id).filter(collaborative),
+    ]
+    if team_ids:
+        team_tasks = Task.team_id.in_(team_ids)
+        universe.append(team_tasks)
+        columns.append(func.count(Task.id).filter(team_tasks))
+
+    row = (
+        db.session.query(*columns)
+        .filter(
+            Task.deleted_at.is_(None),
+            Task.status != "done",
+            Task.completed_at.is_(None),
+            or_(*universe),
+        )
+        .one()
+    )
+    return {
+        "my_tasks": row[0],
+        "team_tasks": row[2] if team_ids else 0,
+        "collaborative_tasks": row[1],
+    }
+
+
+def get_task_counts(user_id: int, team_ids) -> dict:
+    """Contadores do usuário, do cache quando válido."""
+    user_id = int(user_id)
+    team_ids = tuple(sorted(team_ids or ()))
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user_id)
+        if entry and entry[0] == team_ids and entry[2] > now:
+            return dict(entry[1])
+
+    counts = compute_task_counts(user_id, team_ids)
+    with _lock:
+        old = _cache.get(user_id)
+        if old:
+            for tid in old[0]:
+                _team_users.get(tid, set()).discard(user_id)
+        _cache[user_id] = (team_ids, counts, now + CACHE_TTL)
+        for tid in team_ids:
+            _team_users.setdefault(tid, set()).add(user_id)
+    return dict(counts)
+
+
+def invalidate(user_ids=(), team_ids=()):
+    with _lock:
+        targets = set(user_ids)
+        for tid in team_ids:
+            targets |= _team_users.get(tid, set())
+        for uid in targets:
+            entry = _cache.pop(uid, None)
+            if entry:
+                for tid in entry[0]:
+                    _team_users.get(tid, set()).discard(uid)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+        _team_users.clear()
+
+
+def _values(state, key):
+    """Valor atual + anterior (se carregado) de um atributo."""
+    hist = state.attrs[key].history
+    return [v for v in (*hist.added, *hist.unchanged, *hist.deleted) if v is not None]
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_affected(session, flush_context):
+    users, teams, task_ids = set(), set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            users.update(_values(state, "user_id"))
+            teams.update(_values(state, "team_id"))
+            if obj.id is not None:
+                task_ids.add(obj.id)
+        elif isinstance(obj, TaskParticipant):
+            # entrada/saída de assigned_users/collaborators
+            users.add(obj.user_id)
+    if task_ids:
+        # participantes atuais também mudam de contagem (status, lixeira...)
+        users.update(session.connection().execute(
+            select(TaskParticipant.user_id).where(TaskParticipant.task_id.in_(task_ids))
+        ).scalars())
+    if users or teams:
+        dirty = session.info.setdefault(_INFO_KEY, (set(), set()))
+        dirty[0].update(users)
+        dirty[1].update(teams)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    dirty = session.info.pop(_INFO_KEY, None)
+    if dirty:
+        invalidate(*dirty)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(_INFO_KEY, None)
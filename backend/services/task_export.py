@@ -0,0 +1,106 @@
+# services/task_export.py
+"""
+Exportação do relatório de tasks (GET /api/tasks/export) em CSV ou XLSX.
+
+As linhas saem de um cursor do lado do servidor (yield_per) já como tuplas
+(sem montar objetos Task nem to_dict), então a memória fica constante
+qualquer que seja o tamanho da exportação.
+- CSV: gerador que escreve linha a linha direto na resposta (mesmo formato do
+  export de auditoria: BOM + ';' para abrir certo no Excel pt-BR).
+- XLSX: openpyxl em modo write_only (linhas vão para disco, não para a
+  memória).
+"""
+import csv
+import io
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from models.task_model import Task
+from models.team_model import Team
+from models.user_model import User
+
+EXPORT_BATCH = 1000   # linhas por fetch do cursor
+CSV_FLUSH_ROWS = 200  # linhas acumuladas antes de enviar um pedaço da resposta
+
+EXPORT_HEADER = [
+    "ID", "Título", "Descrição", "Status", "Prioridade", "Categoria",
+    "Responsável", "Equipe", "Tags", "Subtarefas (%)", "Aprovação",
+    "Criada em", "Prazo", "Concluída em",
+]
+
+_DATE_FMT = "%d/%m/%Y %H:%M:%S"
+
+
+def export_rows(query):
+    """Itera as linhas da exportação (tuplas na ordem de EXPORT_HEADER, datas como datetime)."""
+    owner = aliased(User)
+    rows = (
+        query.order_by(None)
+             .outerjoin(owner, owner.id == Task.user_id)
+             .outerjoin(Team, Team.id == Task.team_id)
+             .with_entities(
+                 Task.id, Task.title, Task.description, Task.status, Task.prioridade,
+                 Task.categoria, owner.username, Team.name, Task.tags,
+                 func.coalesce(Task.subtasks_percent, 0), Task.approval_status,
+                 Task.created_at, Task.due_date, Task.completed_at,
+             )
+             .order_by(Task.id)
+             .yield_per(EXPORT_BATCH)
+    )
+    for row in rows:
+        row = list(row)
+        row[8] = _tag_names(row[8])
+        yield row
+
+
+def _tag_names(tags) -> str:
+    names = []
+    for item in tags or []:
+        if isinstance(item, dict):
+            item = item.get("name") or item.get("label")
+        if item:
+            names.append(str(item).strip())
+    return ", ".join(n for n in names if n)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime(_DATE_FMT)
+    return value
+
+
+def iter_csv(query):
+    """Gerador de pedaços (bytes UTF-8) do CSV."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADER)
+    pending = 0
+    for row in export_rows(query):
+        writer.writerow([_csv_value(v) for v in row])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def write_xlsx(query, fileobj):
+    """Escreve o XLSX em fileobj (arquivo temporário)."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Tarefas")
+    ws.append(EXPORT_HEADER)
+    for row in export_rows(query):
+        # caracteres de controle (ex.: colados de e-mail) quebram o XML da planilha
+        ws.append([ILLEGAL_CHARACTERS_RE.sub("", v) if isinstance(v, str) else v for v in row])
+    wb.save(fileobj)
+    fileobj.seek(0)
+    return fileobj
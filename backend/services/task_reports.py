@@ -0,0 +1,74 @@
+# services/task_reports.py
+"""
+Agregados do relatório de tasks (GET /api/tasks/reports) calculados no banco.
+
+Recebe a query já filtrada (visibilidade + filtros do relatório) e devolve os
+mesmos números que o antigo laço em Python, com GROUP BY / COUNT FILTER / AVG.
+Datas no banco são UTC naive; "agora" é avaliado a cada chamada.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, extract, func, or_
+
+from models.task_model import Task
+
+# concluída "válida": done e, se exige aprovação, aprovada
+COMPLETED_VALID = and_(
+    Task.status == "done",
+    or_(Task.requires_approval.isnot(True), Task.approval_status == "approved"),
+)
+
+# momento da conclusão (tasks antigas podem não ter completed_at)
+FINISHED_AT = func.coalesce(Task.completed_at, Task.updated_at)
+
+
+def _group_counts(query, column) -> dict:
+    rows = (query.with_entities(column, func.count(Task.id))
+                 .filter(column.isnot(None))
+                 .group_by(column)
+                 .order_by(None)
+                 .all())
+    return {key: count for key, count in rows}
+
+
+def format_duration(seconds) -> str:
+    if seconds is None:
+        return "N/A"
+    seconds = float(seconds)
+    days = int(seconds // (24 * 3600))
+    hours = int((seconds % (24 * 3600)) // 3600)
+    minutes = int((seconds % 3600) // 60)
+    return f"{days}d {hours}h {minutes}m"
+
+
+def build_task_report(query, now: datetime | None = None) -> dict:
+    now = now or datetime.utcnow()
+    completed_with_due = and_(COMPLETED_VALID, Task.due_date.isnot(None))
+    open_with_due = and_(Task.status != "done", Task.due_date.isnot(None))
+
+    (total, on_time, late, avg_seconds, overdue, upcoming) = (
+        query.with_entities(
+            func.count(Task.id),
+            func.count(Task.id).filter(completed_with_due, FINISHED_AT <= Task.due_date),
+            func.count(Task.id).filter(completed_with_due, or_(FINISHED_AT.is_(None), FINISHED_AT > Task.due_date)),
+            func.avg(extract("epoch", FINISHED_AT - Task.created_at)).filter(
+                completed_with_due, FINISHED_AT.isnot(None), Task.created_at.isnot(None)
+            ),
+            func.count(Task.id).filter(open_with_due, Task.due_date < now),
+            func.count(Task.id).filter(open_with_due, Task.due_date > now),
+        )
+        .order_by(None)
+        .one()
+    )
+
+    return {
+        "total_tasks": total,
+        "tasks_by_status": _group_counts(query, Task.status),
+        "tasks_by_priority": _group_counts(query, Task.prioridade),
+        "tasks_by_category": _group_counts(query, Task.categoria),
+        "tasks_completed_on_time": on_time,
+        "tasks_completed_late": late,
+        "average_completion_time": format_duration(avg_seconds),
+        "overdue_tasks": overdue,
+        "upcoming_tasks": upcoming,
+    }
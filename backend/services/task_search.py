@@ -0,0 +1,216 @@
+# services/task_search.py
+"""
+Busca textual de tasks (Postgres full-text search).
+
+tasks.search_vector é mantido pela aplicação (refresh_search_vectors) com pesos:
+  A = título, B = nomes das tags, C = descrição, D = comentários.
+Configuração 'pt_unaccent' = portuguese + unaccent (busca "reuniao" acha "reunião").
+Coluna, índice GIN e configuração: migração 2e73a76742da; carga inicial dos
+vetores: python manage.py setup-task-search
+
+O vetor é recalculado depois do commit de qualquer sessão que criou task,
+mudou título/descrição/tags ou criou/editou/apagou comentário (listeners
+abaixo), então nenhuma rota precisa lembrar de chamar o refresh.
+"""
+import logging
+import re
+import threading
+import time
+
+from sqlalchemy import cast, event, func, inspect, text
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from extensions import db
+from models.comment_model import Comment
+from models.task_model import Task
+
+log = logging.getLogger("task_search")
+
+SEARCH_CONFIG = "pt_unaccent"
+
+_HEADLINE_OPTS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter= … "
+
+# termos para o modo prefixo: só letras/dígitos (qualquer outra coisa vira separador)
+_TERM_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+_SETUP_SQL = f"""
+CREATE EXTENSION IF NOT EXISTS unaccent;
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{SEARCH_CONFIG}') THEN
+        CREATE TEXT SEARCH CONFIGURATION {SEARCH_CONFIG} (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION {SEARCH_CONFIG}
+            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END
+$$;
+"""
+
+# Recalcula o vetor a partir do estado atual da task + tags + comentários.
+# tags pode ter nomes ("Projeto") ou objetos legados ({"name": "Projeto"}).
+_REFRESH_SQL = f"""
+UPDATE tasks t SET search_vector =
+      setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.title, '')), 'A')
+   || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(coalesce(e->>'name', e #>> '{{}}'), ' ')
+              FROM jsonb_array_elements(
+                   CASE WHEN jsonb_typeof(t.tags::jsonb) = 'array' THEN t.tags::jsonb ELSE '[]'::jsonb END
+              ) AS e
+       ), '')), 'B')
+   || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(t.description, '')), 'C')
+   || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(c.content, ' ') FROM comments c WHERE c.task_id = t.id
+       ), '')), 'D')
+"""
+
+
+def _config():
+    return cast(SEARCH_CONFIG, REGCONFIG)
+
+
+def ensure_search_setup():
+    """Cria a extensão unaccent e a configuração pt_unaccent (idempotente)."""
+    db.session.execute(text(_SETUP_SQL))
+    db.session.commit()
+
+
+def refresh_search_vectors(task_ids) -> None:
+    """Recalcula search_vector das tasks informadas. Não faz commit."""
+    ids = sorted({int(i) for i in (task_ids or []) if i is not None})
+    if not ids:
+        return
+    db.session.execute(text(_REFRESH_SQL + " WHERE t.id = ANY(:ids)"), {"ids": ids})
+
+
+_INFO_KEY = "search_refresh_task_ids"
+_INDEXED_ATTRS = ("title", "description", "tags")
+
+
+def _changed(obj, attrs) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[a].history.has_changes() for a in attrs)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_search_refresh(session, flush_context):
+    ids = set()
+    for obj in session.new:
+        if isinstance(obj, Task):
+            ids.add(obj.id)
+        elif isinstance(obj, Comment):
+            ids.add(obj.task_id)
+    for obj in session.dirty:
+        if isinstance(obj, Task) and _changed(obj, _INDEXED_ATTRS):
+            ids.add(obj.id)
+        elif isinstance(obj, Comment) and _changed(obj, ("content", "task_id")):
+            ids.update(inspect(obj).attrs.task_id.history.sum())
+    for obj in session.deleted:
+        if isinstance(obj, Comment):
+            ids.add(obj.task_id)
+    ids.discard(None)
+    if ids:
+        session.info.setdefault(_INFO_KEY, set()).update(ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_commit(session):
+    """
+    Recalcula numa transação própria, depois do commit: falha na busca (ex.:
+    setup ainda não rodado) não pode derrubar a gravação da task/comentário.
+    """
+    ids = session.info.pop(_INFO_KEY, None)
+    if not ids:
+        return
+    engine = session.get_bind()
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(_REFRESH_SQL + " WHERE t.id = ANY(:ids)"), {"ids": sorted(ids)})
+    except Exception:
+        log.exception("[SEARCH] Falha ao atualizar search_vector de %s", sorted(ids))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_search_refresh(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+_READY_RECHECK = 60.0  # s até checar de novo um setup que ainda não existia
+_ready_lock = threading.Lock()
+_ready = {"ok": False, "checked_at": 0.0}
+
+
+def search_available() -> bool:
+    """
+    Postgres com a coluna search_vector e a configuração pt_unaccent criadas?
+    Resultado positivo fica em cache; negativo é rechecado a cada _READY_RECHECK s.
+    """
+    with _ready_lock:
+        if _ready["ok"] or time.monotonic() - _ready["checked_at"] < _READY_RECHECK:
+            return _ready["ok"]
+    ok = False
+    if db.engine.dialect.name == "postgresql":
+        try:
+            ok = bool(db.session.execute(text(
+                "SELECT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = :cfg) "
+                "   AND EXISTS (SELECT 1 FROM information_schema.columns "
+                "               WHERE table_name = 'tasks' AND column_name = 'search_vector')"
+            ), {"cfg": SEARCH_CONFIG}).scalar())
+        except Exception:
+            log.exception("[SEARCH] Falha ao verificar o setup da busca textual")
+    with _ready_lock:
+        _ready.update(ok=ok, checked_at=time.monotonic())
+    return ok
+
+
+def backfill_search_vectors(batch_size: int = 1000) -> int:
+    """Recalcula o vetor de todas as tasks em lotes de ids. Retorna tasks processadas."""
+    total = 0
+    last_id = 0
+    while True:
+        ids = [
+            r[0] for r in db.session.query(Task.id)
+            .filter(Task.id > last_id).order_by(Task.id).limit(batch_size)
+        ]
+        if not ids:
+            break
+        refresh_search_vectors(ids)
+        db.session.commit()
+        total += len(ids)
+        last_id = ids[-1]
+    log.info("[SEARCH] search_vector recalculado para %s task(s)", total)
+    return total
+
+
+def build_tsquery(q: str, prefix: bool = False):
+    """
+    prefix=False: websearch_to_tsquery (aceita "frase", -exclusão, OR).
+    prefix=True: cada termo vira 'termo:*' unido por AND (typeahead).
+    Retorna None se não sobrar termo útil.
+    """
+    q = (q or "").strip()
+    if not q:
+        return None
+    if not prefix:
+        return func.websearch_to_tsquery(_config(), q)
+    terms = _TERM_RE.findall(q)
+    if not terms:
+        return None
+    return func.to_tsquery(_config(), " & ".join(f"{t}:*" for t in terms))
+
+
+def matches(tsquery):
+    """Condição search_vector @@ tsquery (usa o índice GIN)."""
+    return Task.search_vector.op("@@")(tsquery)
+
+
+def rank(tsquery):
+    return func.ts_rank_cd(Task.search_vector, tsquery)
+
+
+def headline(tsquery):
+    """Trecho destacado com <mark> sobre título + descrição."""
+    document = func.concat_ws(" — ", Task.title, Task.description)
+    return func.ts_headline(_config(), document, tsquery, _HEADLINE_OPTS)
@@ -0,0 +1,278 @@
+# services/task_serializer.py
+"""
+Serialização em lote de tasks.
+
+Task.to_dict() sozinho resolve cada usuário (responsável, atribuidor, aprovador,
+arquivador, quem excluiu, assigned_users, collaborators) e a equipe com uma query
+por acesso. Para listas isso vira N+1. Aqui coletamos todos os ids referenciados
+e resolvemos com um único IN por entidade, reaproveitando o mesmo to_dict().
+
+Também suporta projeção (?fields= / presets): só as colunas necessárias para os
+campos pedidos são carregadas (load_only) e só esses campos são serializados.
+"""
+from typing import Iterable
+
+from sqlalchemy.orm import load_only
+
+from models.task_model import Task
+from models.team_model import Team
+from models.user_model import User
+
+_USER_FK_FIELDS = (
+    "user_id",
+    "assigned_by_user_id",
+    "approved_by_user_id",
+    "archived_by_user_id",
+    "deleted_by_user_id",
+)
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def collect_user_ids(tasks: Iterable[Task]) -> set[int]:
+    ids = set()
+    for t in tasks:
+        for field in _USER_FK_FIELDS:
+            uid = _as_int(getattr(t, field, None))
+            if uid is not None:
+                ids.add(uid)
+        for uid in (t.assigned_users or []):
+            uid = _as_int(uid)
+            if uid is not None:
+                ids.add(uid)
+        for uid in (t.collaborators or []):
+            uid = _as_int(uid)
+            if uid is not None:
+                ids.add(uid)
+    return ids
+
+
+def collect_team_ids(tasks: Iterable[Task]) -> set[int]:
+    return {t.team_id for t in tasks if t.team_id is not None}
+
+
+def load_users_by_id(user_ids: Iterable[int]) -> dict[int, User]:
+    ids = list(set(user_ids or []))
+    if not ids:
+        return {}
+    return {u.id: u for u in User.query.filter(User.id.in_(ids)).all()}
+
+
+def load_teams_by_id(team_ids: Iterable[int]) -> dict[int, Team]:
+    ids = list(set(team_ids or []))
+    if not ids:
+        return {}
+    return {t.id: t for t in Team.query.filter(Team.id.in_(ids)).all()}
+
+
+def serialize_tasks(tasks: list[Task]) -> list[dict]:
+    """
+    Equivalente a [t.to_dict() for t in tasks], mas com uma query para usuários
+    e outra para equipes, independente do tamanho da lista.
+    """
+    tasks = list(tasks or [])
+    if not tasks:
+        return []
+    users_by_id = load_users_by_id(collect_user_ids(tasks))
+    teams_by_id = load_teams_by_id(collect_team_ids(tasks))
+    return [t.to_dict(users_by_id=users_by_id, teams_by_id=teams_by_id) for t in tasks]
+
+
+# ------------------------------------------------------------
+# Projeção (sparse fieldsets)
+# ------------------------------------------------------------
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _user_field(fk):
+    def build(t, ctx):
+        uid = _as_int(getattr(t, fk))
+        return Task._user_info(ctx["users"].get(uid)) if uid is not None else None
+    return build
+
+
+def _users_info_field(attr):
+    def build(t, ctx):
+        out = []
+        for uid in (getattr(t, attr) or []):
+            u = ctx["users"].get(_as_int(uid))
+            if u:
+                out.append(Task._user_info(u))
+        return out
+    return build
+
+
+def _plain(attr):
+    return (attr,), (lambda t, ctx: getattr(t, attr))
+
+
+def _date(attr):
+    return (attr,), (lambda t, ctx: _iso(getattr(t, attr)))
+
+
+def _json_list(attr):
+    return (attr,), (lambda t, ctx: getattr(t, attr) or [])
+
+
+# campo de saída -> (colunas necessárias, builder(task, ctx)); espelha Task.to_dict()
+TASK_FIELDS = {
+    "id": _plain("id"),
+    "title": _plain("title"),
+    "description": _plain("description"),
+    "status": _plain("status"),
+    "due_date": _date("due_date"),
+    "completed_at": _date("completed_at"),
+    "archived_at": _date("archived_at"),
+    "archived_by_user_id": _plain("archived_by_user_id"),
+    "archived_by_user": (("archived_by_user_id",), _user_field("archived_by_user_id")),
+    "prioridade": _plain("prioridade"),
+    "categoria": _plain("categoria"),
+    "status_inicial": _plain("status_inicial"),
+    "tempo_estimado": _plain("tempo_estimado"),
+    "tempo_unidade": _plain("tempo_unidade"),
+    "relacionado_a": _plain("relacionado_a"),
+    "lembretes": _json_list("lembretes"),
+    "tags": _json_list("tags"),
+    "anexos": _json_list("anexos"),
+    "subtasks": _json_list("subtasks"),
+    "subtasks_total": (("subtasks_total",), lambda t, ctx: t.subtasks_total or 0),
+    "subtasks_done": (("subtasks_done",), lambda t, ctx: t.subtasks_done or 0),
+    "subtasks_percent": (("subtasks_percent",), lambda t, ctx: t.subtasks_percent or 0),
+    "created_at": _date("created_at"),
+    "updated_at": _date("updated_at"),
+    "user_id": _plain("user_id"),
+    "user": (("user_id",), _user_field("user_id")),
+    "assigned_by_user_id": _plain("assigned_by_user_id"),
+    "assigned_by_user": (("assigned_by_user_id",), _user_field("assigned_by_user_id")),
+    "assigned_to_user": (("user_id",), _user_field("user_id")),
+    "collaborators": _json_list("collaborators"),
+    "collaborators_info": (("collaborators",), _users_info_field("collaborators")),
+    "assigned_users": _json_list("assigned_users"),
+    "assigned_users_info": (("assigned_users",), _users_info_field("assigned_users")),
+    "requires_approval": (("requires_approval",), lambda t, ctx: bool(t.requires_approval)),
+    "approval_status": _plain("approval_status"),
+    "approved_by_user_id": _plain("approved_by_user_id"),
+    "approved_by_user": (("approved_by_user_id",), _user_field("approved_by_user_id")),
+    "approved_at": _date("approved_at"),
+    "team_id": _plain("team_id"),
+    "team_name": (("team_id",), lambda t, ctx: (ctx["teams"].get(t.team_id).name
+                                               if ctx["teams"].get(t.team_id) else None)),
+    "is_deleted": (("deleted_at",), lambda t, ctx: t.deleted_at is not None),
+    "deleted_at": _date("deleted_at"),
+    "deleted_by_user_id": _plain("deleted_by_user_id"),
+    "deleted_by_user": (("deleted_by_user_id",), _user_field("deleted_by_user_id")),
+    "ms_event_id": _plain("ms_event_id"),
+    "ms_calendar_id": _plain("ms_calendar_id"),
+    "ms_last_sync": _date("ms_last_sync"),
+    "ms_sync_status": _plain("ms_sync_status"),
+    "recurrence_rule": _plain("recurrence_rule"),
+    "recurrence_parent_id": _plain("recurrence_parent_id"),
+    "recurrence_date": _date("recurrence_date"),
+}
+
+# campos que dependem de usuários/equipe carregados em lote
+_USER_FIELDS = {
+    "archived_by_user", "user", "assigned_by_user", "assigned_to_user",
+    "collaborators_info", "assigned_users_info", "approved_by_user", "deleted_by_user",
+}
+_TEAM_FIELDS = {"team_name"}
+
+FIELD_PRESETS = {
+    # cartão do quadro (KanbanBoard/TaskCard)
+    "card": (
+        "id", "title", "status", "due_date", "prioridade", "categoria", "tags",
+        "team_id", "team_name", "user_id", "user", "assigned_by_user_id", "assigned_by_user",
+        "assigned_users", "assigned_users_info", "collaborators",
+        "requires_approval", "approval_status",
+        "subtasks_total", "subtasks_done", "subtasks_percent",
+        "tempo_estimado", "tempo_unidade", "created_at", "recurrence_rule",
+    ),
+    # visões de calendário (mês/semana)
+    "calendar": (
+        "id", "title", "status", "due_date", "prioridade", "team_id", "team_name",
+        "tempo_estimado", "tempo_unidade", "recurrence_rule",
+    ),
+    "full": None,
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(raw: str | None):
+    """
+    Interpreta ?fields=. Aceita um preset ("card", "calendar", "full") ou lista
+    separada por vírgula de campos do TASK_FIELDS (presets podem ser combinados
+    com campos avulsos: "card,description").
+    Retorna None para "tudo" (to_dict completo) ou uma tupla ordenada de campos.
+    """
+    if not raw:
+        return None
+    fields = []
+    for part in (p.strip() for p in raw.split(",")):
+        if not part:
+            continue
+        if part in FIELD_PRESETS:
+            preset = FIELD_PRESETS[part]
+            if preset is None:
+                return None
+            fields.extend(preset)
+        elif part in TASK_FIELDS:
+            fields.append(part)
+        else:
+            raise InvalidFields(f"Campo desconhecido em fields: {part}")
+    if "id" not in fields:
+        fields.insert(0, "id")
+    return tuple(dict.fromkeys(fields))
+
+
+def task_load_options(fields, extra_columns: Iterable[str] = ()):
+    """
+    Opções de query (load_only) para carregar só as colunas que os campos exigem.
+    extra_columns: colunas usadas fora da serialização (ex.: chave do cursor).
+    """
+    if fields is None:
+        return []
+    columns = {"id", *extra_columns}
+    for f in fields:
+        columns.update(TASK_FIELDS[f][0])
+    return [load_only(*[getattr(Task, c) for c in sorted(columns)], raiseload=False)]
+
+
+def project_tasks(tasks: list[Task], fields) -> list[dict]:
+    """
+    Serializa apenas os campos pedidos. Usuários/equipe só são buscados (em lote)
+    se algum campo pedido precisar deles.
+    """
+    if fields is None:
+        return serialize_tasks(tasks)
+    tasks = list(tasks or [])
+    if not tasks:
+        return []
+
+    users_by_id, teams_by_id = {}, {}
+    if _USER_FIELDS.intersection(fields):
+        ids = set()
+        for t in tasks:
+            for f in _USER_FIELDS.intersection(fields):
+                for col in TASK_FIELDS[f][0]:
+                    value = getattr(t, col)
+                    for uid in (value if isinstance(value, list) else [value]):
+                        uid = _as_int(uid)
+                        if uid is not None:
+                            ids.add(uid)
+        users_by_id = load_users_by_id(ids)
+    if _TEAM_FIELDS.intersection(fields):
+        teams_by_id = load_teams_by_id(collect_team_ids(tasks))
+
+    ctx = {"users": users_by_id, "teams": teams_by_id}
+    builders = [(f, TASK_FIELDS[f][1]) for f in fields]
+    return [{f: build(t, ctx) for f, build in builders} for t in tasks]
@@ -0,0 +1,42 @@
+# services/task_visibility.py
+"""
+Predicados de visibilidade de tasks baseados em task_participants.
+
+Substituem os antigos 'tasks.assigned_users::jsonb @> [id]' (cast por linha,
+sem índice). Cada ramo é um lookup indexado e o resultado entra como
+semi-join: Task.id IN (ids do usuário).
+"""
+from sqlalchemy import select, union
+
+from models.task_model import Task
+from models.task_participant_model import TaskParticipant
+
+
+def participant_task_ids(user_id: int, role: str | None = None):
+    """SELECT task_id das tasks em que o usuário participa (opcionalmente num papel)."""
+    stmt = select(TaskParticipant.task_id).where(TaskParticipant.user_id == user_id)
+    if role:
+        stmt = stmt.where(TaskParticipant.role == role)
+    return stmt
+
+
+def participates(user_id: int, role: str | None = None):
+    """Condição para Query.filter: a task tem o usuário como participante."""
+    return Task.id.in_(participant_task_ids(user_id, role))
+
+
+def visible_task_ids(user_id: int):
+    """
+    Ids das tasks visíveis para um usuário comum: responsável, quem atribuiu,
+    assigned_users ou collaborators. Mesma regra do antigo OR com jsonb.
+    """
+    return union(
+        select(Task.id).where(Task.user_id == user_id),
+        select(Task.id).where(Task.assigned_by_user_id == user_id),
+        participant_task_ids(user_id),
+    )
+
+
+def visible_to(user_id: int):
+    """Condição para Query.filter equivalente ao escopo de GET /api/tasks para não-admin."""
+    return Task.id.in_(visible_task_ids(user_id))
@@ -0,0 +1,151 @@
+# services/team_capacity.py
+"""
+Carga estimada por membro e semana (GET /api/teams/<id>/capacity).
+
+Uma query traz só as colunas necessárias (membro, due_date, tempo estimado)
+das tasks abertas da equipe no período; o agrupamento por membro x semana é
+feito com arrays NumPy (searchsorted + bincount), sem objetos por task.
+Semanas começam na segunda-feira, no fuso DEFAULT_TZ; due_date no banco é UTC naive.
+
+Cada responsável (TaskParticipant assignee) recebe a estimativa inteira da
+task; sem responsável, conta para o dono (Task.user_id).
+
+Task sem tempo_estimado soma 0 h (não o default de 30 min da agenda) e entra
+em unestimated_count do membro/semana, para a carga não parecer menor do que é
+sem que o relatório invente horas.
+"""
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from sqlalchemy import and_, func
+
+from extensions import db
+from models.task_model import Task
+from models.task_participant_model import TaskParticipant
+from models.user_model import User
+from models.user_team_model import UserTeam
+from services.task_calendar_service import DEFAULT_TZ, estimate_minutes
+
+OPEN_EXCLUDED_STATUSES = ("done", "archived", "cancelled")
+
+
+def week_boundaries(first_monday, weeks: int) -> list:
+    """Início (UTC naive) de cada semana local + o fim da última."""
+    tz = ZoneInfo(DEFAULT_TZ)
+    bounds = []
+    for i in range(weeks + 1):
+        local = datetime.combine(first_monday + timedelta(weeks=i), time.min, tzinfo=tz)
+        bounds.append(local.astimezone(timezone.utc).replace(tzinfo=None))
+    return bounds
+
+
+def _load_rows(team_id: int, start, end):
+    is_minutes = func.lower(func.coalesce(Task.tempo_unidade, "horas")) == "minutos"
+    return (
+        db.session.query(
+            func.coalesce(TaskParticipant.user_id, Task.user_id),
+            Task.due_date,
+            func.coalesce(Task.tempo_estimado, 0),
+            is_minutes,
+        )
+        .select_from(Task)
+        .outerjoin(TaskParticipant, and_(
+            TaskParticipant.task_id == Task.id,
+            TaskParticipant.role == TaskParticipant.ROLE_ASSIGNEE,
+        ))
+        .filter(
+            Task.team_id == team_id,
+            Task.deleted_at.is_(None),
+            Task.status.notin_(OPEN_EXCLUDED_STATUSES),
+            Task.due_date >= start,
+            Task.due_date < end,
+        )
+        .all()
+    )
+
+
+def _bucket_numpy(rows, member_ids, bounds):
+    """
+    Matrizes membros x semanas (minutos e nº de tasks sem estimativa)
+    e nº de tasks por membro.
+    """
+    n_members, n_weeks = len(member_ids), len(bounds) - 1
+    if not rows or not n_members:
+        return (np.zeros((n_members, n_weeks)), np.zeros((n_members, n_weeks), dtype=np.int64),
+                np.zeros(n_members, dtype=np.int64))
+
+    users, dues, estimates, minute_units = zip(*rows)
+    users = np.asarray(users, dtype=np.int64)
+    dues = np.asarray(dues, dtype="datetime64[us]")
+    # (estimado, unidade) se repetem muito: converte cada par distinto uma vez só
+    estimates = np.asarray(estimates, dtype=np.int64)
+    unestimated = estimates <= 0
+    codes = estimates * 2 + np.asarray(minute_units, dtype=np.int64)
+    unique_codes, inverse = np.unique(codes, return_inverse=True)
+    table = np.array([
+        estimate_minutes(int(c) // 2, "minutos" if int(c) % 2 else "horas") if c > 1 else 0
+        for c in unique_codes
+    ], dtype=np.float64)
+    minutes = table[inverse.reshape(-1)]
+
+    weeks = np.searchsorted(np.asarray(bounds, dtype="datetime64[us]"), dues, side="right") - 1
+    members = np.asarray(member_ids, dtype=np.int64)
+    order = np.argsort(members)
+    pos = np.searchsorted(members, users, sorter=order).clip(0, n_members - 1)
+    member_idx = order[pos]
+    keep = (members[member_idx] == users) & (weeks >= 0) & (weeks < n_weeks)
+
+    flat = member_idx[keep] * n_weeks + weeks[keep]
+    matrix = np.bincount(flat, weights=minutes[keep], minlength=n_members * n_weeks)
+    missing = np.bincount(flat, weights=unestimated[keep], minlength=n_members * n_weeks)
+    counts = np.bincount(member_idx[keep], minlength=n_members)
+    return (matrix.reshape(n_members, n_weeks),
+            missing.reshape(n_members, n_weeks).astype(np.int64), counts)
+
+
+def team_capacity(team_id: int, first_monday, weeks: int, weekly_hours: float) -> dict:
+    """Horas estimadas por membro/semana + semanas acima de weekly_hours."""
+    bounds = week_boundaries(first_monday, weeks)
+    members = (
+        db.session.query(User.id, User.username)
+        .join(UserTeam, UserTeam.user_id == User.id)
+        .filter(UserTeam.team_id == team_id)
+        .order_by(User.username)
+        .all()
+    )
+    member_ids = [m.id for m in members]
+    rows = _load_rows(team_id, bounds[0], bounds[-1])
+
+    matrix, missing, counts = _bucket_numpy(rows, member_ids, bounds)
+    hours = np.round(matrix / 60.0, 1).tolist()
+    team_missing = missing.sum(axis=0).tolist()
+    missing = missing.tolist()
+    counts = counts.tolist()
+
+    week_starts = [(first_monday + timedelta(weeks=i)).isoformat() for i in range(weeks)]
+    result = []
+    team_hours = [0.0] * weeks
+    for (member_id, username), line, unestimated, n_tasks in zip(members, hours, missing, counts):
+        over = [week_starts[w] for w, h in enumerate(line) if h > weekly_hours]
+        for w, h in enumerate(line):
+            team_hours[w] += h
+        result.append({
+            "user_id": member_id,
+            "user_name": username,
+            "hours_per_week": line,
+            "total_hours": round(sum(line), 1),
+            "tasks": int(n_tasks),
+            "unestimated_count": unestimated,
+            "unestimated_total": sum(unestimated),
+            "over_allocated": bool(over),
+            "over_allocated_weeks": over,
+        })
+
+    return {
+        "weeks": week_starts,
+        "weekly_capacity_hours": weekly_hours,
+        "team_hours_per_week": [round(h, 1) for h in team_hours],
+        "team_unestimated_per_week": team_missing,
+        "members": result,
+    }
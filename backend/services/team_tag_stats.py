@@ -0,0 +1,172 @@
+# services/team_tag_stats.py
+"""
+Manutenção incremental de team_tag_stats.
+
+Uma task conta para (team_id, tag) enquanto tem equipe e não está na lixeira.
+Em todo flush, compara o estado anterior x novo de tags/team_id/deleted_at das
+tasks alteradas e aplica só os deltas (upsert somando usage_count). Vale para
+qualquer caminho de escrita (rotas, schedulers, purge) sem chamadas espalhadas.
+"""
+import re
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from models.task_model import Task
+from models.team_tag_stat_model import TeamTagStat
+
+HEX_RE = re.compile(r"^#([0-9A-Fa-f]{6})$")
+
+_INFO_KEY = "team_tag_deltas"
+
+
+def _slug_and_color(item):
+    """Aceita "Projeto" ou {"name"/"label": ..., "color": ...}. Retorna (slug, cor|None)."""
+    if isinstance(item, str):
+        name, color = item, None
+    elif isinstance(item, dict):
+        name = item.get("name") or item.get("label") or ""
+        color = (item.get("color") or "").strip() or None
+    else:
+        return None, None
+    slug = re.sub(r"\s+", " ", str(name).strip()).lower()
+    if not slug:
+        return None, None
+    return slug[:80], (color if color and HEX_RE.match(color) else None)
+
+
+def tag_slugs(tags) -> dict:
+    """{slug: cor explícita|None} de uma lista de tags (cada tag conta uma vez por task)."""
+    out = {}
+    for item in tags or []:
+        slug, color = _slug_and_color(item)
+        if slug and (slug not in out or color):
+            out[slug] = color
+    return out
+
+
+def _old_value(state, key):
+    hist = state.attrs[key].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    return state.dict.get(key)
+
+
+def _contribution(team_id, tags, deleted_at) -> dict:
+    if team_id is None or deleted_at is not None:
+        return {}
+    return tag_slugs(tags)
+
+
+def _collect_deltas(session):
+    deltas = session.info.setdefault(_INFO_KEY, {"count": Counter(), "color": {}})
+
+    def add(contrib, team_id, sign):
+        for slug, color in contrib.items():
+            deltas["count"][(team_id, slug)] += sign
+            if sign > 0 and color:
+                deltas["color"][(team_id, slug)] = color
+
+    for obj in session.new:
+        if isinstance(obj, Task):
+            add(_contribution(obj.team_id, obj.tags, obj.deleted_at), obj.team_id, +1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Task):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[k].history.has_changes() for k in ("tags", "team_id", "deleted_at")):
+            continue
+        old_team = _old_value(state, "team_id")
+        add(_contribution(old_team, _old_value(state, "tags"), _old_value(state, "deleted_at")), old_team, -1)
+        add(_contribution(obj.team_id, obj.tags, obj.deleted_at), obj.team_id, +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            state = inspect(obj)
+            old_team = _old_value(state, "team_id")
+            add(_contribution(old_team, _old_value(state, "tags"), _old_value(state, "deleted_at")), old_team, -1)
+
+
+def _apply_deltas(session):
+    deltas = session.info.pop(_INFO_KEY, None)
+    if not deltas:
+        return
+    now = datetime.utcnow()
+    rows = []
+    for (team_id, slug), delta in deltas["count"].items():
+        if delta == 0:
+            continue
+        rows.append({
+            "team_id": team_id,
+            "tag_slug": slug,
+            "color": deltas["color"].get((team_id, slug)),
+            "usage_count": max(delta, 0),
+            "last_used_at": now if delta > 0 else None,
+            "_delta": delta,
+        })
+    if not rows:
+        return
+
+    conn = session.connection()
+    for row in rows:
+        delta = row.pop("_delta")
+        stmt = insert(TeamTagStat).values(**row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[TeamTagStat.team_id, TeamTagStat.tag_slug],
+            set_={
+                "usage_count": func.greatest(TeamTagStat.usage_count + delta, 0),
+                "color": func.coalesce(stmt.excluded.color, TeamTagStat.color),
+                "last_used_at": func.coalesce(stmt.excluded.last_used_at, TeamTagStat.last_used_at),
+            },
+        )
+        conn.execute(stmt)
+
+
+# active_history: ao atribuir tags/team_id/deleted_at numa task expirada (pós-commit),
+# o valor antigo é carregado antes da troca, para o delta sair certo.
+def _keep_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _attr in (Task.tags, Task.team_id, Task.deleted_at):
+    event.listen(_attr, "set", _keep_old_value, active_history=True)
+
+
+@event.listens_for(Session, "before_flush")
+def _team_tags_before_flush(session, flush_context, instances):
+    _collect_deltas(session)
+
+
+@event.listens_for(Session, "after_flush")
+def _team_tags_after_flush(session, flush_context):
+    _apply_deltas(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _team_tags_rollback(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+def team_tag_colors(team_id: int) -> dict:
+    """{slug: cor explícita} das tags usadas na equipe (uma query indexada)."""
+    rows = (TeamTagStat.query
+            .with_entities(TeamTagStat.tag_slug, TeamTagStat.color)
+            .filter(TeamTagStat.team_id == team_id,
+                    TeamTagStat.usage_count > 0,
+                    TeamTagStat.color.isnot(None))
+            .all())
+    return {slug: color for slug, color in rows}
+
+
+def top_team_tags(team_id: int, limit: int = 10):
+    return (TeamTagStat.query
+            .filter(TeamTagStat.team_id == team_id, TeamTagStat.usage_count > 0)
+            .order_by(TeamTagStat.usage_count.desc(), TeamTagStat.last_used_at.desc().nulls_last())
+            .limit(limit)
+            .all())